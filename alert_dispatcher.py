@@ -0,0 +1,362 @@
+"""
+Event-driven alerts for the nudge UI.
+
+The UI used to replay the flagged rows of fleet_context_fusion.csv one per
+st_autorefresh tick (every 30 s, per browser session), so alert throughput
+was fixed by the timer no matter how fast data arrived. AlertDispatcher
+turns scored rows into alerts as they arrive and pushes them to every
+subscribed session:
+
+* filters: only rows matching `filters` (read_fusion() style) can become
+  alerts. The UI passes nudges.NUDGE_FILTERS, the rows it always alerted
+  on and the ones nudges are precomputed for (precompute_nudges,
+  drivebuddy_nudges.py), so no alert waits on a blocking LLM call;
+* classify(): the rules of the UI's alert section, in order of severity:
+  critical (risk > 0.8 and stress > 70), elevated (risk > 0.6), stress
+  (stress > 70); other rows are not alerts;
+* deduplication: a (vehicle, timestamp, level) already dispatched is
+  dropped (the last DEDUPE_KEYS of them are remembered);
+* per-vehicle rate limiting: at most one alert per vehicle per
+  `min_interval` seconds of reading time (the rows' timestamps, which can
+  arrive in any order), unless it is more severe than the alerts sent
+  around it. A burst of rows written at once (a rewrite, a backfill) is not
+  a burst of events, so arrival time is only used for rows without a
+  timestamp. Rate-limited rows are not remembered as dispatched;
+* one bounded priority queue per subscriber (AlertQueue): the most severe,
+  then oldest, alert comes out first; when a queue is full the least severe
+  alert is dropped. New subscribers get the last few alerts.
+
+Rows come from publish() (a DataFrame or dicts, e.g. LiveScorer results
+merged with their events) or from follow(), which tails the fused CSV that
+the scoring worker rewrites and incremental_scoring.py appends to. Given
+the Parquet dataset too, follow() reads whichever of the two read_fusion()
+would (a worker running with --format parquet writes no CSV) and re-reads
+the dataset each time it is rewritten.
+
+A rewritten output repeats every row already read, so follow() keeps a
+high-water mark per source rather than relying on the bounded dedupe set:
+the number of rows read, of the CSV and of each dataset partition. The
+scoring outputs are written in telemetry order, which only grows, so a
+rewrite starts with the rows already read.
+
+    dispatcher = AlertDispatcher(filters=NUDGE_FILTERS)
+    dispatcher.follow("fleet_context_fusion.csv", dataset_path="fleet_context_fusion.parquet")
+    alerts = dispatcher.subscribe()
+    alert = alerts.get(timeout=60)       # Alert or None
+"""
+import bisect
+import heapq
+import io
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from event_rules import HIGH_STRESS_THRESHOLD
+from fusion_store import META_FILE, filter_frame, fusion_source_path, read_fusion
+from telemetry_schema import read_fusion_csv
+
+CRITICAL_RISK = 0.8
+ELEVATED_RISK = 0.6
+
+# (level, priority: lower is more severe, message, sound) as the UI shows them
+LEVELS = {
+    "critical": (0, "🚨 Critical Condition — High risk and high stress! Recommend immediate rest.",
+                 "assets/critical.mp4"),
+    "elevated": (1, "⚠️ Elevated risk detected — stay cautious.", "assets/warning.mp3"),
+    "stress": (2, "😟 High stress level — consider a short break.", "assets/warning.mp3"),
+}
+_LEVEL_NAMES = list(LEVELS)
+
+DEFAULT_MIN_INTERVAL = 30.0     # seconds between alerts for one vehicle
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_POLL_SECONDS = 1.0
+RECENT_ALERTS = 20
+DEDUPE_KEYS = 100_000
+RATE_LIMIT_HISTORY = 256        # alert times kept per vehicle
+
+
+def classify(df):
+    """Alert level per row ("critical", "elevated", "stress" or None), vectorized over a frame."""
+    risk = df["risk_score"].to_numpy(dtype=np.float64, na_value=np.nan)
+    stress = df["stress_level"].to_numpy(dtype=np.float64, na_value=np.nan)
+    conditions = [
+        (risk > CRITICAL_RISK) & (stress > HIGH_STRESS_THRESHOLD),
+        risk > ELEVATED_RISK,
+        stress > HIGH_STRESS_THRESHOLD,
+    ]
+    codes = np.select(conditions, [0, 1, 2], default=-1)
+    return [_LEVEL_NAMES[c] if c >= 0 else None for c in codes.tolist()]
+
+
+def _reading_seconds(timestamp, default):
+    """A row's timestamp in seconds, `default` when it has none."""
+    try:
+        timestamp = pd.Timestamp(timestamp)
+    except (TypeError, ValueError):
+        return default
+    return default if pd.isna(timestamp) else timestamp.timestamp()
+
+
+class Alert:
+    __slots__ = ("level", "priority", "message", "sound", "vehicle_id", "row", "received_at", "seq")
+
+    def __init__(self, level, row, received_at, seq):
+        self.level = level
+        self.priority, self.message, self.sound = LEVELS[level]
+        self.vehicle_id = str(row.get("vehicle_id"))
+        self.row = row
+        self.received_at = received_at
+        self.seq = seq
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def __repr__(self):
+        return f"Alert({self.level!r}, vehicle_id={self.vehicle_id!r}, timestamp={self.row.get('timestamp')!r})"
+
+
+class AlertQueue:
+    """Bounded priority queue of alerts for one subscriber."""
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._heap = []
+        self._cond = threading.Condition()
+
+    def put(self, alert):
+        """Queue `alert`; when full, the least severe (newest on ties) of it and the queued ones is dropped."""
+        with self._cond:
+            if len(self._heap) >= self.maxsize:
+                worst = max(self._heap)
+                self.dropped += 1
+                if not alert < worst:
+                    return False
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+            heapq.heappush(self._heap, alert)
+            self._cond.notify()
+            return True
+
+    def get(self, timeout=None):
+        """Most severe queued alert, waiting up to `timeout` seconds for one; None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._heap, timeout):
+                return None
+            return heapq.heappop(self._heap)
+
+    def wait(self, timeout=None):
+        """True once an alert is queued (without taking it), False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._heap, timeout)
+
+    def __len__(self):
+        with self._cond:
+            return len(self._heap)
+
+
+class CsvTail:
+    """Complete rows appended to a CSV since the last read; starts over when the file is replaced or truncated."""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.columns = None
+        self.rows = 0           # data rows of the current file read so far
+        self.delivered = 0      # leading rows of the output returned, across rewrites
+        self._inode = None
+
+    def reset(self):
+        # `delivered` survives: a rewrite starts with the rows already returned
+        self.offset, self.columns, self.rows, self._inode = 0, None, 0, None
+
+    def read_new(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            self.reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return None  # partial line, read it once it is complete
+        start = 0
+        if self.columns is None:
+            start = data.index(b"\n") + 1
+            self.columns = data[:start].decode("utf-8").strip().split(",")
+        self.offset += end
+        if start == end:
+            return None
+        df = read_fusion_csv(io.BytesIO(data[start:end]), header=None, names=self.columns)
+        skip = min(max(self.delivered - self.rows, 0), len(df))
+        self.rows += len(df)
+        self.delivered = max(self.delivered, self.rows)
+        return df.iloc[skip:] if skip < len(df) else None
+
+
+class FusionTail:
+    """New rows of the fused output, from the CSV (tailed) or the Parquet dataset (re-read once per rewrite)."""
+
+    def __init__(self, csv_path, dataset_path, filters=None):
+        self.csv_path = csv_path
+        self.dataset_path = dataset_path
+        self.filters = filters
+        self.csv = CsvTail(csv_path)
+        self._dataset_stamp = None
+        self._delivered = {}    # partition value -> leading rows of that partition returned
+
+    def reset(self):
+        self.csv.reset()
+        self._dataset_stamp = None
+
+    def read_new(self):
+        if fusion_source_path(self.dataset_path, self.csv_path) == self.csv_path:
+            return self.csv.read_new()
+        # write_fusion() swaps the dataset in whole, its meta file last
+        meta_path = os.path.join(self.dataset_path, META_FILE)
+        stamp = os.stat(meta_path).st_mtime_ns
+        if stamp == self._dataset_stamp:
+            return None
+        with open(meta_path) as f:
+            partition_by = json.load(f)["partition_by"]
+        df = read_fusion(filters=self.filters, path=self.dataset_path, csv_path=self.csv_path)
+        self._dataset_stamp = stamp
+        # Each partition keeps its rows in output order, so a rewrite starts with the ones already returned
+        partitions = df[partition_by]
+        position = partitions.groupby(partitions, sort=False, observed=True).cumcount()
+        new = (position >= partitions.map(self._delivered).fillna(0)).to_numpy()
+        self._delivered.update(partitions.value_counts(sort=False).to_dict())
+        return df[new] if new.any() else None
+
+
+class AlertDispatcher:
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, queue_size=DEFAULT_QUEUE_SIZE, clock=time.monotonic,
+                 filters=None):
+        self.min_interval = min_interval
+        self.filters = filters
+        self.queue_size = queue_size
+        self.clock = clock
+        self._subscribers = weakref.WeakSet()    # a session's queue goes away with the session
+        self._recent = deque(maxlen=RECENT_ALERTS)
+        self._seen = OrderedDict()
+        self._sent = {}                          # vehicle_id -> ([reading time, ...], [priority, ...]), by time
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+        self._stats = {"rows": 0, "alerts": 0, "duplicates": 0, "rate_limited": 0}
+
+    def subscribe(self, maxsize=None):
+        """A new queue receiving every alert from now on, primed with the most recent ones."""
+        queue = AlertQueue(maxsize or self.queue_size)
+        with self._lock:
+            for alert in self._recent:
+                queue.put(alert)
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def publish(self, rows):
+        """Dispatch scored rows (a DataFrame or an iterable of dicts); returns the alerts sent."""
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        received = len(df)
+        if self.filters and received:
+            df = filter_frame(df, self.filters)
+        levels = classify(df) if len(df) else []
+        flagged = [i for i, level in enumerate(levels) if level is not None]
+        records = df.iloc[flagged].to_dict("records") if flagged else []
+        sent = []
+        with self._lock:
+            self._stats["rows"] += received
+            now = self.clock()
+            for i, row in zip(flagged, records):
+                alert = self._admit(levels[i], row, now)
+                if alert is None:
+                    continue
+                sent.append(alert)
+                self._recent.append(alert)
+                for queue in list(self._subscribers):
+                    queue.put(alert)
+        return sent
+
+    def _admit(self, level, row, now):
+        vehicle_id = str(row.get("vehicle_id"))
+        key = (vehicle_id, str(row.get("timestamp")), level)
+        if key in self._seen:
+            self._stats["duplicates"] += 1
+            return None
+        priority = LEVELS[level][0]
+        at = _reading_seconds(row.get("timestamp"), now)
+        times, priorities = self._sent.setdefault(vehicle_id, ([], []))
+        lo = bisect.bisect_right(times, at - self.min_interval)
+        hi = bisect.bisect_left(times, at + self.min_interval)
+        if any(p <= priority for p in priorities[lo:hi]):
+            self._stats["rate_limited"] += 1
+            return None
+
+        self._seen[key] = None
+        if len(self._seen) > DEDUPE_KEYS:
+            self._seen.popitem(last=False)
+        i = bisect.bisect_right(times, at)
+        times.insert(i, at)
+        priorities.insert(i, priority)
+        if len(times) > RATE_LIMIT_HISTORY:
+            del times[0], priorities[0]
+        self._stats["alerts"] += 1
+        return Alert(level, row, now, next(self._seq))
+
+    def follow(self, path, poll_seconds=DEFAULT_POLL_SECONDS, dataset_path=None):
+        """
+        Tail the fused CSV at `path` in a daemon thread, dispatching rows as
+        they are written; with `dataset_path`, read the Parquet dataset
+        instead whenever read_fusion() would.
+        """
+        tail = CsvTail(path) if dataset_path is None else FusionTail(path, dataset_path, self.filters)
+        # Rows already written are dispatched before returning, so new subscribers get them as recent alerts
+        existing = tail.read_new()
+        if existing is not None:
+            self.publish(existing)
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    new_rows = tail.read_new()
+                except (OSError, ValueError, pd.errors.ParserError):
+                    # Replaced between stat and read; the next poll starts over
+                    new_rows = None
+                    tail.reset()
+                if new_rows is not None:
+                    self.publish(new_rows)
+                self._stop.wait(poll_seconds)
+
+        thread = threading.Thread(target=run, name=f"alert-follow-{os.path.basename(path)}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            return dict(self._stats, subscribers=len(subscribers),
+                        dropped=sum(queue.dropped for queue in subscribers))
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
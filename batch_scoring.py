@@ -0,0 +1,158 @@
+"""
+Parallel batch scoring for a fleet's worth of telemetry files.
+
+Production data arrives as one telemetry file per gadget per day, while
+generate_csv() scores a single file in a single process. score_batch() takes
+a directory or glob of telemetry files and spreads the work over a process
+pool, sharded either
+
+* by file ("file"): one task per file, or
+* by vehicle ("vehicle"): each file is split into `vehicle_buckets` tasks
+  by a stable hash of vehicle_id, for a few very large files. Every task
+  parses its whole file and keeps only its vehicles, so prefer "file" when
+  there are at least as many files as workers.
+
+The model artifact is fitted once up front (if missing) and every worker
+loads it once, in the pool initializer; tasks only carry file paths. Each
+task writes its scored rows to a part file and the parent concatenates the
+parts in a fixed order (file, then bucket) into the output, which is
+renamed into place at the end. The result does not depend on the number of
+workers; in "file" mode each file's rows match generate_csv() on that file.
+Tasks also aggregate their rows per policy, and the parent combines those
+into the store next to the output (see policy_aggregates.py).
+
+    python batch_scoring.py "data/telemetry_*.csv" --workers 8
+    python batch_scoring.py data/ --shard-by vehicle --vehicle-buckets 16
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from policy_aggregates import PolicyAggregates, aggregates_path_for
+import risk_model
+import scorers
+from risk_score_calc import OUTPUT_COLS, OUTPUT_FILE, fit, process_frame
+from telemetry_schema import TIMESTAMP_FORMAT, read_telemetry
+
+TRAFFIC_SEED = 42
+DEFAULT_VEHICLE_BUCKETS = 16
+
+
+def find_telemetry_files(source):
+    """Sorted telemetry CSVs for a directory, a glob pattern or a single file."""
+    if os.path.isdir(source):
+        files = glob.glob(os.path.join(source, "*.csv"))
+    else:
+        files = glob.glob(source)
+    return sorted(files)
+
+
+def plan_tasks(files, shard_by="file", vehicle_buckets=DEFAULT_VEHICLE_BUCKETS):
+    """(part_number, telemetry_path, bucket, n_buckets) per task, in output order."""
+    if shard_by not in ("file", "vehicle"):
+        raise ValueError("shard_by must be 'file' or 'vehicle'")
+    buckets = [(None, None)] if shard_by == "file" else [(b, vehicle_buckets) for b in range(vehicle_buckets)]
+    pairs = [(path, bucket, n) for path in files for bucket, n in buckets]
+    return [(i, path, bucket, n) for i, (path, bucket, n) in enumerate(pairs)]
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+_worker = {}
+
+
+def _init_worker(artifact_path, parts_dir, backend):
+    # Loaded (and compiled for the backend) once per process; tasks reuse the cache
+    scorers.get_scorer(risk_model.load_model(artifact_path), backend)
+    _worker.update(artifact_path=artifact_path, parts_dir=parts_dir, backend=backend)
+
+
+def _score_task(task):
+    part, telemetry_path, bucket, n_buckets = task
+    t0 = time.perf_counter()
+    telemetry_df = read_telemetry(telemetry_path)
+    if bucket is not None:
+        hashes = pd.util.hash_array(telemetry_df["vehicle_id"].astype(str).to_numpy())
+        telemetry_df = telemetry_df[hashes % np.uint64(n_buckets) == bucket].reset_index(drop=True)
+
+    # Seeded per task so results do not depend on scheduling
+    seed = TRAFFIC_SEED if bucket is None else TRAFFIC_SEED + bucket
+    output_df = process_frame(telemetry_df, np.random.RandomState(seed), _worker["artifact_path"],
+                              _worker["backend"])
+    part_path = os.path.join(_worker["parts_dir"], f"part-{part:06d}.csv")
+    output_df.to_csv(part_path, index=False, header=False, date_format=TIMESTAMP_FORMAT)
+    return part_path, len(output_df), time.perf_counter() - t0, PolicyAggregates.from_frame(output_df)
+
+
+def _concat_parts(part_paths, output_path):
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", newline="") as out:
+        pd.DataFrame(columns=OUTPUT_COLS).to_csv(out, index=False)
+        for part_path in part_paths:
+            with open(part_path, newline="") as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+    os.replace(tmp_path, output_path)
+
+
+# -----------------------------
+# Parent side
+# -----------------------------
+def score_batch(source, output_path=OUTPUT_FILE, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH,
+                workers=None, shard_by="file", vehicle_buckets=DEFAULT_VEHICLE_BUCKETS,
+                backend=scorers.DEFAULT_BACKEND):
+    """
+    Score every telemetry file under `source` with `workers` processes
+    (default: all cores) and write one fused CSV. Returns a summary dict.
+    """
+    files = find_telemetry_files(source)
+    if not files:
+        raise FileNotFoundError(f"No telemetry files match {source!r}")
+    if not risk_model.model_exists(artifact_path):
+        fit(files[0], artifact_path)
+
+    workers = workers or os.cpu_count() or 1
+    tasks = plan_tasks(files, shard_by, vehicle_buckets)
+    t0 = time.perf_counter()
+    parts_dir = tempfile.mkdtemp(prefix="batch-scoring-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(artifact_path, parts_dir, backend)) as pool:
+            results = list(pool.map(_score_task, tasks))
+        _concat_parts([part_path for part_path, _, _, _ in results], output_path)
+        PolicyAggregates.combine([aggregates for _, _, _, aggregates in results]).save(
+            aggregates_path_for(output_path))
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    return {
+        "files": len(files),
+        "tasks": len(tasks),
+        "workers": workers,
+        "rows": sum(rows for _, rows, _, _ in results),
+        "task_seconds": round(sum(seconds for _, _, seconds, _ in results), 3),
+        "wall_seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score many telemetry files in parallel.")
+    parser.add_argument("source", help="directory, glob pattern or file of telemetry CSVs")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--artifact", default=risk_model.DEFAULT_ARTIFACT_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--shard-by", choices=["file", "vehicle"], default="file")
+    parser.add_argument("--vehicle-buckets", type=int, default=DEFAULT_VEHICLE_BUCKETS)
+    parser.add_argument("--backend", choices=sorted(scorers.SCORERS), default=scorers.DEFAULT_BACKEND)
+    args = parser.parse_args()
+    summary = score_batch(args.source, args.output, args.artifact, args.workers, args.shard_by,
+                          args.vehicle_buckets, args.backend)
+    print(f"Scored {summary['rows']} rows from {summary['files']} file(s) in {summary['wall_seconds']}s "
+          f"({summary['tasks']} tasks on {summary['workers']} workers) -> '{args.output}'")
@@ -0,0 +1,104 @@
+"""
+Benchmark: alert latency of the nudge UI's old 30-second row replay vs.
+alert_dispatcher.AlertDispatcher following the fused CSV.
+
+    python benchmarks/bench_alert_dispatcher.py
+    python benchmarks/bench_alert_dispatcher.py --batch 10 --every 0.05 --poll 0.1
+    python benchmarks/bench_alert_dispatcher.py --min-interval 0     # rate limiting off
+
+A writer appends the rows of fleet_context_fusion.csv to a temporary CSV in
+batches (as incremental_scoring.py does); one subscriber takes alerts off
+its queue, with the UI's settings: rows matching nudges.NUDGE_FILTERS and
+the default per-vehicle rate limit unless --min-interval is given. Latency
+is from the write of an alert's row to the subscriber getting it. The old
+UI replayed the same filtered rows one per 30 s tick, so its k-th alert
+waited k * 30 s however fast rows were written.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alert_dispatcher import DEFAULT_MIN_INTERVAL, AlertDispatcher, classify  # noqa: E402
+from fusion_store import FUSION_CSV, filter_frame  # noqa: E402
+from nudges import NUDGE_FILTERS  # noqa: E402
+from telemetry_schema import read_fusion_csv  # noqa: E402
+
+OLD_INTERVAL_SECONDS = 30
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--source", default=os.path.join(ROOT, FUSION_CSV))
+    parser.add_argument("--batch", type=int, default=25, help="rows per append")
+    parser.add_argument("--every", type=float, default=0.1, help="seconds between appends")
+    parser.add_argument("--poll", type=float, default=0.25, help="dispatcher poll interval")
+    parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL,
+                        help="per-vehicle rate limit (s of reading time)")
+    args = parser.parse_args()
+
+    with open(args.source) as f:
+        header, *lines = f.readlines()
+    flagged = sum(level is not None for level in classify(filter_frame(read_fusion_csv(args.source), NUDGE_FILTERS)))
+    work = tempfile.mkdtemp(prefix="bench-alerts-")
+    path = os.path.join(work, "fused.csv")
+    with open(path, "w") as f:
+        f.write(header)
+
+    dispatcher = AlertDispatcher(min_interval=args.min_interval, filters=NUDGE_FILTERS)
+    queue = dispatcher.subscribe(maxsize=len(lines))
+    dispatcher.follow(path, poll_seconds=args.poll)
+    written = {}        # row timestamp + vehicle -> time written
+    latencies = []
+    done = threading.Event()
+
+    def consume():
+        while not done.is_set() or len(queue):
+            alert = queue.get(timeout=0.1)
+            if alert is not None:
+                key = (str(alert.row["timestamp"].strftime("%d-%m-%Y %H:%M")), alert.vehicle_id)
+                latencies.append(time.perf_counter() - written[key])
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    t0 = time.perf_counter()
+    try:
+        for start in range(0, len(lines), args.batch):
+            batch = lines[start:start + args.batch]
+            now = time.perf_counter()
+            for line in batch:
+                timestamp, _, _, vehicle_id = line.split(",", 4)[:4]
+                written.setdefault((timestamp, vehicle_id), now)
+            with open(path, "a") as f:
+                f.writelines(batch)
+            time.sleep(args.every)
+        time.sleep(2 * args.poll)
+        done.set()
+        consumer.join()
+    finally:
+        dispatcher.close()
+        shutil.rmtree(work, ignore_errors=True)
+    elapsed = time.perf_counter() - t0
+
+    stats = dispatcher.stats()
+    print(f"{len(lines)} rows appended in batches of {args.batch} every {args.every}s "
+          f"({len(lines) / elapsed:,.0f} rows/s), {flagged} pass the nudge filter and an alert rule")
+    print(f"  30 s replay   1 alert / {OLD_INTERVAL_SECONDS}s per session: last of {flagged} shown after "
+          f"{flagged * OLD_INTERVAL_SECONDS / 60:.0f} min, median wait {flagged * OLD_INTERVAL_SECONDS / 2:.0f}s")
+    lat = np.array(latencies) * 1000
+    print(f"  dispatcher    {len(latencies)} alerts in {elapsed:.1f}s, latency p50 {np.percentile(lat, 50):.0f} ms  "
+          f"p95 {np.percentile(lat, 95):.0f} ms  max {lat.max():.0f} ms (poll {args.poll}s, "
+          f"min_interval {args.min_interval:g}s)")
+    print(f"  {stats}")
+
+
+if __name__ == "__main__":
+    main()
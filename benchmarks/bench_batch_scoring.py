@@ -0,0 +1,65 @@
+"""
+Benchmark: batch scoring of many telemetry files on 1..N worker processes.
+
+    python benchmarks/bench_batch_scoring.py                # 16 files x 100k rows, 1..cpu_count workers
+    python benchmarks/bench_batch_scoring.py 32 50000 1 2 4 8
+
+Files are built by tiling the sample telemetry file, with vehicle ids
+suffixed per file and copy so (timestamp, vehicle_id) stays unique. The
+merged output is checked to be byte-identical for every worker count.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_scoring import score_batch  # noqa: E402
+from risk_score_calc import TELEMETRY_FILE, fit  # noqa: E402
+
+
+def build_files(directory, n_files, rows_per_file):
+    sample = pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE))
+    repeats = -(-rows_per_file // len(sample))
+    for f in range(n_files):
+        tiles = [sample.assign(vehicle_id=sample["vehicle_id"] + f"_{f}_{i}") for i in range(repeats)]
+        pd.concat(tiles).head(rows_per_file).to_csv(os.path.join(directory, f"telemetry_{f:03d}.csv"), index=False)
+
+
+def md5(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def main(n_files=16, rows_per_file=100_000, worker_counts=None):
+    worker_counts = worker_counts or sorted({1, 2, 4, 8, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        build_files(data_dir, n_files, rows_per_file)
+        artifact = os.path.join(tmp, "model.joblib")
+        fit(os.path.join(data_dir, "telemetry_000.csv"), artifact)
+
+        print(f"{n_files} files x {rows_per_file:,} rows, {os.cpu_count()} CPU(s)")
+        baseline_s, baseline_md5 = None, None
+        for workers in worker_counts:
+            output = os.path.join(tmp, f"out_{workers}.csv")
+            t0 = time.perf_counter()
+            summary = score_batch(data_dir, output, artifact, workers=workers)
+            elapsed = time.perf_counter() - t0
+            digest = md5(output)
+            baseline_s = baseline_s or elapsed
+            baseline_md5 = baseline_md5 or digest
+            assert digest == baseline_md5, f"output differs with {workers} workers"
+            print(f"workers={workers:>2}  {elapsed:7.2f}s  {summary['rows'] / elapsed:>11,.0f} rows/s  "
+                  f"speedup {baseline_s / elapsed:4.1f}x  efficiency {baseline_s / elapsed / workers:4.0%}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args[:2] or [16, 100_000]), worker_counts=args[2:] or None)
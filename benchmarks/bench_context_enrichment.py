@@ -0,0 +1,81 @@
+"""
+Benchmark: traffic context via the old self-merge vs. context_enrichment.
+
+    python benchmarks/bench_context_enrichment.py              # 1M readings
+    python benchmarks/bench_context_enrichment.py 5000000      # custom size
+
+Readings come from synthetic_data with ~1% of them duplicated (a vehicle
+reporting twice in one minute). The merge multiplies those rows; enrich()
+keeps exactly one output row per reading. Also times the as-of join
+against a local traffic table with one observation per cell every 5 min.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_enrichment import SimulatedTrafficProvider, TrafficTableProvider, enrich  # noqa: E402
+from synthetic_data import generate_fleet  # noqa: E402
+
+DUPLICATE_FRACTION = 0.01
+
+
+def old_merge(df):
+    # prepare_telemetry before context_enrichment.py
+    rng = np.random.RandomState(42)
+    traffic_df = df[['timestamp', 'vehicle_id']].copy()
+    traffic_df['traffic_density'] = rng.choice(['low', 'medium', 'high'], size=len(traffic_df))
+    return df.merge(traffic_df, on=['timestamp', 'vehicle_id'])
+
+
+def traffic_table(df, rng):
+    times = pd.date_range(pd.to_datetime(df["timestamp"], format="%d-%m-%Y %H:%M").min().floor("D"),
+                          periods=7 * 24 * 12, freq="5min")
+    lats, lons = np.arange(40.70, 40.85, 0.01), np.arange(-74.03, -73.88, 0.01)
+    grid = pd.MultiIndex.from_product([times, lats, lons], names=["timestamp", "gps_lat", "gps_lon"]).to_frame(
+        index=False)
+    grid["traffic_density"] = rng.choice(["low", "medium", "high"], len(grid))
+    return grid
+
+
+def measure(fn):
+    # Timed and memory-traced separately: tracemalloc slows allocations down
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    out = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, seconds, peak
+
+
+def main(n=1_000_000):
+    rng = np.random.default_rng(0)
+    telemetry, _ = generate_fleet(rows=n)
+    dupes = telemetry.sample(frac=DUPLICATE_FRACTION, random_state=0)
+    df = pd.concat([telemetry, dupes], ignore_index=True)
+    print(f"{len(df):,} readings ({len(dupes):,} sharing a vehicle and minute with another)")
+
+    merged, seconds, peak = measure(lambda: old_merge(df))
+    print(f"  self-merge       {seconds:7.3f}s  peak {peak / 2**20:7.0f} MB  -> {len(merged):,} rows")
+    del merged
+    enriched, seconds, peak = measure(lambda: enrich(df.copy(), [SimulatedTrafficProvider()]))
+    print(f"  enrich (+copy)   {seconds:7.3f}s  peak {peak / 2**20:7.0f} MB  -> {len(enriched):,} rows")
+    del enriched
+    _, seconds, peak = measure(lambda: enrich(df, [SimulatedTrafficProvider()]))
+    print(f"  enrich in place  {seconds:7.3f}s  peak {peak / 2**20:7.0f} MB  -> {len(df):,} rows")
+
+    table = traffic_table(df, rng)
+    provider = TrafficTableProvider(table, fallback=SimulatedTrafficProvider())
+    _, seconds, peak = measure(lambda: enrich(df, [provider]))
+    print(f"  as-of table join {seconds:7.3f}s  peak {peak / 2**20:7.0f} MB  ({len(table):,} observations)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
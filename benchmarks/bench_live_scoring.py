@@ -0,0 +1,119 @@
+"""
+Benchmark: latency of live event scoring, in-process and over local HTTP.
+
+    python benchmarks/bench_live_scoring.py            # 4 HTTP clients, 5s
+    python benchmarks/bench_live_scoring.py 16 10      # clients, seconds
+
+Events are the sample telemetry rows (raw, as a gadget would send them).
+In-process: p50/p99 per single event for every backend, and per-event cost
+in micro-batches. HTTP: a closed-loop load generator with persistent
+connections posting single events to live_scoring.py, reporting p50/p99
+round-trip latency and throughput. Scores are checked against the batch
+pipeline first.
+"""
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import risk_model  # noqa: E402
+from live_scoring import LiveScorer, start_server  # noqa: E402
+from risk_score_calc import TELEMETRY_FILE, prepare_telemetry, score  # noqa: E402
+from scorers import SCORERS  # noqa: E402
+
+WARMUP = 200
+SAMPLES = 5_000
+MICRO_BATCHES = [32, 256, 1024]
+
+
+def load_events():
+    raw = pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE))
+    prepared = prepare_telemetry(raw.copy())
+    if not risk_model.model_exists():
+        risk_model.fit(prepared.copy())
+    # Send the traffic label with each event so results are comparable to the batch run
+    events = prepared.drop(columns=["event"]).to_dict("records")
+    return prepared, events
+
+
+def percentiles(latencies_s):
+    ms = np.asarray(latencies_s) * 1000
+    return f"p50 {np.percentile(ms, 50):7.3f}ms  p99 {np.percentile(ms, 99):7.3f}ms  max {ms.max():7.3f}ms"
+
+
+def in_process(events, prepared):
+    print("in-process, single event")
+    for backend in SCORERS:
+        scorer = LiveScorer(backend=backend)
+        expected = score(prepared, backend=backend)["risk_score"].tolist()
+        assert [scorer.score_event(e)["risk_score"] for e in events] == expected, backend
+        samples = SAMPLES if backend != "forest" else SAMPLES // 10
+        for e in events[:WARMUP]:
+            scorer.score_event(e)
+        latencies = []
+        for i in range(samples):
+            t0 = time.perf_counter()
+            scorer.score_event(events[i % len(events)])
+            latencies.append(time.perf_counter() - t0)
+        print(f"  {backend:<12} {percentiles(latencies)}")
+
+    print("in-process, micro-batches (flat_forest)")
+    scorer = LiveScorer()
+    for size in MICRO_BATCHES:
+        batch = (events * (size // len(events) + 1))[:size]
+        t0 = time.perf_counter()
+        for _ in range(20):
+            scorer.score_events(batch)
+        per_batch = (time.perf_counter() - t0) / 20
+        print(f"  {size:>4} events  {per_batch * 1000:7.3f}ms/batch  {per_batch / size * 1e6:7.1f}us/event")
+
+
+def http_load(events, clients, seconds):
+    server = start_server(LiveScorer())
+    host, port = server.server_address[:2]
+    bodies = [json.dumps(e).encode() for e in events]
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + seconds
+
+    def client(k):
+        conn = http.client.HTTPConnection(host, port)
+        i = k
+        while time.perf_counter() < deadline:
+            body = bodies[i % len(bodies)]
+            t0 = time.perf_counter()
+            conn.request("POST", "/score", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            latencies[k].append(time.perf_counter() - t0)
+            assert response.status == 200
+            i += clients
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    server.shutdown()
+    all_latencies = [x for per_client in latencies for x in per_client]
+    print(f"HTTP, {clients} clients, {seconds}s: {len(all_latencies) / seconds:,.0f} req/s  "
+          f"{percentiles(all_latencies)}")
+
+
+def main(clients=4, seconds=5):
+    prepared, events = load_events()
+    in_process(events, prepared)
+    http_load(events, clients, seconds)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 4, float(args[1]) if len(args) > 1 else 5)
@@ -0,0 +1,66 @@
+"""
+Benchmark: nudge generation for flagged rows, sequential blocking calls vs.
+the async LLM gateway, against the local stub server (no network).
+
+    python benchmarks/bench_llm_gateway.py                   # 0.2s stub latency
+    python benchmarks/bench_llm_gateway.py 0.5 16            # latency, concurrency
+
+Every 7th stub request returns 429 to exercise retries.
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llm_gateway import HttpChatClient, LLMGateway  # noqa: E402
+from llm_stub_server import start_stub_server  # noqa: E402
+from nudge_cache import NudgeCache  # noqa: E402
+from nudges import NUDGE_FIELDS, build_nudge_messages, precompute_nudges_sync  # noqa: E402
+from risk_score_calc import TELEMETRY_FILE, prepare_telemetry  # noqa: E402
+
+
+def flagged_rows():
+    df = prepare_telemetry(pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE)))
+    df["risk_score"] = (df["speed"] / df["speed"].max()).round(2)
+    return df.sort_values("stress_level", ascending=False).head(60)[NUDGE_FIELDS].reset_index(drop=True)
+
+
+def main(latency=0.2, concurrency=8):
+    server = start_stub_server(latency=latency, rate_limit_every=7)
+    df = flagged_rows()
+    try:
+        # Sequential, like the old per-row synchronous client call (retries only, no parallelism)
+        sequential = LLMGateway(HttpChatClient(base_url=server.url), max_concurrency=1)
+        t0 = time.perf_counter()
+        for row in df.to_dict("records"):
+            sequential.complete_sync(build_nudge_messages(**row))
+        seq_s = time.perf_counter() - t0
+        print(f"sequential:      {len(df)} nudges in {seq_s:6.2f}s  {sequential.stats()}")
+
+        gateway = LLMGateway(HttpChatClient(base_url=server.url), max_concurrency=concurrency)
+        t0 = time.perf_counter()
+        batch = gateway.complete_many_sync([build_nudge_messages(**row) for row in df.to_dict("records")])
+        par_s = time.perf_counter() - t0
+        assert not any(isinstance(r, Exception) for r in batch), batch
+        print(f"gateway batch:   {len(df)} nudges in {par_s:6.2f}s  {gateway.stats()}")
+
+        cache = NudgeCache()
+        gateway = LLMGateway(HttpChatClient(base_url=server.url), max_concurrency=concurrency)
+        t0 = time.perf_counter()
+        nudges = precompute_nudges_sync(gateway, df, cache=cache)
+        cached_s = time.perf_counter() - t0
+        assert len(nudges) == len(df) and all(f"Vehicle {v}" in n for v, n in zip(df["vehicle_id"], nudges))
+        print(f"precompute+dedup:{len(df)} nudges in {cached_s:6.2f}s  "
+              f"{gateway.stats()['completions']} completions, cache {cache.stats()['entries']} entries")
+        print(f"speedup: batch {seq_s / par_s:.1f}x, batch+dedup {seq_s / cached_s:.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(float(args[0]) if args else 0.2, int(args[1]) if len(args) > 1 else 8)
@@ -0,0 +1,93 @@
+"""
+Benchmark: dashboard KPI cards and risk trend for one policy, computed from
+its raw fused readings (the old click path) vs. looked up in the
+pre-aggregated store from policy_aggregates.py.
+
+    python benchmarks/bench_policy_aggregates.py              # ~2M readings
+    python benchmarks/bench_policy_aggregates.py 500000       # custom size
+
+One policy drives the whole synthetic fleet (60 readings per vehicle per
+driving hour over 30 days), so every reading belongs to it. Risk scores are
+random; the aggregates do not depend on how they were scored.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_rules import detect_events  # noqa: E402
+from policy_aggregates import PolicyAggregates  # noqa: E402
+from synthetic_data import generate_fleet  # noqa: E402
+from telemetry_schema import apply_schema  # noqa: E402
+
+DAYS = 30
+RATE = 60
+REPEATS = 5
+
+
+def fused_policy(n):
+    vehicles = max(1, round(n / (DAYS * RATE * 16)))
+    telemetry, _ = generate_fleet(vehicles=vehicles, policies=1, days=DAYS, rate_per_hour=RATE)
+    df = apply_schema(telemetry)
+    df["event"] = detect_events(df)
+    df["risk_score"] = np.random.default_rng(0).random(len(df)).round(2)
+    return df
+
+
+def old_click(driver_df):
+    # streamlit_policy_risk_dashboard.py before the aggregate store
+    driver_df = driver_df.copy()
+    driver_df["timestamp"] = pd.to_datetime(driver_df["timestamp"])
+    driver_df["timestamp"] = pd.to_datetime(driver_df["timestamp"])
+    kpis = (driver_df["risk_score"].mean(), driver_df["speed"].max(), driver_df["stress_level"].mean())
+    driver_df["timestamp"] = pd.to_datetime(driver_df["timestamp"])
+    return kpis, driver_df.sort_values(by="timestamp")
+
+
+def new_click(aggregates, policy_number):
+    return aggregates.kpis(policy_number), aggregates.trend(policy_number, grain="hourly")
+
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main(n=2_000_000):
+    df = fused_policy(n)
+    policy_number = int(df["policy_number"].iloc[0])
+    print(f"policy {policy_number}: {len(df):,} readings from {df['vehicle_id'].nunique()} vehicles")
+
+    t0 = time.perf_counter()
+    aggregates = PolicyAggregates.from_frame(df)
+    build = time.perf_counter() - t0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = aggregates.save(os.path.join(tmp, "fused.csv.aggregates.pkl"))
+        size = os.path.getsize(path)
+        aggregates, load = timed(lambda: PolicyAggregates.load(path))
+    rows = {grain: len(table) for grain, table in aggregates.tables.items()}
+    print(f"  build (pipeline)     {build:8.3f}s  ({len(df) / build:,.0f} readings/s)")
+    print(f"  store                {size / 2**10:8.0f} KB  {rows}, load {load * 1000:.1f} ms")
+
+    (old_kpis, old_trend), old = timed(lambda: old_click(df))
+    (new_kpis, new_trend), new = timed(lambda: new_click(aggregates, policy_number))
+    print(f"  raw readings         {old * 1000:8.1f} ms  chart points {len(old_trend):,}")
+    print(f"  aggregate store      {new * 1000:8.1f} ms  chart points {len(new_trend):,}  ({old / new:,.0f}x)")
+    assert np.isclose(old_kpis[0], new_kpis["avg_risk"]) and old_kpis[1] == new_kpis["max_speed"]
+    assert np.isclose(old_kpis[2], new_kpis["avg_stress"])
+
+    _, fallback = timed(lambda: PolicyAggregates.from_frame(df).kpis(policy_number))
+    print(f"  stale store fallback {fallback * 1000:8.1f} ms  (aggregating the policy's rows on click)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
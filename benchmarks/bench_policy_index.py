@@ -0,0 +1,84 @@
+"""
+Benchmark: per-policy lookup latency, full-scan filter vs. PolicyIndex.
+
+    python benchmarks/bench_policy_index.py               # 100k policies
+    python benchmarks/bench_policy_index.py 1000000       # custom policy count
+
+Builds synthetic policy transactions (~5 coverages per policy) and fused
+telemetry (~20 readings per policy), then times random lookups the way the
+dashboard does them on "Analyze Policy".
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from policy_index import PolicyIndex, load_or_build  # noqa: E402
+
+LOOKUPS = 500
+
+
+def make_frames(policies, seed=0):
+    rng = np.random.default_rng(seed)
+    policy_numbers = 3_000_000_000 + rng.choice(7_000_000, size=policies, replace=False) * 1000
+    transactions = pd.DataFrame({
+        "POL_NO": np.repeat(policy_numbers, 5),
+        "POL_EFF_DT": "04-08-2025",
+        "TRANS_CD": "Submission",
+        "WRITTEN_PREM_AMT": rng.integers(10, 800, policies * 5),
+        "COVG_CD": np.tile(["Liability", "UM BI", "Rental", "UM PD", "Collision"], policies),
+    })
+    telemetry = pd.DataFrame({
+        "policy_number": rng.permutation(np.repeat(policy_numbers, 20)),
+        "risk_score": rng.uniform(0, 1, policies * 20).round(2),
+        "speed": rng.normal(60, 15, policies * 20).round(2),
+    })
+    return policy_numbers, transactions, telemetry
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):8.3f} ms  p99 {np.percentile(ms, 99):8.3f} ms"
+
+
+def time_lookups(fn, queries):
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main(policies):
+    policy_numbers, transactions, telemetry = make_frames(policies)
+    queries = [str(p) for p in np.random.default_rng(1).choice(policy_numbers, LOOKUPS)]
+    print(f"{policies:,} policies, {len(transactions):,} transactions, {len(telemetry):,} telemetry rows")
+
+    for name, df, column in (("transactions", transactions, "POL_NO"), ("telemetry", telemetry, "policy_number")):
+        scan = time_lookups(lambda q: df[df[column].astype(str) == q], queries[:50])
+        t0 = time.perf_counter()
+        index = PolicyIndex.build(df, column)
+        build_s = time.perf_counter() - t0
+        indexed = time_lookups(index.lookup, queries)
+        assert index.lookup(queries[0]).reset_index(drop=True).equals(
+            df[df[column].astype(str) == queries[0]].reset_index(drop=True))
+        print(f"  {name:<12} scan    {percentiles(scan)}")
+        print(f"  {name:<12} index   {percentiles(indexed)}   (build {build_s:.2f}s, once)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "telemetry.pkl")
+        telemetry.to_pickle(source)
+        load_or_build(source, "policy_number", reader=pd.read_pickle, cache_dir=tmp)
+        t0 = time.perf_counter()
+        load_or_build(source, "policy_number", reader=pd.read_pickle, cache_dir=tmp)
+        print(f"  reload persisted telemetry index: {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
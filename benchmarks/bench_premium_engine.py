@@ -0,0 +1,129 @@
+"""
+Benchmark and check: repricing a synthetic book with premium_engine vs.
+asking the LLM for the arithmetic per policy (the old AI Insight path),
+against the local LLM stub.
+
+    python benchmarks/bench_premium_engine.py
+    python benchmarks/bench_premium_engine.py --policies 2000000 --chunksize 2000000
+
+A PolicyTransactions.csv for `--policies` policies (five coverages each) is
+generated with synthetic_data.py, and an aggregate store with random
+per-policy averages spread across the rule thresholds (10% of policies
+without telemetry). reprice_book() reprices the whole book; a sample of the
+results is checked against a plain-Python reading of the rules. The LLM
+path is timed on the sample policies with the old prompt and extrapolated
+at the gateway's concurrency.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import premium_engine  # noqa: E402
+import synthetic_data  # noqa: E402
+import telemetry_schema  # noqa: E402
+from fusion_store import read_fusion  # noqa: E402
+from llm_gateway import LLMGateway, make_client  # noqa: E402
+from llm_stub_server import start_stub_server  # noqa: E402
+from policy_aggregates import PolicyAggregates  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKED = 2000
+
+
+def synthetic_aggregates(policy_numbers, seed=0):
+    """A store with one driver row per policy and random averages; 10% of policies have no readings."""
+    rng = np.random.default_rng(seed)
+    numbers = np.sort(policy_numbers)[rng.random(len(policy_numbers)) >= 0.1]
+    readings = rng.integers(50, 5000, len(numbers))
+    return PolicyAggregates({"policy": pd.DataFrame({
+        "policy_number": numbers,
+        "driver_name": "driver",
+        "readings": readings,
+        "risk_sum": rng.uniform(0.1, 0.7, len(numbers)) * readings,
+        "stress_sum": rng.uniform(10, 60, len(numbers)) * readings,
+        "stress_readings": readings,
+        "fatigue_sum": rng.uniform(5, 45, len(numbers)) * readings,
+        "fatigue_readings": readings,
+    })})
+
+
+def expected_premium(base, avg_risk, avg_stress, avg_fatigue):
+    """The rules as the AI Insight prompt states them, one policy at a time."""
+    risk = 10 if avg_risk > 0.5 else -5 if avg_risk < 0.3 else 0
+    if avg_stress > 40 or avg_fatigue > 30:
+        stress_fatigue = 15
+    elif avg_stress < 20 and avg_fatigue < 20:
+        stress_fatigue = -5
+    else:
+        stress_fatigue = 0
+    return round(base * (1 + (risk + stress_fatigue) / 100), 2)
+
+
+def llm_seconds_per_policy(latency, prompt_latency):
+    """Round trip of the old arithmetic prompt for each sample policy, against the stub."""
+    from bench_prompt_builder import old_messages
+
+    fused = read_fusion()
+    policies = telemetry_schema.read_policy_transactions(os.path.join(ROOT, "PolicyTransactions.csv"))
+    server = start_stub_server(latency=latency, prompt_latency=prompt_latency)
+    llm = LLMGateway(make_client(base_url=server.url))
+    seconds = []
+    try:
+        for policy_number, driver_df in fused.groupby("policy_number", sort=True, observed=True):
+            messages = old_messages(policy_number, driver_df, policies[policies["POL_NO"] == policy_number])
+            t0 = time.perf_counter()
+            llm.complete_sync(messages)
+            seconds.append(time.perf_counter() - t0)
+    finally:
+        llm.close()
+        server.shutdown()
+    return float(np.mean(seconds)), llm.max_concurrency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--policies", type=int, default=200_000)
+    parser.add_argument("--chunksize", type=int, default=premium_engine.DEFAULT_CHUNKSIZE)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per request")
+    parser.add_argument("--prompt-latency", type=float, default=0.1, help="stub seconds per 1,000 prompt chars")
+    args = parser.parse_args()
+
+    policy_table = synthetic_data.generate_policies(args.policies)
+    aggregates = synthetic_aggregates(policy_table["policy_number"].to_numpy())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "PolicyTransactions.csv")
+        synthetic_data.generate_policy_transactions(policy_table).to_csv(path, index=False)
+        size = os.path.getsize(path)
+        t0 = time.perf_counter()
+        repriced = premium_engine.reprice_book(path, aggregates, args.chunksize)
+        seconds = time.perf_counter() - t0
+        premium_engine.write_premiums(repriced, os.path.join(tmp, "premiums.csv"))
+        write_seconds = time.perf_counter() - t0 - seconds
+
+    assert len(repriced) == args.policies, len(repriced)
+    sample = repriced.sample(min(CHECKED, len(repriced)), random_state=0)
+    for row in sample.itertuples():
+        assert row.final_premium == expected_premium(row.base_rate, row.avg_risk, row.avg_stress, row.avg_fatigue), row
+    print(f"{args.policies:,} policies ({len(repriced) * 5:,} transactions, {size / 2**20:.0f} MB), "
+          f"{int((repriced['readings'] > 0).sum()):,} with telemetry; {len(sample)} checked against the rules: OK")
+    print(f"  premium_engine  {seconds:6.2f}s ({args.policies / seconds:,.0f} policies/s), "
+          f"writing the output {write_seconds:.2f}s")
+    print("  adjustments: " + ", ".join(
+        f"{name} {count:,}" for name, count in
+        repriced.groupby(["risk_adjustment_pct", "stress_fatigue_adjustment_pct"]).size().items()))
+
+    per_policy, concurrency = llm_seconds_per_policy(args.latency, args.prompt_latency)
+    print(f"  LLM arithmetic  {per_policy:.2f}s per policy on the stub ({args.latency}s + {args.prompt_latency}s "
+          f"per 1,000 chars): {args.policies * per_policy / concurrency / 3600:,.1f} h for the book at "
+          f"concurrency {concurrency}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: the policy AI Insight prompt as the dashboard used to build it
+(last 100 readings + last 30 transactions as to_string tables) vs.
+prompt_builder.build_policy_insight_messages, against the local LLM stub.
+
+    python benchmarks/bench_prompt_builder.py
+    python benchmarks/bench_prompt_builder.py --repeat 1000 --budget 600 --prompt-latency 0.2
+
+For each policy in the fused output: prompt characters and estimated tokens,
+time to build the prompt, and completion round-trip time from a stub that
+charges `--latency` per request plus `--prompt-latency` per 1,000 prompt
+characters (prompt processing). --repeat tiles each policy's readings to
+show how building scales with history; the old prompt does not grow with it
+because it only ever saw the last 100 rows. A --budget below what the new
+prompt always keeps is reported instead of timed.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telemetry_schema  # noqa: E402
+from fusion_store import read_fusion  # noqa: E402
+from llm_gateway import LLMGateway, make_client  # noqa: E402
+from llm_stub_server import start_stub_server  # noqa: E402
+from prompt_builder import (  # noqa: E402
+    DEFAULT_TOKEN_BUDGET, POLICY_INSIGHT_INSTRUCTIONS, POLICY_INSIGHT_SYSTEM, build_policy_insight_messages,
+    estimate_tokens,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def old_messages(policy_number, driver_df, policy_df):
+    return [
+        {"role": "system", "content": POLICY_INSIGHT_SYSTEM},
+        {"role": "user", "content": (
+            f"Here is the recent driver metrics data for policy {policy_number} (last 100 rows):\n"
+            + driver_df.tail(100)[['timestamp', 'risk_score', 'speed', 'stress_level', 'fatigue', 'event']].to_string(index=False)
+            + "\n\nPolicy Transactions (last 30 rows):\n"
+            + policy_df.tail(30)[['POL_NO', 'POL_EFF_DT', 'TRANS_CD', 'WRITTEN_PREM_AMT', 'COVG_CD']].to_string(index=False)
+            + "\n\n" + POLICY_INSIGHT_INSTRUCTIONS
+        )},
+    ]
+
+
+def tile(driver_df, repeat):
+    """`repeat` copies of a policy's readings, each shifted past the previous one in time."""
+    if repeat <= 1:
+        return driver_df
+    span = driver_df["timestamp"].max() - driver_df["timestamp"].min() + pd.Timedelta(minutes=1)
+    copies = [driver_df.assign(timestamp=driver_df["timestamp"] + i * span) for i in range(repeat)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def measure(build, llm, runs):
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        messages = build()
+    build_ms = (time.perf_counter() - t0) / runs * 1000
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        # A distinct request each run so the gateway does not coalesce them
+        llm.complete_sync(messages + [{"role": "user", "content": str(time.perf_counter())}])
+    llm_ms = (time.perf_counter() - t0) / runs * 1000
+    return messages, build_ms, llm_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=1, help="tile each policy's readings this many times")
+    parser.add_argument("--budget", type=int, default=DEFAULT_TOKEN_BUDGET, help="token budget of the new prompt")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds per request")
+    parser.add_argument("--prompt-latency", type=float, default=0.1, help="stub seconds per 1,000 prompt chars")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    fused = read_fusion()
+    policies = telemetry_schema.read_policy_transactions(os.path.join(ROOT, "PolicyTransactions.csv"))
+    server = start_stub_server(latency=args.latency, prompt_latency=args.prompt_latency)
+    llm = LLMGateway(make_client(base_url=server.url))
+    print(f"stub: {args.latency}s per request + {args.prompt_latency}s per 1,000 prompt chars; "
+          f"new prompt budget {args.budget} tokens")
+    try:
+        for policy_number, driver_df in fused.groupby("policy_number", sort=True, observed=True):
+            driver_df = tile(driver_df.reset_index(drop=True), args.repeat)
+            policy_df = policies[policies["POL_NO"] == policy_number]
+            print(f"policy {policy_number}: {len(driver_df):,} readings, {len(policy_df)} transactions")
+            builds = {
+                "last 100 rows": lambda: old_messages(policy_number, driver_df, policy_df),
+                "prompt_builder": lambda: build_policy_insight_messages(policy_number, driver_df, policy_df,
+                                                                        args.budget),
+            }
+            for name, build in builds.items():
+                try:
+                    messages, build_ms, llm_ms = measure(build, llm, args.runs)
+                except ValueError as e:     # budget below the sections the prompt always keeps
+                    print(f"  {name:15s} {e}")
+                    continue
+                chars = sum(len(m["content"]) for m in messages)
+                tokens = sum(estimate_tokens(m["content"]) for m in messages)
+                print(f"  {name:15s} {chars:7,d} chars  ~{tokens:6,d} tokens  "
+                      f"build {build_ms:7.1f} ms  completion {llm_ms:7.0f} ms")
+    finally:
+        llm.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: nearest rest area, geodesic scan vs. RestAreaIndex.
+
+    python benchmarks/bench_rest_areas.py                 # 500 rest areas, 100k points
+    python benchmarks/bench_rest_areas.py 2000 1000000    # custom sizes
+
+Rest areas and GPS points are drawn uniformly over New York State. The scan
+(the old nearest_rest_area loop) is timed on a small sample of points and
+used to check that the index returns the same rest area.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rest_areas import RestAreaIndex  # noqa: E402
+
+SCAN_SAMPLE = 200
+NY_LAT = (40.5, 45.0)
+NY_LON = (-79.8, -71.8)
+
+
+def make_rest_areas(n, rng):
+    return pd.DataFrame({
+        "name": [f"Rest Area {i}" for i in range(n)],
+        "description": "Parking, restrooms",
+        "travel_direction": rng.choice(["Northbound", "Southbound", "Eastbound", "Westbound"], n),
+        "latitude": rng.uniform(*NY_LAT, n),
+        "longitude": rng.uniform(*NY_LON, n),
+    })
+
+
+def scan_nearest(rest_df, lat, lon):
+    # The loop nearest_rest_area used before rest_areas.py
+    nearest = None
+    min_dist = float('inf')
+    for _, row in rest_df.iterrows():
+        dist = geodesic((lat, lon), (row['latitude'], row['longitude'])).kilometers
+        if dist < min_dist:
+            min_dist = dist
+            nearest = row
+    return nearest
+
+
+def main(rest_areas, points):
+    rng = np.random.default_rng(0)
+    rest_df = make_rest_areas(rest_areas, rng)
+    lats, lons = rng.uniform(*NY_LAT, points), rng.uniform(*NY_LON, points)
+
+    t0 = time.perf_counter()
+    index = RestAreaIndex(rest_df)
+    print(f"index build ({rest_areas:,} rest areas): {time.perf_counter() - t0:.3f}s")
+
+    t0 = time.perf_counter()
+    expected = [scan_nearest(rest_df, lats[i], lons[i])["name"] for i in range(SCAN_SAMPLE)]
+    scan_per_point = (time.perf_counter() - t0) / SCAN_SAMPLE
+    got = index.nearest_batch(lats[:SCAN_SAMPLE], lons[:SCAN_SAMPLE])["name"].tolist()
+    assert got == expected, "index disagrees with the geodesic scan"
+    print(f"geodesic scan:        {scan_per_point * 1000:8.2f} ms/point")
+
+    t0 = time.perf_counter()
+    index.nearest(lats[0], lons[0])
+    print(f"index single lookup:  {(time.perf_counter() - t0) * 1000:8.2f} ms/point")
+
+    for exact in (True, False):
+        t0 = time.perf_counter()
+        index.nearest_batch(lats, lons, exact=exact)
+        elapsed = time.perf_counter() - t0
+        label = "batch + geodesic" if exact else "batch haversine"
+        print(f"index {label:<16} {elapsed / points * 1000:8.4f} ms/point "
+              f"({points:,} points in {elapsed:.2f}s, scan est. {scan_per_point * points:,.0f}s)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args or [500, 100_000]))
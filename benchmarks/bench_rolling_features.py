@@ -0,0 +1,124 @@
+"""
+Benchmark: rolling-window features (cumulative sums + searchsorted) vs.
+pandas groupby().rolling(), and scaling in rows and vehicles.
+
+    python benchmarks/bench_rolling_features.py                 # 100k, 1M, 5M rows
+    python benchmarks/bench_rolling_features.py 200000 2000000  # custom sizes
+
+The pandas version is only run up to REFERENCE_MAX_ROWS; the event count and
+speed std are compared against it there. fatigue_trend_window and
+minutes_since_harsh_brake are checked at every size against a brute-force
+computation of CHECKED sampled rows, one window at a time, and once more on
+readings spread over LONG_SPAN_DAYS (where slopes from cumulative sums of
+x*x and x*y lose their precision).
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_rules import HARSH_BRAKE_THRESHOLD, detect_events  # noqa: E402
+from rolling_features import DEFAULT_WINDOW, TIMESTAMP_FORMAT, add_rolling_features  # noqa: E402
+
+REFERENCE_MAX_ROWS = 1_000_000
+VEHICLES_PER_ROW = 1 / 500  # ~500 readings per vehicle
+CHECKED = 2000
+LONG_SPAN_DAYS = 365
+
+
+def make_frame(n, seed=0, span_minutes=14 * 60, vehicles=None):
+    rng = np.random.default_rng(seed)
+    vehicles = vehicles or max(1, int(n * VEHICLES_PER_ROW))
+    start = np.datetime64("2025-10-12T06:00")
+    # Unsorted, minute resolution, like telemetry_smart_gadget_alice.csv
+    minutes = rng.integers(0, span_minutes, n)
+    df = pd.DataFrame({
+        "timestamp": pd.Series(start + minutes.astype("timedelta64[m]")).dt.strftime("%d-%m-%Y %H:%M"),
+        "vehicle_id": "V" + pd.Series(rng.integers(0, vehicles, n)).astype(str),
+        "speed": rng.normal(60, 20, n).round(2),
+        "braking": rng.uniform(0, 1.2, n).round(2),
+        "fatigue": rng.uniform(0, 60, n).round(2),
+    })
+    df["event"] = detect_events(df)
+    return df, vehicles
+
+
+def pandas_reference(df):
+    x = df.assign(ts=pd.to_datetime(df["timestamp"], format="%d-%m-%Y %H:%M"),
+                  any_event=(df["event"] != "normal").astype(float), row=np.arange(len(df)))
+    x = x.sort_values(["vehicle_id", "ts", "row"], kind="stable")
+    rolling = x.groupby("vehicle_id").rolling(DEFAULT_WINDOW, on="ts")
+    out = pd.DataFrame({
+        "event_count_window": rolling["any_event"].sum().to_numpy(),
+        "speed_std_window": rolling["speed"].std().to_numpy(),
+    }, index=x["row"].to_numpy())
+    return out.sort_index()
+
+
+def brute_force(df, rows, window=DEFAULT_WINDOW):
+    """fatigue_trend_window and minutes_since_harsh_brake of `rows`, each from its own window's readings."""
+    window_s = pd.Timedelta(window).total_seconds()
+    timestamps = pd.to_datetime(df["timestamp"], format=TIMESTAMP_FORMAT)
+    seconds = timestamps.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    vehicles = pd.factorize(df["vehicle_id"])[0]
+    order = np.lexsort((np.arange(len(df)), seconds, vehicles))
+    position = np.empty(len(df), dtype=np.int64)
+    position[order] = np.arange(len(df))
+    vehicles, t = vehicles[order], seconds[order]
+    fatigue = df["fatigue"].to_numpy(dtype=np.float64)[order]
+    harsh = df["braking"].to_numpy(dtype=np.float64)[order] > HARSH_BRAKE_THRESHOLD
+
+    trend, since = [], []
+    for p in position[rows]:
+        first = np.searchsorted(vehicles, vehicles[p])
+        start = first + np.searchsorted(t[first:p + 1], t[p] - window_s, side="right")
+        x = (t[start:p + 1] - t[p]) / 60.0
+        y = fatigue[start:p + 1]
+        sxx = ((x - x.mean()) ** 2).sum()
+        trend.append(((x - x.mean()) * (y - y.mean())).sum() / sxx if len(x) * sxx > 1e-9 else np.nan)
+        brakes = np.flatnonzero(harsh[first:p + 1])
+        since.append((t[p] - t[first + brakes[-1]]) / 60.0 if len(brakes) else np.nan)
+    return pd.DataFrame({"fatigue_trend_window": trend, "minutes_since_harsh_brake": since})
+
+
+def check_brute_force(df, features, seed=0):
+    rows = np.random.default_rng(seed).choice(len(df), min(CHECKED, len(df)), replace=False)
+    expected = brute_force(df, rows)
+    for column in expected.columns:
+        actual = features[column].to_numpy()[rows]
+        assert np.allclose(actual, expected[column].to_numpy(), equal_nan=True, rtol=1e-9, atol=1e-9), (
+            column, np.nanmax(np.abs(actual - expected[column].to_numpy())))
+
+
+def main(sizes):
+    for n in sizes:
+        df, vehicles = make_frame(n)
+        t0 = time.perf_counter()
+        features = add_rolling_features(df)
+        fast_s = time.perf_counter() - t0
+        line = f"{n:>10,} rows {vehicles:>6,} vehicles  rolling_features {fast_s:7.2f}s ({n / fast_s:>11,.0f} rows/s)"
+
+        if n <= REFERENCE_MAX_ROWS:
+            t0 = time.perf_counter()
+            reference = pandas_reference(df)
+            ref_s = time.perf_counter() - t0
+            for column in reference.columns:
+                assert np.allclose(features[column].to_numpy(), reference[column].to_numpy(),
+                                   equal_nan=True, atol=1e-6), column
+            line += f"  groupby.rolling {ref_s:7.2f}s  speedup {ref_s / fast_s:5.1f}x"
+        check_brute_force(df, features)
+        print(line)
+
+    df, vehicles = make_frame(sizes[0], span_minutes=LONG_SPAN_DAYS * 24 * 60, vehicles=5)
+    check_brute_force(df, add_rolling_features(df))
+    print(f"{sizes[0]:>10,} rows over {LONG_SPAN_DAYS} days, {vehicles} vehicles: fatigue trend and time since "
+          f"harsh brake match brute force on {min(CHECKED, sizes[0])} rows")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000, 5_000_000]
+    main(sizes)
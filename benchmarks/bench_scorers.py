@@ -0,0 +1,79 @@
+"""
+Benchmark: accuracy and throughput of the scoring backends in scorers.py.
+
+    python benchmarks/bench_scorers.py                 # 100k and 1M rows
+    python benchmarks/bench_scorers.py 5000000
+
+The model is fitted on the sample telemetry file as generate_csv() does;
+scaled feature rows are then resampled from it (with noise) to the target
+size. Accuracy is measured against the sklearn forest on the rounded
+risk_score the pipeline writes. Per-call latency is measured on small
+batches, the live-scoring case.
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import risk_model  # noqa: E402
+from risk_score_calc import TELEMETRY_FILE, prepare_telemetry  # noqa: E402
+from scorers import SCORERS, get_scorer  # noqa: E402
+
+LATENCY_BATCHES = [1, 10, 100]
+LATENCY_REPEATS = 200
+
+
+def scaled_features(artifact, n, seed=0):
+    df = prepare_telemetry(pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE)))
+    risk_model.encode_context(df)
+    X = artifact["scaler"].transform(df[artifact["features"]].to_numpy(dtype=np.float64))
+    rng = np.random.default_rng(seed)
+    X = X[rng.integers(0, len(X), n)]
+    return X + np.nan_to_num(rng.normal(0, 0.02, X.shape) * ~np.isnan(X))
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        df = prepare_telemetry(pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE)))
+        artifact = risk_model.fit(df, os.path.join(tmp, "model.joblib"))
+
+    for n in sizes:
+        X = scaled_features(artifact, n)
+        print(f"bulk, {n:,} rows")
+        reference = None
+        for name in SCORERS:
+            t0 = time.perf_counter()
+            scorer = get_scorer(artifact, name)
+            compile_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            risk = np.round(scorer.predict(X), 2)
+            elapsed = time.perf_counter() - t0
+            if reference is None:
+                reference = risk
+            diff = np.abs(risk - reference)
+            print(f"  {name:<12} {elapsed:7.3f}s {n / elapsed:>13,.0f} rows/s  compile {compile_s * 1000:6.1f}ms  "
+                  f"same score {np.mean(diff < 1e-9):6.1%}  MAE {diff.mean():.4f}  max err {diff.max():.2f}")
+
+    X = scaled_features(artifact, max(LATENCY_BATCHES), seed=1)
+    print("per-call latency (mean ms)")
+    for name in SCORERS:
+        scorer = get_scorer(artifact, name)
+        cells = []
+        for batch in LATENCY_BATCHES:
+            t0 = time.perf_counter()
+            for _ in range(LATENCY_REPEATS):
+                scorer.predict(X[:batch])
+            cells.append(f"{batch:>3} rows {(time.perf_counter() - t0) / LATENCY_REPEATS * 1000:7.3f}")
+        print(f"  {name:<12} " + "  ".join(cells))
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,76 @@
+"""
+Benchmark: peak RSS of generate_csv (whole file in memory) vs. the chunked
+streaming pipeline, as the telemetry file grows.
+
+    python benchmarks/bench_streaming.py                  # 100k, 1M, 4M rows
+    python benchmarks/bench_streaming.py 50000 500000     # custom sizes
+
+Inputs are built by tiling the sample telemetry file, with vehicle ids
+suffixed per copy so (timestamp, vehicle_id) stays unique (the traffic merge
+in prepare_telemetry multiplies duplicate keys). Each run happens in a
+fresh subprocess so its peak RSS (ru_maxrss) is measured in isolation.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from risk_score_calc import TELEMETRY_FILE, fit  # noqa: E402
+
+CHILD = """
+import resource, sys
+sys.path.insert(0, {root!r})
+mode, telemetry, output, artifact = sys.argv[1:5]
+if mode == "full":
+    from risk_score_calc import generate_csv
+    generate_csv(artifact_path=artifact, telemetry_path=telemetry, output_path=output, output_format="csv")
+else:
+    from stream_scoring import generate_csv_streaming
+    generate_csv_streaming(telemetry, output, artifact, chunksize=int(mode.split(":")[1]))
+print("MAXRSS_KB", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def build_input(path, rows):
+    sample = pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE))
+    repeats = -(-rows // len(sample))
+    with open(path, "w") as f:
+        for i in range(repeats):
+            tile = sample.assign(vehicle_id=sample["vehicle_id"] + f"_{i}")
+            tile.to_csv(f, index=False, header=i == 0)
+
+
+def run(mode, telemetry, output, artifact):
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT), mode, telemetry, output, artifact],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    elapsed = time.perf_counter() - t0
+    maxrss_kb = int(next(line for line in out.splitlines() if line.startswith("MAXRSS_KB")).split()[1])
+    return elapsed, maxrss_kb / 1024
+
+
+def main(sizes, chunksize=100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, "risk_model.joblib")
+        fit(os.path.join(ROOT, TELEMETRY_FILE), artifact)
+        print(f"{'rows':>12} {'input MB':>9} {'full s':>8} {'full RSS MB':>12} {'stream s':>9} {'stream RSS MB':>14}")
+        for rows in sizes:
+            telemetry = os.path.join(tmp, f"telemetry_{rows}.csv")
+            build_input(telemetry, rows)
+            full_s, full_mb = run("full", telemetry, os.path.join(tmp, "full.csv"), artifact)
+            stream_s, stream_mb = run(f"stream:{chunksize}", telemetry, os.path.join(tmp, "stream.csv"), artifact)
+            size_mb = os.path.getsize(telemetry) / 2**20
+            print(f"{rows:>12,} {size_mb:>9.1f} {full_s:>8.1f} {full_mb:>12.0f} {stream_s:>9.1f} {stream_mb:>14.0f}")
+            os.remove(telemetry)
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000, 4_000_000])
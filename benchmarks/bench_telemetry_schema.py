@@ -0,0 +1,81 @@
+"""
+Benchmark: memory and filter/groupby time of telemetry loaded with plain
+pd.read_csv vs. the typed schema in telemetry_schema.py.
+
+    python benchmarks/bench_telemetry_schema.py            # 1M rows
+    python benchmarks/bench_telemetry_schema.py 200000     # custom size
+
+The sample telemetry is tiled to the requested size (with ~500 rows per
+vehicle id) and written to a temporary CSV, which both readers load.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from risk_score_calc import TELEMETRY_FILE  # noqa: E402
+from telemetry_schema import read_telemetry, unknown_categories  # noqa: E402
+
+ROWS_PER_VEHICLE = 500
+REPEATS = 5
+
+
+def make_csv(n, path):
+    sample = pd.read_csv(os.path.join(ROOT, TELEMETRY_FILE))
+    df = sample.iloc[np.arange(n) % len(sample)].reset_index(drop=True)
+    df["vehicle_id"] = "V" + pd.Series(np.arange(n) // ROWS_PER_VEHICLE).astype(str)
+    df.to_csv(path, index=False)
+
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def workload(df):
+    return {
+        "filter weather": timed(lambda: df[df["weather"] == "rain"]),
+        "filter vehicle": timed(lambda: df[df["vehicle_id"] == "V42"]),
+        "groupby vehicle": timed(lambda: df.groupby("vehicle_id", observed=True)["speed"].mean()),
+        "groupby road/weather": timed(
+            lambda: df.groupby(["road_type", "weather"], observed=True)["stress_level"].mean()),
+    }
+
+
+def main(n=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "telemetry.csv")
+        make_csv(n, path)
+        t0 = time.perf_counter()
+        raw = pd.read_csv(path)
+        raw_read = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        typed = read_telemetry(path)
+        typed_read = time.perf_counter() - t0
+
+    raw_bytes = raw.memory_usage(deep=True).sum()
+    typed_bytes = typed.memory_usage(deep=True).sum()
+    print(f"{n:,} rows")
+    print(f"  {'':<22}{'raw':>12}{'typed':>12}")
+    print(f"  {'read_csv':<22}{raw_read:>11.2f}s{typed_read:>11.2f}s")
+    print(f"  {'memory':<22}{raw_bytes / 2**20:>9.0f} MB{typed_bytes / 2**20:>9.0f} MB")
+    print(f"  {'bytes/row':<22}{raw_bytes / n:>12.0f}{typed_bytes / n:>12.0f}")
+    raw_times, typed_times = workload(raw), workload(typed)
+    for name in raw_times:
+        print(f"  {name:<22}{raw_times[name] * 1000:>10.1f}ms{typed_times[name] * 1000:>10.1f}ms"
+              f"  ({raw_times[name] / typed_times[name]:.1f}x)")
+    print(f"  unknown categories: {unknown_categories(typed)}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
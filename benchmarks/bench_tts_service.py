@@ -0,0 +1,104 @@
+"""
+Benchmark: nudge audio the old way (synchronous synthesis into a fresh
+NamedTemporaryFile per alert) vs. tts_service.TTSService, with the offline
+stub backend standing in for gTTS.
+
+    python benchmarks/bench_tts_service.py                  # 40 alerts, 3 views each
+    python benchmarks/bench_tts_service.py --alerts 100 --latency 1.0
+
+Alerts are the first rows of the fused output, each with a nudge text that
+is the same for the same vehicle and binned context (as the nudge cache
+makes it). Every alert is shown `--views` times, as it is when several
+sessions watch the fleet or a widget click reruns the script. Reported: how
+long the render path waits for audio, synthesis calls, and the disk left
+behind.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fusion_store import read_fusion  # noqa: E402
+from nudge_cache import context_signature  # noqa: E402
+from tts_service import AudioCache, StubTTSBackend, TTSService  # noqa: E402
+
+RENDER_SECONDS = 0.05    # rest of the page (map, rest area) drawn while audio is synthesized
+
+
+def alert_texts(alerts):
+    df = read_fusion().head(alerts)
+    return [
+        f"Vehicle {row.vehicle_id}: slow down and take a break soon. "
+        f"({context_signature(row.risk_score, row.stress_level, row.weather, row.road_type, row.traffic_density, row.event)})"
+        for row in df.itertuples()
+    ]
+
+
+def old_path(texts, backend, tmp_dir):
+    waited = 0.0
+    for text in texts:
+        t0 = time.perf_counter()
+        data = backend.synthesize(text)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3", dir=tmp_dir) as f:
+            f.write(data)
+        waited += time.perf_counter() - t0
+        time.sleep(RENDER_SECONDS)
+    return waited
+
+
+def new_path(texts, service):
+    waited = 0.0
+    for text in texts:
+        t0 = time.perf_counter()
+        future = service.submit(text)
+        waited += time.perf_counter() - t0
+        time.sleep(RENDER_SECONDS)
+        t0 = time.perf_counter()
+        future.result()
+        waited += time.perf_counter() - t0
+    return waited
+
+
+def disk_bytes(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--alerts", type=int, default=40)
+    parser.add_argument("--views", type=int, default=3, help="times each alert is rendered")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub synthesis time per call")
+    parser.add_argument("--max-bytes", type=int, default=2**20, help="audio cache size cap")
+    args = parser.parse_args()
+
+    distinct = alert_texts(args.alerts)
+    texts = [text for text in distinct for _ in range(args.views)]
+    print(f"{len(distinct)} alerts ({len(set(distinct))} distinct nudge texts) x {args.views} views, "
+          f"{args.latency}s per synthesis, {RENDER_SECONDS}s page render")
+    work = tempfile.mkdtemp(prefix="bench-tts-")
+    try:
+        backend = StubTTSBackend(args.latency)
+        old_dir = os.path.join(work, "old")
+        os.makedirs(old_dir)
+        waited = old_path(texts, backend, old_dir)
+        print(f"  gTTS + temp files  waited {waited:6.2f}s  syntheses {backend.calls:4d}  "
+              f"disk {disk_bytes(old_dir) / 2**10:7.0f} KB in {len(os.listdir(old_dir))} files (never removed)")
+
+        backend = StubTTSBackend(args.latency)
+        service = TTSService(backend, AudioCache(os.path.join(work, "tts"), max_bytes=args.max_bytes))
+        waited = new_path(texts, service)
+        stats = service.stats()
+        print(f"  TTSService         waited {waited:6.2f}s  syntheses {backend.calls:4d}  "
+              f"disk {disk_bytes(service.cache.directory) / 2**10:7.0f} KB (cap {args.max_bytes / 2**10:.0f} KB, "
+              f"{stats['evictions']} evictions, hit rate {stats['hit_rate']:.0%})")
+        service.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Benchmark suite: the scoring pipeline and the dashboard query paths on
+synthetic fleets of 10k, 1M and 10M readings, with results saved for
+comparison between versions.
+
+    python benchmarks/benchmark_suite.py                          # 10k, 1M, 10M rows
+    python benchmarks/benchmark_suite.py --sizes 10000 1000000
+    python benchmarks/benchmark_suite.py --compare benchmarks/results/A.json benchmarks/results/B.json
+
+Data comes from synthetic_data.write_fleet() with a fixed seed, and every
+size is scored with one model fitted on the sample telemetry, so runs on
+different versions see the same inputs. Each size runs in its own
+subprocess, so peak RSS is that size's alone. Sizes from STREAMING_MIN_ROWS
+up are scored with stream_scoring.generate_csv_streaming() (bounded-memory
+chunks, CSV output only) rather than generate_csv(), which loads the whole
+file; --scoring full/streaming picks one path for every size. Recorded per
+size:
+
+* pipeline: the scoring path and every generate_csv() stage (load_csv ...
+  write_parquet, see profiling.py; summed over chunks when streaming) with
+  seconds, rows/s and peak RSS;
+* dashboard: reading and indexing PolicyTransactions, reading the fused
+  output, per-policy lookups (p50/p99; telemetry through the same
+  partition-filtered read_fusion() the dashboard uses), the nudge UI's
+  high-risk read_fusion() filter, and the nearest rest area for every reading with stress above 70
+  (batch, and p50/p99 of single lookups, over synthetic rest areas).
+
+Results go to benchmarks/results/<utc time>-<git rev>.json; --compare
+prints the rows/s ratio per stage and the latency change between two files.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+import profiling  # noqa: E402
+import risk_score_calc  # noqa: E402
+import scorers  # noqa: E402
+import stream_scoring  # noqa: E402
+from bench_rest_areas import make_rest_areas  # noqa: E402
+from fusion_store import default_format, read_fusion  # noqa: E402
+from policy_index import PolicyIndex  # noqa: E402
+from rest_areas import RestAreaIndex  # noqa: E402
+from synthetic_data import write_fleet  # noqa: E402
+from telemetry_schema import read_policy_transactions  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SEED = 0
+LOOKUPS = 200
+REST_AREAS = 500
+STREAMING_MIN_ROWS = 2_000_000
+SCORING_PATHS = ["auto", "full", "streaming"]
+# Same columns/filters as streamlit_nudge_ui_v2.py
+NUDGE_COLUMNS = [
+    'timestamp', 'driver_name', 'vehicle_id', 'gps_lat', 'gps_lon', 'weather', 'road_type',
+    'risk_score', 'traffic_density', 'stress_level', 'heart_rate', 'gsr', 'fatigue', 'event'
+]
+NUDGE_FILTERS = [("risk_score", ">=", 0.85), ("stress_level", ">=", 65)]
+
+
+def _stage_dict(stage):
+    return {"stage": stage.name, "seconds": round(stage.seconds, 6), "rows": stage.rows,
+            "rows_per_s": None if stage.rows_per_s is None else round(stage.rows_per_s, 1),
+            "peak_rss_bytes": stage.peak_rss_bytes}
+
+
+def _merged_stages(stages):
+    """One entry per stage name, in first-seen order; a streamed run repeats each stage per chunk."""
+    merged = {}
+    for stage in stages:
+        entry = merged.setdefault(stage.name, {"stage": stage.name, "seconds": 0.0, "rows": None,
+                                               "rows_per_s": None, "peak_rss_bytes": None})
+        entry["seconds"] += stage.seconds
+        if stage.rows is not None:
+            entry["rows"] = (entry["rows"] or 0) + stage.rows
+        if stage.peak_rss_bytes is not None:
+            entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"] or 0, stage.peak_rss_bytes)
+    for entry in merged.values():
+        if entry["rows"] is not None and entry["seconds"] > 0:
+            entry["rows_per_s"] = round(entry["rows"] / entry["seconds"], 1)
+        entry["seconds"] = round(entry["seconds"], 6)
+    return list(merged.values())
+
+
+def _latencies(fn, args):
+    samples = []
+    for arg in args:
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t0)
+    ms = np.array(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 4), "p99_ms": round(float(np.percentile(ms, 99)), 4),
+            "samples": len(samples)}
+
+
+def run_size(rows, workdir, artifact_path, backend, scoring="auto"):
+    """Benchmark one size in this process; returns its result dict."""
+    if scoring == "auto":
+        scoring = "streaming" if rows >= STREAMING_MIN_ROWS else "full"
+    result = {"rows": rows, "scoring": scoring}
+    with profiling.stage("generate_data") as s:
+        data = write_fleet(workdir, rows=rows, seed=SEED)
+        s.rows = data["rows"]
+    result.update(vehicles=data["vehicles"], policies=data["policy_count"],
+                  telemetry_bytes=os.path.getsize(data["telemetry"]))
+
+    # Pipeline
+    csv_path = os.path.join(workdir, "fleet_context_fusion.csv")
+    parquet_path = os.path.join(workdir, "fleet_context_fusion.parquet")
+    t0 = time.perf_counter()
+    with profiling.PROFILER.capture() as pipeline, redirect_stdout(open(os.devnull, "w")):
+        if scoring == "streaming":
+            stream_scoring.generate_csv_streaming(data["telemetry"], csv_path, artifact_path, backend=backend)
+        else:
+            risk_score_calc.generate_csv(artifact_path=artifact_path, telemetry_path=data["telemetry"],
+                                         output_path=csv_path, output_format=default_format(),
+                                         parquet_path=parquet_path, backend=backend)
+    result["pipeline"] = _merged_stages(pipeline)
+    result["pipeline_seconds"] = round(time.perf_counter() - t0, 6)
+
+    # Dashboard query paths
+    with profiling.PROFILER.capture() as dashboard:
+        with profiling.stage("read_policies") as s:
+            transactions = read_policy_transactions(data["policies"])
+            s.rows = len(transactions)
+        with profiling.stage("policy_index_build", rows=len(transactions)):
+            policy_index = PolicyIndex.build(transactions, "POL_NO")
+        with profiling.stage("read_fusion") as s:
+            fused = read_fusion(path=parquet_path, csv_path=csv_path)
+            s.rows = len(fused)
+        # The UI suggests a rest area for readings with stress above 70
+        stressed = fused.loc[fused["stress_level"] > 70, ["gps_lat", "gps_lon"]].to_numpy()
+        del fused
+        with profiling.stage("nudge_filter") as s:
+            flagged = read_fusion(columns=NUDGE_COLUMNS, filters=NUDGE_FILTERS, path=parquet_path,
+                                  csv_path=csv_path)
+            s.rows = len(flagged)
+        rest_index = RestAreaIndex(make_rest_areas(REST_AREAS, np.random.default_rng(SEED)))
+        with profiling.stage("rest_area_batch", rows=len(stressed)):
+            rest_index.nearest_batch(stressed[:, 0], stressed[:, 1])
+    result["dashboard"] = [_stage_dict(s) for s in dashboard]
+
+    rng = np.random.default_rng(SEED)
+    queries = [str(p) for p in rng.choice(transactions["POL_NO"].unique(), LOOKUPS)]
+    points = stressed[:LOOKUPS]
+    result["latency"] = {
+        "policy_filter": _latencies(policy_index.lookup, queries),
+        "driver_filter": _latencies(lambda q: read_fusion(filters=[("policy_number", "==", int(q))],
+                                                          path=parquet_path, csv_path=csv_path), queries),
+        "rest_area_lookup": _latencies(lambda p: rest_index.nearest(*p), points) if len(points) else None,
+    }
+    result["peak_rss_bytes"] = profiling.peak_rss_bytes()
+    return result
+
+
+def _git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return rev + ("-dirty" if dirty else "")
+
+
+def _environment():
+    import sklearn
+    env = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+           "pandas": pd.__version__, "numpy": np.__version__, "sklearn": sklearn.__version__}
+    try:
+        import pyarrow
+        env["pyarrow"] = pyarrow.__version__
+    except ImportError:
+        env["pyarrow"] = None
+    return env
+
+
+def run_suite(sizes, backend=scorers.DEFAULT_BACKEND, out_path=None, scoring="auto"):
+    revision = _git_revision()
+    results = {"created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git_revision": revision,
+               "backend": backend, "seed": SEED, "environment": _environment(), "sizes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact_path = os.path.join(tmp, "risk_model.joblib")
+        risk_score_calc.fit(os.path.join(ROOT, risk_score_calc.TELEMETRY_FILE), artifact_path=artifact_path)
+        for rows in sizes:
+            workdir = os.path.join(tmp, str(rows))
+            result_file = os.path.join(tmp, f"{rows}.json")
+            print(f"{rows:,} rows ...", flush=True)
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-one", str(rows),
+                                   "--workdir", workdir, "--artifact", artifact_path, "--backend", backend,
+                                   "--scoring", scoring, "--result-file", result_file])
+            if proc.returncode != 0:
+                results["sizes"][str(rows)] = {"rows": rows, "error": f"exit code {proc.returncode}"}
+                print(f"  failed with exit code {proc.returncode}")
+                continue
+            with open(result_file) as f:
+                results["sizes"][str(rows)] = result = json.load(f)
+            print_size(result)
+
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out_path = os.path.join(RESULTS_DIR, f"{stamp}-{revision}.json")
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {out_path}")
+    return out_path
+
+
+def print_size(result):
+    print(f"  {result['vehicles']:,} vehicles, {result['policies']:,} policies, "
+          f"{result.get('scoring', 'full')} scoring, peak RSS {result['peak_rss_bytes'] / 2**20:,.0f} MB")
+    for stage in result["pipeline"] + result["dashboard"]:
+        rate = "" if stage["rows_per_s"] is None else f"{stage['rows_per_s']:>14,.0f} rows/s"
+        print(f"    {stage['stage']:<20}{stage['seconds']:>10.3f}s{rate}")
+    for name, latency in result["latency"].items():
+        if latency:
+            print(f"    {name:<20} p50 {latency['p50_ms']:8.3f} ms  p99 {latency['p99_ms']:8.3f} ms")
+
+
+def _by_stage(result):
+    rates = {}
+    for stage in result.get("pipeline", []) + result.get("dashboard", []):
+        rates.setdefault(stage["stage"], stage)
+    return rates
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old['git_revision']} ({old['created_at']})  new: {new['git_revision']} ({new['created_at']})")
+    for size in old["sizes"]:
+        if size not in new["sizes"]:
+            continue
+        before, after = old["sizes"][size], new["sizes"][size]
+        print(f"{int(size):,} rows" + ("" if before.get("scoring") == after.get("scoring") else
+                                       f" (scoring {before.get('scoring', 'full')} -> {after.get('scoring', 'full')})"))
+        if "error" in before or "error" in after:
+            print(f"  old: {before.get('error', 'ok')}  new: {after.get('error', 'ok')}")
+            continue
+        old_stages, new_stages = _by_stage(before), _by_stage(after)
+        for name in old_stages:
+            if name in new_stages and old_stages[name]["rows_per_s"] and new_stages[name]["rows_per_s"]:
+                a, b = old_stages[name]["rows_per_s"], new_stages[name]["rows_per_s"]
+                print(f"  {name:<20}{a:>14,.0f} -> {b:>14,.0f} rows/s  ({b / a:5.2f}x)")
+        for name, latency in before["latency"].items():
+            if latency and after["latency"].get(name):
+                a, b = latency["p50_ms"], after["latency"][name]["p50_ms"]
+                print(f"  {name:<20}{a:>11.3f} -> {b:>11.3f} ms p50   ({a / b if b else float('inf'):5.2f}x)")
+        a, b = before["peak_rss_bytes"], after["peak_rss_bytes"]
+        print(f"  {'peak RSS':<20}{a / 2**20:>11,.0f} -> {b / 2**20:>11,.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scoring and dashboard queries on synthetic fleets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="telemetry rows per run")
+    parser.add_argument("--backend", choices=sorted(scorers.SCORERS), default=scorers.DEFAULT_BACKEND)
+    parser.add_argument("--scoring", choices=SCORING_PATHS, default="auto",
+                        help=f"scoring path (auto: streaming from {STREAMING_MIN_ROWS:,} rows)")
+    parser.add_argument("--output", default=None, help="results file (default: benchmarks/results/...)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    # Internal: one size in a fresh process
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--artifact", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")  # unknown-category / all-NaN weather warnings on every run
+    if args.compare:
+        compare(*args.compare)
+    elif args.run_one:
+        size_result = run_size(args.run_one, args.workdir, args.artifact, args.backend, args.scoring)
+        with open(args.result_file, "w") as f:
+            json.dump(size_result, f)
+    else:
+        run_suite(args.sizes, args.backend, args.output, args.scoring)
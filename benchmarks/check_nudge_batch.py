@@ -0,0 +1,92 @@
+"""
+Correctness check and timing for drivebuddy_nudges.py against the local LLM
+stub.
+
+    python benchmarks/check_nudge_batch.py
+    python benchmarks/check_nudge_batch.py --latency 0.2 --batch-size 20
+
+Every row of the fused output is treated as flagged. A first run is
+"crashed" (an exception from the progress callback) after a few batches,
+with the stub rate limiting every 7th request so the gateway's retries are
+exercised. The resumed run must generate exactly the rows that had no nudge
+yet, and every row must then have one, found under the key the UI computes
+from the row the alert dispatcher reads. The nudge cache is off, so the stub
+sees no request for rows already stored (rows of one batch that share a
+context signature share one request). Then the time for the whole batch at
+concurrency 1 and 8.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drivebuddy_nudges import NudgeStore, generate_batch, row_key  # noqa: E402
+from fusion_store import FUSION_CSV, read_fusion  # noqa: E402
+from llm_gateway import LLMGateway, make_client  # noqa: E402
+from llm_stub_server import start_stub_server  # noqa: E402
+from nudges import NUDGE_FIELDS  # noqa: E402
+from telemetry_schema import read_fusion_csv  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Crash(Exception):
+    pass
+
+
+def run(df, store_path, latency, concurrency, batch_size, rate_limit_every=0, crash_after=None):
+    server = start_stub_server(latency=latency, rate_limit_every=rate_limit_every)
+    llm = LLMGateway(make_client(base_url=server.url), max_concurrency=concurrency, backoff_base=0.01)
+    batches = []
+
+    def progress(summary):
+        batches.append(dict(summary))
+        if crash_after is not None and len(batches) == crash_after:
+            raise Crash
+
+    try:
+        summary = generate_batch(llm, df, NudgeStore(store_path), batch_size=batch_size, progress=progress)
+    except Crash:
+        summary = batches[-1]
+    finally:
+        llm.close()
+        server.shutdown()
+    return summary, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per completion")
+    args = parser.parse_args()
+
+    df = read_fusion(columns=NUDGE_FIELDS)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "nudges.sqlite3")
+        crashed, server = run(df, store_path, 0.0, 8, args.batch_size, rate_limit_every=7, crash_after=3)
+        assert crashed["generated"] == 3 * args.batch_size, crashed
+        resumed, server = run(df, store_path, 0.0, 8, args.batch_size)
+        remaining = len(df) - crashed["generated"]
+        assert resumed["already_done"] == crashed["generated"], resumed
+        assert resumed["generated"] == remaining and resumed["failed"] == 0, resumed
+        assert 0 < server.requests <= remaining, server.requests
+        print(f"crash after {crashed['generated']} rows (stub 429 every 7th request), resume generated "
+              f"the other {resumed['generated']} in {server.requests} stub requests: OK")
+
+        store = NudgeStore(store_path)
+        dispatched = read_fusion_csv(os.path.join(ROOT, FUSION_CSV)).to_dict("records")
+        missing = [row for row in dispatched if store.get(row_key(row)) is None]
+        assert not missing, f"{len(missing)} rows without a stored nudge, e.g. {missing[0]}"
+        print(f"all {len(dispatched)} rows found under the UI's keys: OK")
+
+        for concurrency in (1, 8):
+            summary, _ = run(df, os.path.join(tmp, f"timing-{concurrency}.sqlite3"), args.latency,
+                             concurrency, args.batch_size)
+            print(f"  concurrency {concurrency}: {summary['generated']} nudges in {summary['seconds']:.2f}s "
+                  f"({summary['generated'] / summary['seconds']:.0f}/s, {args.latency}s per completion)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Context enrichment: attach traffic (and later weather or road) context to
+telemetry readings.
+
+prepare_telemetry() used to build a traffic frame from a copy of
+telemetry_df[['timestamp', 'vehicle_id']] and merge it back on those keys.
+That is a hash join of the whole frame on non-unique keys: two readings of
+one vehicle in the same minute came out as four rows. enrich() instead asks
+each provider for one value per reading, aligned with the frame's rows, and
+assigns the columns in place, so the output always has exactly the input's
+rows in the input's order and nothing but the looked-up columns is copied.
+
+A provider has a `columns` tuple and a lookup(df) method returning
+{column: array of len(df)}. Three come with the repo:
+
+* SimulatedTrafficProvider   random low/medium/high labels, the stand-in for
+                             a live feed (same draws as the old merge when
+                             keys are unique)
+* KeyedContextProvider       exact lookups in a local table on key columns
+                             (e.g. road context per vehicle_id); the table's
+                             keys must be unique
+* TrafficTableProvider       as-of join on a local traffic table: the latest
+                             observation in the reading's location cell no
+                             older than `tolerance`, falling back to another
+                             provider for readings with no observation
+
+    providers = [TrafficTableProvider.from_csv("traffic.csv", fallback=SimulatedTrafficProvider())]
+    generate_csv(providers=providers)
+"""
+import numpy as np
+import pandas as pd
+
+from telemetry_schema import TIMESTAMP_FORMAT, parse_dates
+
+TRAFFIC_LEVELS = ['low', 'medium', 'high']
+DEFAULT_CELL_DEGREES = 0.01      # ~1.1 km north-south
+DEFAULT_TOLERANCE = "15min"
+
+
+class SimulatedTrafficProvider:
+    """
+    Random traffic labels, one per reading, drawn from `rng` (a RandomState;
+    default seeded with 42). Passing the same state across consecutive
+    slices gives the labels of one pass over the whole file.
+    """
+
+    columns = ("traffic_density",)
+
+    def __init__(self, rng=None, levels=TRAFFIC_LEVELS):
+        self.rng = np.random.RandomState(42) if rng is None else rng
+        self.levels = list(levels)
+
+    def lookup(self, df):
+        # Same draws as rng.choice(levels, size) (which is randint underneath),
+        # as a categorical instead of one string object per reading
+        codes = self.rng.randint(0, len(self.levels), size=len(df))
+        return {"traffic_density": pd.Categorical.from_codes(codes, self.levels)}
+
+
+class KeyedContextProvider:
+    """Exact lookups of `columns` in `table` on the `keys` columns; readings without a match get NaN."""
+
+    def __init__(self, table, keys, columns):
+        self.keys = list(keys)
+        self.columns = tuple(columns)
+        index = pd.MultiIndex.from_frame(table[self.keys])
+        if not index.is_unique:
+            duplicated = index[index.duplicated()].unique()[:5].tolist()
+            raise ValueError(f"Context table has duplicate keys {self.keys}, e.g. {duplicated}; "
+                             f"each reading must match at most one row")
+        self._index = index
+        self._values = {column: table[column].to_numpy() for column in self.columns}
+
+    def lookup(self, df):
+        positions = self._index.get_indexer(pd.MultiIndex.from_frame(df[self.keys]))
+        return {column: _take(values, positions) for column, values in self._values.items()}
+
+
+class TrafficTableProvider:
+    """
+    As-of join of readings against observed traffic: for each reading, the
+    most recent observation at or before its timestamp in the same
+    `cell_degrees` grid cell, at most `tolerance` old. Readings with no such
+    observation get `fallback`'s value (a provider), or NaN without one.
+
+    `table` needs timestamp, gps_lat, gps_lon and traffic_density columns;
+    several observations per cell and time are fine (the last one wins).
+    """
+
+    columns = ("traffic_density",)
+
+    def __init__(self, table, cell_degrees=DEFAULT_CELL_DEGREES, tolerance=DEFAULT_TOLERANCE, fallback=None):
+        self.cell_degrees = cell_degrees
+        self.tolerance = pd.Timedelta(tolerance)
+        self.fallback = fallback
+        times = _times(table["timestamp"])
+        observed = pd.DataFrame({
+            "time": times,
+            "cell": self._cells(table["gps_lat"], table["gps_lon"]),
+            "traffic_density": table["traffic_density"].to_numpy(),
+        })
+        observed = observed[observed["time"].notna()]
+        # merge_asof needs the `on` key sorted; stable, so later rows win ties
+        self._observed = observed.sort_values("time", kind="stable").reset_index(drop=True)
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        return cls(pd.read_csv(path), **kwargs)
+
+    def _cells(self, lat, lon):
+        lat_cell = np.floor(np.asarray(lat, dtype=np.float64) / self.cell_degrees)
+        lon_cell = np.floor(np.asarray(lon, dtype=np.float64) / self.cell_degrees)
+        lon_cells = np.ceil(360 / self.cell_degrees) + 1
+        # One int64 per cell; NaN coordinates map to -1, which no observation has
+        cells = lat_cell * lon_cells + lon_cell
+        return np.where(np.isnan(cells), -1, cells).astype(np.int64)
+
+    def lookup(self, df):
+        n = len(df)
+        readings = pd.DataFrame({
+            "time": _times(df["timestamp"]),
+            "cell": self._cells(df["gps_lat"], df["gps_lon"]),
+            "row": np.arange(n),
+        })
+        readings = readings[readings["time"].notna()].sort_values("time", kind="stable")
+        matched = pd.merge_asof(readings, self._observed, on="time", by="cell", direction="backward",
+                                tolerance=self.tolerance)
+        # merge_asof returns exactly one row per reading
+        values = np.full(n, np.nan, dtype=object)
+        values[matched["row"].to_numpy()] = matched["traffic_density"].to_numpy()
+        missing = pd.isna(values)
+        if self.fallback is not None and missing.any():
+            rows = np.flatnonzero(missing)
+            values[rows] = self.fallback.lookup(df.iloc[rows])["traffic_density"]
+        return {"traffic_density": values}
+
+
+def _times(values):
+    """Timestamps as datetime64, parsing the telemetry text format when needed."""
+    return parse_dates(pd.DataFrame({"t": values}), {"t": TIMESTAMP_FORMAT})["t"].to_numpy()
+
+
+def _take(values, positions):
+    out = values.take(positions, mode="clip")
+    if (positions < 0).any():
+        out = out.astype(object) if out.dtype.kind not in "fc" else out.astype(np.float64)
+        out[positions < 0] = np.nan
+    return out
+
+
+def enrich(df, providers):
+    """
+    Add each provider's columns to df in place and return df. The row count
+    and order never change; a provider returning a different number of
+    values raises ValueError.
+    """
+    for provider in providers:
+        values = provider.lookup(df)
+        for column in provider.columns:
+            column_values = values[column]
+            if len(column_values) != len(df):
+                raise ValueError(f"{type(provider).__name__} returned {len(column_values)} values "
+                                 f"for {column!r}, expected one per reading ({len(df)})")
+            df[column] = column_values
+    return df
@@ -0,0 +1,200 @@
+"""
+drivebuddy-nudges: generate the nudges for every flagged row, headless.
+
+The UI generates a nudge for one row at a time as the page reruns. This
+command takes the same rows (nudges.NUDGE_FILTERS: risk_score >= 0.85 and
+stress_level >= 65) from the published fused data and, for each one, looks
+up the nearest rest area, builds the prompt and generates the nudge, in
+batches of `--batch-size` rows sent through the LLM gateway with at most
+`--concurrency` completions in flight:
+
+    python drivebuddy_nudges.py                          # published data, Groq (GROQ_API_KEY)
+    python drivebuddy_nudges.py --stub --stub-latency 0.3
+    python drivebuddy_nudges.py --llm-url http://127.0.0.1:8808 --concurrency 16
+
+Results go to a small SQLite store (.cache/nudge_results.sqlite3), one row
+per reading keyed by row_key(), a hash of the reading's nudge fields (the
+same from the CSV and the Parquet copy), so a rescored reading gets a new
+nudge. Each batch is committed as it finishes:
+a crashed or interrupted run resumes with the rows that have no nudge yet,
+and failed rows (stored with their error) are retried on the next run. The
+UI shows the stored nudge for an alert when there is one.
+
+--stub starts llm_stub_server.py in-process, so the whole command runs
+without network (add --no-rest-areas, or set DRIVEBUDDY_REST_AREAS to a
+local file, to skip the rest-area download too).
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from fusion_store import read_fusion
+from llm_gateway import LLMGateway, make_client
+from nudge_cache import NudgeCache, SqliteNudgeBackend
+from nudges import NUDGE_FIELDS, NUDGE_FILTERS, precompute_nudges_sync, rest_areas_for
+import profiling
+
+STORE_PATH = os.path.join(".cache", "nudge_results.sqlite3")
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_CONCURRENCY = 8
+_SQLITE_VARIABLES = 500
+
+
+def row_key(row):
+    """Stable key of one reading's nudge inputs (a dict or Series with NUDGE_FIELDS)."""
+    parts = []
+    for field in NUDGE_FIELDS:
+        value = row.get(field)
+        if value is None or pd.isna(value):
+            value = ""      # NaN from CSV, None from Parquet
+        elif field == "timestamp":
+            value = pd.Timestamp(value).isoformat()
+        elif isinstance(value, float):
+            value = format(value, ".6g")    # float32 in the CSV, float64 in Parquet
+        parts.append(str(value))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+class NudgeStore:
+    """Generated nudges per reading, in one SQLite file the UI reads."""
+
+    def __init__(self, path=STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nudges (key TEXT PRIMARY KEY, vehicle_id TEXT, driver_name TEXT, "
+                "timestamp TEXT, risk_score REAL, stress_level REAL, rest_area TEXT, nudge TEXT, error TEXT, "
+                "created_at REAL)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+        return conn
+
+    def get(self, key):
+        """Stored nudge text for `key`, or None (also for rows that failed)."""
+        row = self._conn().execute("SELECT nudge FROM nudges WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def done_keys(self, keys):
+        """The subset of `keys` that already have a nudge."""
+        keys = list(keys)
+        done = set()
+        for start in range(0, len(keys), _SQLITE_VARIABLES):
+            chunk = keys[start:start + _SQLITE_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            done.update(key for (key,) in self._conn().execute(
+                f"SELECT key FROM nudges WHERE nudge IS NOT NULL AND key IN ({placeholders})", chunk))
+        return done
+
+    def put_many(self, records):
+        """Store (key, row, rest_area_name, nudge, error) tuples in one transaction: the checkpoint."""
+        now = time.time()
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO nudges VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+                (key, str(row["vehicle_id"]), str(row["driver_name"]), str(row["timestamp"]),
+                 float(row["risk_score"]), float(row["stress_level"]), rest_area, nudge, error, now)
+                for key, row, rest_area, nudge, error in records
+            ])
+
+    def counts(self):
+        nudges, errors = self._conn().execute(
+            "SELECT COUNT(nudge), COUNT(*) - COUNT(nudge) FROM nudges").fetchone()
+        return {"nudges": nudges, "errors": errors}
+
+
+def generate_batch(llm, df, store, rest_index=None, cache=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Generate and store a nudge for every row of `df` that has none in
+    `store` yet, `batch_size` rows per checkpoint. Returns a summary dict.
+    `progress(summary)` is called after each committed batch.
+    """
+    t0 = time.perf_counter()
+    rows = df[NUDGE_FIELDS].reset_index(drop=True)
+    keys = [row_key(row) for row in rows.to_dict("records")]
+    done = store.done_keys(keys)
+    todo, seen = [], set(done)
+    for position, key in enumerate(keys):
+        if key not in seen:
+            seen.add(key)
+            todo.append(position)
+
+    summary = {"flagged": len(rows), "already_done": len(rows) - len(todo), "generated": 0, "failed": 0}
+    for start in range(0, len(todo), batch_size):
+        chunk = rows.iloc[todo[start:start + batch_size]]
+        with profiling.stage("nudge_batch", rows=len(chunk)):
+            rest_areas = rest_areas_for(chunk, rest_index)
+            results = precompute_nudges_sync(llm, chunk, rest_index, cache, rest_areas)
+            records = []
+            for position, row, rest_area, result in zip(chunk.index, chunk.to_dict("records"), rest_areas,
+                                                        results):
+                failed = isinstance(result, Exception)
+                records.append((keys[position], row, None if rest_area is None else rest_area["name"],
+                                None if failed else result, str(result) if failed else None))
+                summary["failed" if failed else "generated"] += 1
+            store.put_many(records)
+        if progress is not None:
+            progress(summary)
+    summary["seconds"] = round(time.perf_counter() - t0, 3)
+    return summary
+
+
+def _rest_index():
+    import rest_areas
+
+    return rest_areas.RestAreaIndex(rest_areas.load_rest_areas())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="drivebuddy-nudges",
+                                     description="Generate and store nudges for every flagged row.")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per checkpoint")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="LLM calls in flight")
+    parser.add_argument("--llm-url", default=None, help="OpenAI-compatible base URL (default: Groq)")
+    parser.add_argument("--stub", action="store_true", help="use an in-process llm_stub_server")
+    parser.add_argument("--stub-latency", type=float, default=0.0)
+    parser.add_argument("--no-rest-areas", action="store_true", help="skip rest-area suggestions")
+    parser.add_argument("--no-cache", action="store_true", help="do not use or fill the nudge cache")
+    args = parser.parse_args(argv)
+
+    base_url = args.llm_url
+    if args.stub:
+        from llm_stub_server import start_stub_server
+
+        base_url = start_stub_server(latency=args.stub_latency).url
+    llm = LLMGateway(make_client(api_key=os.environ.get("GROQ_API_KEY"), base_url=base_url),
+                     max_concurrency=args.concurrency)
+    with profiling.stage("read_fusion") as s:
+        df = read_fusion(columns=NUDGE_FIELDS, filters=NUDGE_FILTERS)
+        s.rows = len(df)
+    rest_index = None if args.no_rest_areas else _rest_index()
+    cache = None if args.no_cache else NudgeCache(backend=SqliteNudgeBackend())
+    store = NudgeStore(args.store)
+
+    def progress(summary):
+        print(f"  {summary['already_done'] + summary['generated'] + summary['failed']}/{summary['flagged']} rows "
+              f"({summary['failed']} failed)", flush=True)
+
+    print(f"{len(df)} flagged rows -> '{args.store}'")
+    summary = generate_batch(llm, df, store, rest_index, cache, args.batch_size, progress)
+    llm.close()
+    print(f"Done in {summary['seconds']}s: {summary['generated']} generated, {summary['already_done']} already "
+          f"stored, {summary['failed']} failed (retried next run); store has {store.counts()}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Thresholds for event detection
+# -----------------------------
+HARSH_BRAKE_THRESHOLD = 0.7     # braking value >0.7 → harsh braking
+OVERSPEED_THRESHOLD = 100       # km/h → overspeed
+SHARP_TURN_THRESHOLD = 5.0      # placeholder for angular velocity if available
+
+# Driver-condition thresholds (same cut-offs the nudge UI uses for its alerts)
+FATIGUE_THRESHOLD = 40
+HIGH_STRESS_THRESHOLD = 70
+GSR_SPIKE_THRESHOLD = 2.0       # microsiemens, roughly 2x the resting level in the sample data
+
+NORMAL_LABEL = "normal"
+LABEL_SEPARATOR = ", "
+
+_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+# Same comparisons on plain Python scalars (single live events)
+_SCALAR_OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# Up to this many active rules the labels are looked up in a 2**n table,
+# above it we only build labels for the bit patterns that actually occur.
+_MAX_TABLE_RULES = 12
+
+
+class EventRule:
+    """A single threshold rule: flag `name` when `column <op> threshold`."""
+
+    def __init__(self, name, column, op, threshold):
+        if op not in _OPS:
+            raise ValueError(f"Unsupported operator {op!r}, expected one of {sorted(_OPS)}")
+        self.name = name
+        self.column = column
+        self.op = op
+        self.threshold = threshold
+
+    def mask(self, df):
+        # NaN compares False, same as the old row["col"] > threshold check
+        values = df[self.column].to_numpy(dtype=np.float64, na_value=np.nan)
+        return _OPS[self.op](values, self.threshold)
+
+    def fires(self, value):
+        """Scalar version of mask(); None/NaN never fires."""
+        try:
+            return _SCALAR_OPS[self.op](float(value), self.threshold)
+        except (TypeError, ValueError):
+            return False
+
+    def __repr__(self):
+        return f"EventRule({self.name!r}, {self.column!r}, {self.op!r}, {self.threshold!r})"
+
+
+# Order matters: it is the order labels appear in the joined `event` string.
+DEFAULT_RULES = [
+    EventRule("harsh_brake", "braking", ">", HARSH_BRAKE_THRESHOLD),
+    EventRule("overspeed", "speed", ">", OVERSPEED_THRESHOLD),
+    EventRule("sharp_turn", "angular_velocity", ">", SHARP_TURN_THRESHOLD),
+]
+
+# Not part of the default `event` column yet (scores and dashboards are built on
+# the three rules above); pass DEFAULT_RULES + OPTIONAL_RULES to opt in.
+OPTIONAL_RULES = [
+    EventRule("fatigue", "fatigue", ">", FATIGUE_THRESHOLD),
+    EventRule("high_stress", "stress_level", ">", HIGH_STRESS_THRESHOLD),
+    EventRule("gsr_spike", "gsr", ">", GSR_SPIKE_THRESHOLD),
+]
+
+
+def register_rule(name, column, op, threshold, rules=None):
+    """Add a threshold rule to `rules` (DEFAULT_RULES by default) and return it."""
+    rules = DEFAULT_RULES if rules is None else rules
+    if any(r.name == name for r in rules):
+        raise ValueError(f"Event rule {name!r} is already registered")
+    rule = EventRule(name, column, op, threshold)
+    rules.append(rule)
+    return rule
+
+
+def event_bits(df, rules=None):
+    """
+    Evaluate every applicable rule over whole columns.
+
+    Returns (bits, active_rules): bit i of `bits` is set when active_rules[i]
+    fired on that row. Rules whose column is missing from `df` are skipped,
+    which is how sharp_turn behaves for gadgets without angular velocity.
+    """
+    rules = DEFAULT_RULES if rules is None else rules
+    active = [r for r in rules if r.column in df.columns]
+    if len(active) > 64:
+        raise ValueError("At most 64 event rules can be active at once")
+
+    dtype = np.uint8
+    for limit, candidate in ((8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64)):
+        if len(active) <= limit:
+            dtype = candidate
+            break
+
+    bits = np.zeros(len(df), dtype=dtype)
+    for i, rule in enumerate(active):
+        bits |= rule.mask(df).astype(dtype) << dtype(i)
+    return bits, active
+
+
+def _label_for(code, active):
+    names = [rule.name for i, rule in enumerate(active) if (int(code) >> i) & 1]
+    return LABEL_SEPARATOR.join(names) if names else NORMAL_LABEL
+
+
+def labels_from_bits(bits, active):
+    """Turn an event bitmask into the comma-joined labels used in `event`."""
+    if len(active) <= _MAX_TABLE_RULES:
+        table = np.array([_label_for(code, active) for code in range(1 << len(active))], dtype=object)
+        return table[bits]
+    codes, inverse = np.unique(bits, return_inverse=True)
+    table = np.array([_label_for(code, active) for code in codes], dtype=object)
+    return table[inverse]
+
+
+def detect_events(df, rules=None):
+    """
+    Tag every row with its driving events, e.g. "harsh_brake, overspeed",
+    or "normal" when no rule fires. Vectorized replacement for the old
+    iterrows loop in generate_csv; produces the same strings.
+    """
+    bits, active = event_bits(df, rules)
+    return pd.Series(labels_from_bits(bits, active), index=df.index, name="event", dtype=object)
+
+
+def event_label(record, rules=None):
+    """
+    `event` label for a single reading given as a dict, same rules and
+    string as detect_events(); rules whose column is absent are skipped.
+    """
+    rules = DEFAULT_RULES if rules is None else rules
+    names = [rule.name for rule in rules if rule.column in record and rule.fires(record[rule.column])]
+    return LABEL_SEPARATOR.join(names) if names else NORMAL_LABEL
@@ -0,0 +1,172 @@
+"""
+Columnar storage for the context-fused telemetry.
+
+fleet_context_fusion.csv is convenient to eyeball but every reader has to
+parse all of it. This module writes the same rows as a Parquet dataset
+(typed columns, dictionary-encoded categoricals, hive-partitioned by
+policy_number or by date) and reads it back with column projection and
+predicate pushdown, so the dashboards only touch the columns, partitions and
+row groups they need.
+
+pyarrow is optional: without it, read_fusion() falls back to the CSV (read
+with the typed schema from telemetry_schema.py) and applies the same filters
+in pandas.
+"""
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from telemetry_schema import TIMESTAMP_FORMAT, read_fusion_csv
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the deployment
+    pa = None
+
+FUSION_CSV = "fleet_context_fusion.csv"
+FUSION_DATASET = "fleet_context_fusion.parquet"
+META_FILE = "_fusion_meta.json"
+MANIFEST_FILE = "fleet_context_fusion.published.json"
+
+CATEGORICAL_COLUMNS = ["driver_name", "vehicle_id", "traffic_density", "weather", "road_type", "event"]
+PARTITION_TYPES = {"policy_number": "int64", "date": "string"}
+ROW_GROUP_SIZE = 64_000
+
+_OPS = {
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    ">": lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "<": lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    "in": lambda s, v: s.isin(v),
+}
+
+
+def have_pyarrow():
+    return pa is not None
+
+
+def dataset_path_for(csv_path):
+    """The Parquet dataset written alongside the fused CSV at `csv_path`."""
+    return f"{os.path.splitext(csv_path)[0]}.parquet"
+
+
+def default_format():
+    """Format generate_csv writes when the caller does not choose one."""
+    return "both" if have_pyarrow() else "csv"
+
+
+def to_columnar(df, partition_by="policy_number"):
+    """Typed copy of a fused frame: parsed timestamps, categoricals, partition key."""
+    out = df.copy()
+    if out["timestamp"].dtype == object or pd.api.types.is_string_dtype(out["timestamp"]):
+        out["timestamp"] = pd.to_datetime(out["timestamp"], format=TIMESTAMP_FORMAT, errors="coerce")
+    for column in CATEGORICAL_COLUMNS:
+        if column in out.columns:
+            out[column] = out[column].astype("category")
+    out["policy_number"] = out["policy_number"].astype("int64")
+    if partition_by == "date":
+        out["date"] = out["timestamp"].dt.strftime("%Y-%m-%d")
+    return out
+
+
+def write_fusion(df, path=FUSION_DATASET, partition_by="policy_number"):
+    """
+    Write a fused frame as a hive-partitioned Parquet dataset. The dataset is
+    built next to `path` and swapped in, so concurrent readers see either the
+    old or the new version.
+    """
+    if not have_pyarrow():
+        raise ImportError("pyarrow is required for the Parquet output (pip install pyarrow)")
+    if partition_by not in PARTITION_TYPES:
+        raise ValueError(f"partition_by must be one of {sorted(PARTITION_TYPES)}")
+
+    table = pa.Table.from_pandas(to_columnar(df, partition_by), preserve_index=False)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    pq.write_to_dataset(
+        table,
+        tmp_path,
+        partition_cols=[partition_by],
+        row_group_size=ROW_GROUP_SIZE,
+        use_dictionary=CATEGORICAL_COLUMNS,
+        compression="zstd",
+    )
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump({"partition_by": partition_by, "rows": table.num_rows}, f)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def write_manifest(info, path=MANIFEST_FILE):
+    """Record a published snapshot (written last, atomically, by scoring_worker.py)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(path=MANIFEST_FILE):
+    """Info about the last published snapshot, or None if nothing was published yet."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _partitioning(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        partition_by = json.load(f)["partition_by"]
+    schema = pa.schema([(partition_by, pa.type_for_alias(PARTITION_TYPES[partition_by]))])
+    return ds.partitioning(schema, flavor="hive")
+
+
+def _parquet_is_current(path, csv_path):
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(meta_path) >= os.path.getmtime(csv_path)
+
+
+def filter_frame(df, filters):
+    """Rows of `df` matching read_fusion()-style `filters` (all of them)."""
+    if not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        mask &= _OPS[op](df[column], value)
+    return df[mask]
+
+
+def fusion_source_path(path=FUSION_DATASET, csv_path=FUSION_CSV):
+    """The file or dataset directory read_fusion() would read right now."""
+    return path if have_pyarrow() and _parquet_is_current(path, csv_path) else csv_path
+
+
+def read_fusion(columns=None, filters=None, path=FUSION_DATASET, csv_path=FUSION_CSV):
+    """
+    Read fused telemetry, only the requested `columns` and rows matching
+    `filters` (a list of (column, op, value) tuples ANDed together, e.g.
+    [("risk_score", ">=", 0.85)]). Uses the Parquet dataset when it exists
+    and is not older than the CSV, otherwise the CSV.
+    """
+    if have_pyarrow() and _parquet_is_current(path, csv_path):
+        dataset = ds.dataset(path, format="parquet", partitioning=_partitioning(path))
+        expression = pq.filters_to_expression(filters) if filters else None
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    df = read_fusion_csv(csv_path, usecols=None if columns is None else list(dict.fromkeys(
+        list(columns) + [c for c, _, _ in filters or []])))
+    df = filter_frame(df, filters)
+    return df if columns is None else df[columns]
@@ -0,0 +1,235 @@
+"""
+Incremental scoring for fleet_context_fusion.csv.
+
+Only telemetry appended since the last run is read, scored and appended to
+the fused output, so the cost of a run follows the amount of new data rather
+than the size of the history. Progress is kept in a small JSON state file
+next to the output (`<output>.state.json`):
+
+* a byte offset into the telemetry file (the cursor), plus a hash of the
+  first and last few KB before it so a replaced or truncated source forces a
+  rebuild (edits in the middle of a large file are not detected; use
+  --full-rebuild after back-filling history);
+* the per-vehicle high-water mark (latest timestamp, rows and offset seen);
+* the traffic simulator's RNG state, so appended rows get the same simulated
+  traffic labels a full rebuild would give them;
+* the model artifact mtime, since a refit changes every historical score.
+
+The cursor is the file offset rather than the timestamp because gadgets do
+not write in time order (the sample file is unsorted); per-vehicle
+timestamps are tracked for monitoring, not used to drop rows.
+
+The per-policy aggregates (see policy_aggregates.py) are updated from the
+appended rows alone. The store records the output size it covers and is
+saved after the state, so a store that does not match the saved state (a run
+died in between) is rebuilt from the output instead of double counting.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from policy_aggregates import PolicyAggregates, aggregates_path_for
+import risk_model
+from risk_score_calc import OUTPUT_COLS, OUTPUT_FILE, TELEMETRY_FILE, prepare_telemetry, process_frame
+from telemetry_schema import TIMESTAMP_FORMAT, read_telemetry
+
+STATE_VERSION = 1
+FINGERPRINT_BYTES = 4096
+
+
+def state_path_for(output_path):
+    return f"{output_path}.state.json"
+
+
+def _fingerprint(path, offset):
+    """Hash of the head and tail of the first `offset` bytes of `path`."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        start = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(start)
+        digest.update(f.read(offset - start))
+    return digest.hexdigest()
+
+
+def _rng_to_json(rng):
+    name, keys, pos, has_gauss, cached_gaussian = rng.get_state()
+    return {"name": name, "keys": keys.tolist(), "pos": int(pos),
+            "has_gauss": int(has_gauss), "cached_gaussian": float(cached_gaussian)}
+
+
+def _rng_from_json(data):
+    rng = np.random.RandomState()
+    rng.set_state((data["name"], np.array(data["keys"], dtype=np.uint32), data["pos"],
+                   data["has_gauss"], data["cached_gaussian"]))
+    return rng
+
+
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def save_state(state, state_path):
+    tmp_path = f"{state_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _load_aggregates(path, output_bytes):
+    """The aggregate store if it covers exactly the first `output_bytes` of the output, else None."""
+    try:
+        aggregates = PolicyAggregates.load(path)
+    except (OSError, KeyError, ValueError, EOFError):
+        return None
+    return aggregates if aggregates.meta.get("output_bytes") == output_bytes else None
+
+
+def _needs_rebuild(state, telemetry_path, output_path, artifact_path):
+    """Return a reason string when the saved state can't be continued, else None."""
+    if state is None:
+        return "no saved state"
+    if not risk_model.model_exists(artifact_path):
+        return "no model artifact"
+    if state["source"] != os.path.abspath(telemetry_path):
+        return "telemetry source changed"
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < state["output_bytes"]:
+        return "fused output missing or truncated"
+    if os.path.getsize(telemetry_path) < state["offset"]:
+        return "telemetry file truncated"
+    if _fingerprint(telemetry_path, state["offset"]) != state["fingerprint"]:
+        return "telemetry file rewritten"
+    if state["artifact_mtime"] != os.path.getmtime(artifact_path):
+        return "model artifact changed"
+    return None
+
+
+def _read_header(telemetry_path):
+    with open(telemetry_path, "rb") as f:
+        header = f.readline()
+    if not header.endswith(b"\n"):
+        return None, 0
+    columns = header.decode("utf-8").strip().split(",")
+    return columns, len(header)
+
+
+def _read_new_rows(telemetry_path, offset, columns):
+    """Read complete lines after `offset`; a partially written last line is left for next time."""
+    with open(telemetry_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return pd.DataFrame(columns=columns), offset
+    new_df = read_telemetry(io.BytesIO(data[:end]), header=None, names=columns)
+    return new_df, offset + end
+
+
+def _update_vehicle_marks(vehicles, new_df, new_offset):
+    timestamps = new_df["timestamp"]  # parsed by read_telemetry
+    summary = timestamps.groupby(new_df["vehicle_id"].astype(str)).agg(["max", "size"])
+    for vehicle_id, last_ts, rows in summary.itertuples():
+        mark = vehicles.setdefault(vehicle_id, {"last_timestamp": None, "rows": 0, "offset": 0})
+        if not pd.isna(last_ts):
+            previous = mark["last_timestamp"]
+            if previous is None or last_ts > pd.Timestamp(previous):
+                mark["last_timestamp"] = last_ts.isoformat()
+        mark["rows"] += int(rows)
+        mark["offset"] = new_offset
+
+
+def generate_csv_incremental(telemetry_path=TELEMETRY_FILE, output_path=OUTPUT_FILE,
+                             artifact_path=risk_model.DEFAULT_ARTIFACT_PATH, state_path=None,
+                             full_rebuild=False):
+    """
+    Score telemetry appended since the previous run and append it to the
+    fused output. Falls back to a full rebuild when there is no usable state.
+    Returns a dict describing what was done.
+    """
+    state_path = state_path or state_path_for(output_path)
+    state = None if full_rebuild else load_state(state_path)
+    reason = "requested" if full_rebuild else _needs_rebuild(state, telemetry_path, output_path, artifact_path)
+
+    if reason is not None:
+        columns, offset = _read_header(telemetry_path)
+        if columns is None:
+            # Header still being written; nothing to score yet
+            return {"mode": "full", "reason": reason, "new_rows": 0, "total_rows": 0}
+        state = {
+            "version": STATE_VERSION,
+            "source": os.path.abspath(telemetry_path),
+            "columns": columns,
+            "offset": offset,
+            "rows": 0,
+            "output_bytes": 0,
+            "rng_state": _rng_to_json(np.random.RandomState(42)),
+            "vehicles": {},
+        }
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    else:
+        # Roll back a partial append left by a run that died before saving state
+        if os.path.getsize(output_path) > state["output_bytes"]:
+            with open(output_path, "r+b") as f:
+                f.truncate(state["output_bytes"])
+
+    aggregates_path = aggregates_path_for(output_path)
+    previous = None if reason is not None else _load_aggregates(aggregates_path, state["output_bytes"])
+
+    new_df, new_offset = _read_new_rows(telemetry_path, state["offset"], state["columns"])
+
+    if not risk_model.model_exists(artifact_path):
+        # First run on a fresh node: train on what we have, like generate_csv does
+        risk_model.fit(prepare_telemetry(new_df.copy()), artifact_path)
+
+    rng = _rng_from_json(state["rng_state"])
+    new_aggregates = None
+    if len(new_df):
+        output_df = process_frame(new_df, rng, artifact_path)
+        new_aggregates = PolicyAggregates.from_frame(output_df)
+        write_header = state["output_bytes"] == 0
+        output_df.to_csv(output_path, mode="w" if write_header else "a", header=write_header, index=False,
+                         date_format=TIMESTAMP_FORMAT)
+        _update_vehicle_marks(state["vehicles"], new_df, new_offset)
+    elif state["output_bytes"] == 0:
+        pd.DataFrame(columns=OUTPUT_COLS).to_csv(output_path, index=False)
+
+    state.update({
+        "offset": new_offset,
+        "rows": state["rows"] + len(new_df),
+        "fingerprint": _fingerprint(telemetry_path, new_offset),
+        "output_bytes": os.path.getsize(output_path),
+        "artifact_mtime": os.path.getmtime(artifact_path),
+        "rng_state": _rng_to_json(rng),
+    })
+    save_state(state, state_path)
+
+    if reason is None and previous is None:
+        aggregates = PolicyAggregates.from_csv(output_path)
+    else:
+        aggregates = PolicyAggregates.combine([previous, new_aggregates])
+    aggregates.meta["output_bytes"] = state["output_bytes"]
+    aggregates.save(aggregates_path)
+    return {"mode": "incremental" if reason is None else "full", "reason": reason,
+            "new_rows": len(new_df), "total_rows": state["rows"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score newly appended telemetry into the fused output.")
+    parser.add_argument("--telemetry", default=TELEMETRY_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--artifact", default=risk_model.DEFAULT_ARTIFACT_PATH)
+    parser.add_argument("--full-rebuild", action="store_true", help="ignore saved state and rescore everything")
+    args = parser.parse_args()
+    result = generate_csv_incremental(args.telemetry, args.output, args.artifact, full_rebuild=args.full_rebuild)
+    print(f"{result['mode']} run ({result['reason'] or 'state ok'}): "
+          f"{result['new_rows']} new rows, {result['total_rows']} total")
@@ -0,0 +1,218 @@
+"""
+Shared async gateway for LLM completions.
+
+Both apps used to call the Groq client synchronously in the Streamlit script,
+so one slow completion blocked the whole rerun. LLMGateway wraps any client
+with an async `chat.completions.create(model=, messages=, temperature=)`
+(groq.AsyncGroq, or HttpChatClient below) and adds:
+
+* bounded concurrency (a semaphore shared by every caller),
+* a per-request timeout,
+* retries with full-jitter exponential backoff on rate limits, timeouts and
+  5xx/connection errors (honouring Retry-After when the server sends it),
+* coalescing: identical in-flight requests share one completion,
+* complete_many() to run a whole batch in parallel.
+
+The gateway owns a background event loop thread, so synchronous code such as
+a Streamlit script can call complete_sync() / submit() from any thread while
+all sessions share the same loop, semaphore and coalescing table.
+
+Point DRIVEBUDDY_LLM_BASE_URL at llm_stub_server.py to run without network.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+BASE_URL_ENV_VAR = "DRIVEBUDDY_LLM_BASE_URL"
+GROQ_BASE_URL = "https://api.groq.com"
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+
+class LLMError(RuntimeError):
+    """Raised when a completion fails after all retries."""
+
+
+class HttpStatusError(Exception):
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class HttpChatClient:
+    """
+    Minimal OpenAI-compatible chat client (urllib in worker threads) with the
+    same call shape as groq.AsyncGroq. Used when the groq SDK is not installed
+    and against the local stub server.
+    """
+
+    def __init__(self, api_key=None, base_url=GROQ_BASE_URL, timeout=60):
+        self.api_key = api_key
+        self.url = base_url.rstrip("/") + COMPLETIONS_PATH
+        self.timeout = timeout
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _post(self, payload):
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode(), method="POST")
+        request.add_header("Content-Type", "application/json")
+        if self.api_key:
+            request.add_header("Authorization", f"Bearer {self.api_key}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            raise HttpStatusError(e.code, e.read().decode(errors="replace")[:200],
+                                  float(retry_after) if retry_after else None) from None
+
+    async def _create(self, model, messages, temperature=None, **kwargs):
+        payload = dict(kwargs, model=model, messages=messages)
+        if temperature is not None:
+            payload["temperature"] = temperature
+        data = await asyncio.to_thread(self._post, payload)
+        return SimpleNamespace(choices=[
+            SimpleNamespace(message=SimpleNamespace(content=c["message"]["content"])) for c in data["choices"]
+        ])
+
+
+def make_client(api_key=None, base_url=None):
+    """groq.AsyncGroq when available, else HttpChatClient; honours DRIVEBUDDY_LLM_BASE_URL."""
+    base_url = base_url or os.environ.get(BASE_URL_ENV_VAR)
+    try:
+        from groq import AsyncGroq
+    except ImportError:
+        return HttpChatClient(api_key, base_url or GROQ_BASE_URL)
+    return AsyncGroq(api_key=api_key or "stub", base_url=base_url) if base_url else AsyncGroq(api_key=api_key)
+
+
+def _is_retryable(exc):
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, urllib.error.URLError)):
+        return True
+    if type(exc).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+def _retry_after(exc):
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    def __init__(self, client, model=DEFAULT_MODEL, max_concurrency=8, timeout=30.0,
+                 max_retries=4, backoff_base=0.5, backoff_max=8.0):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._inflight = {}
+        self._semaphore = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "completions": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, inflight=len(self._inflight))
+
+    @staticmethod
+    def request_key(model, messages, temperature):
+        payload = json.dumps([model, messages, temperature], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # -----------------------------
+    # Async API
+    # -----------------------------
+    async def complete(self, messages, temperature=0.2, model=None):
+        """Completion text for `messages`; identical concurrent requests share one call."""
+        model = model or self.model
+        self._count("requests")
+        key = self.request_key(model, messages, temperature)
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+        else:
+            task = asyncio.ensure_future(self._complete_with_retries(messages, temperature, model))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller being cancelled must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def complete_many(self, batch, temperature=0.2, model=None):
+        """Run a batch of message lists in parallel; failed items come back as exceptions."""
+        return await asyncio.gather(
+            *(self.complete(messages, temperature, model) for messages in batch), return_exceptions=True
+        )
+
+    async def _complete_with_retries(self, messages, temperature, model):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    resp = await asyncio.wait_for(
+                        self.client.chat.completions.create(model=model, messages=messages, temperature=temperature),
+                        timeout=self.timeout,
+                    )
+                self._count("completions")
+                return resp.choices[0].message.content.strip()
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    self._count("failures")
+                    raise LLMError(
+                        f"LLM request failed after {attempt + 1} attempt(s): {type(e).__name__}: {e}"
+                    ) from e
+                self._count("retries")
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                await asyncio.sleep(max(delay, _retry_after(e) or 0))
+
+    # -----------------------------
+    # Sync bridge (background loop)
+    # -----------------------------
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+            return self._loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the gateway loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def complete_sync(self, messages, temperature=0.2, model=None):
+        return self.submit(self.complete(messages, temperature, model)).result()
+
+    def complete_many_sync(self, batch, temperature=0.2, model=None):
+        return self.submit(self.complete_many(batch, temperature, model)).result()
+
+    def close(self):
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
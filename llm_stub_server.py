@@ -0,0 +1,112 @@
+"""
+Local stand-in for the Groq chat-completions endpoint, for tests, benchmarks
+and offline development.
+
+    python llm_stub_server.py --port 8808 --latency 0.3
+    DRIVEBUDDY_LLM_BASE_URL=http://127.0.0.1:8808 streamlit run streamlit_nudge_ui_v2.py
+
+Replies are deterministic: the assistant text echoes the vehicle id found in
+the prompt (so nudge personalization can be checked) plus a short hash of the
+request. --rate-limit-every N makes every Nth request fail with 429 and a
+Retry-After header, to exercise client retries. --prompt-latency adds time
+per 1,000 prompt characters, as a real model's prompt processing does.
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_gateway import COMPLETIONS_PATH
+
+_VEHICLE_RE = re.compile(r"Vehicle ID:\s*(\S+)")
+
+
+def stub_reply(messages):
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    match = _VEHICLE_RE.findall(prompt)
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+    if match:
+        return f"Vehicle {match[-1]}: ⚠️ Stay alert and ease off the speed. (stub {digest})"
+    return f"Stub insight for a {len(prompt)}-character prompt. (stub {digest})"
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate_limit_every=0, prompt_latency=0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.prompt_latency = prompt_latency
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != COMPLETIONS_PATH:
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        server = self.server
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        with server._lock:
+            server.requests += 1
+            count = server.requests
+            server.prompt_chars += prompt_chars
+
+        if server.rate_limit_every and count % server.rate_limit_every == 0:
+            self._send_json(429, {"error": {"message": "rate limited (stub)"}}, {"Retry-After": "0.05"})
+            return
+
+        time.sleep(server.latency + server.prompt_latency * prompt_chars / 1000)
+        content = stub_reply(body.get("messages", []))
+        self._send_json(200, {
+            "id": f"stub-{count}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+        })
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(port=0, latency=0.0, rate_limit_every=0, host="127.0.0.1", prompt_latency=0.0):
+    """Start the stub in a background thread; returns the server (use .url, .shutdown())."""
+    server = StubServer((host, port), latency, rate_limit_every, prompt_latency)
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub for the Groq chat-completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each reply")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="return 429 on every Nth request")
+    parser.add_argument("--prompt-latency", type=float, default=0.0, help="extra seconds per 1,000 prompt characters")
+    args = parser.parse_args()
+    server = StubServer((args.host, args.port), args.latency, args.rate_limit_every, args.prompt_latency)
+    print(f"LLM stub listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,176 @@
+"""
+Cache for LLM-generated driving nudges.
+
+Most alert rows look the same once binned: same risk band, stress band,
+weather, road type, traffic and events. context_signature() turns a row into
+that quantized key, and NudgeCache reuses a previously generated nudge for it
+instead of making another completion call.
+
+Nudges address the vehicle/driver by name ("Vehicle V2: ..."), so cached text
+is stored with those replaced by placeholders and filled back in on a hit.
+
+The in-memory layer is an LRU with a TTL; SqliteNudgeBackend adds an optional
+persistent layer shared across processes and restarts. Hit/miss counters are
+available from NudgeCache.stats() for tuning the bin widths.
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RISK_BIN = 0.05
+STRESS_BIN = 10
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+VEHICLE_PLACEHOLDER = "{{vehicle_id}}"
+DRIVER_PLACEHOLDER = "{{driver_name}}"
+
+
+def _bin(value, width):
+    try:
+        # small epsilon so 0.85 / 0.05 lands in bin 17, not 16.999... -> 16
+        return math.floor(float(value) / width + 1e-9)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _norm(value):
+    return str(value).strip().lower() if value is not None else ""
+
+
+def context_signature(risk_score, stress_level, weather, road_type, traffic_density, event="normal",
+                      rest_area_name=None, risk_bin=RISK_BIN, stress_bin=STRESS_BIN):
+    """Quantized, normalized cache key for a nudge context."""
+    events = ",".join(sorted(e.strip() for e in _norm(event).split(",") if e.strip())) or "normal"
+    return "|".join([
+        f"r{_bin(risk_score, risk_bin)}",
+        f"s{_bin(stress_level, stress_bin)}",
+        _norm(weather),
+        _norm(road_type),
+        _norm(traffic_density),
+        events,
+        _norm(rest_area_name),
+    ])
+
+
+def _replace_word(text, word, replacement):
+    # Whole words only: vehicle "V1" is not the start of "V10", driver "Al" not of "Always"
+    return re.sub(rf"(?<!\w){re.escape(word)}(?!\w)", lambda _: replacement, text)
+
+
+def templatize(text, vehicle_id, driver_name):
+    """Replace this row's vehicle id / driver name (whole words) with placeholders before caching."""
+    if vehicle_id:
+        text = _replace_word(text, str(vehicle_id), VEHICLE_PLACEHOLDER)
+    if driver_name:
+        text = _replace_word(text, str(driver_name), DRIVER_PLACEHOLDER)
+    return text
+
+
+def personalize(text, vehicle_id, driver_name):
+    """Inverse of templatize(): fill the placeholders in with another row's vehicle id / driver name."""
+    return text.replace(VEHICLE_PLACEHOLDER, str(vehicle_id)).replace(DRIVER_PLACEHOLDER, str(driver_name))
+
+
+class SqliteNudgeBackend:
+    """Persistent key -> (text, created_at) store in a single SQLite file."""
+
+    def __init__(self, path=os.path.join(".cache", "nudges.sqlite3")):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS nudges (key TEXT PRIMARY KEY, text TEXT, created_at REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT text, created_at FROM nudges WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def put(self, key, text, created_at):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO nudges VALUES (?, ?, ?)", (key, text, created_at))
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM nudges WHERE key = ?", (key,))
+
+
+class NudgeCache:
+    """LRU + TTL cache of nudge text keyed by context_signature()."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, backend=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "backend_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def _fresh(self, created_at):
+        return self.ttl_seconds is None or time.time() - created_at < self.ttl_seconds
+
+    def _remember(self, key, text, created_at):
+        self._entries[key] = (text, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[1]):
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry[0]
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+        if self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None and self._fresh(entry[1]):
+                with self._lock:
+                    self._remember(key, *entry)
+                    self._counters["backend_hits"] += 1
+                return entry[0]
+            if entry is not None:
+                self.backend.delete(key)
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key, text):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, text, created_at)
+        if self.backend is not None:
+            self.backend.put(key, text, created_at)
+
+    def get_or_create(self, key, factory):
+        """Cached text for `key`, or factory() (stored on success)."""
+        text = self.get(key)
+        if text is None:
+            text = factory()
+            self.put(key, text)
+        return text
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, entries=len(self._entries))
+        lookups = stats["hits"] + stats["backend_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["backend_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,188 @@
+"""
+Driving nudge generation, shared by the DriveBuddy UI and batch jobs.
+
+Builds the few-shot nudge prompt for one telemetry row, consults the nudge
+cache, and sends misses through the LLM gateway. precompute_nudges() does the
+same for a whole frame of flagged rows in parallel: rest areas are looked up
+in one batch query and rows that share a cache signature share one LLM call.
+"""
+import numpy as np
+
+from nudge_cache import context_signature, personalize, templatize
+
+NUDGE_TEMPERATURE = 0.2
+REST_AREA_STRESS_THRESHOLD = 70
+
+# Rows that get a nudge: the UI's alert feed and drivebuddy_nudges.py (read_fusion filters)
+NUDGE_FILTERS = [("risk_score", ">=", 0.85), ("stress_level", ">=", 65)]
+
+# ==============================
+# --- Few-shot Prompt Examples ---
+# ==============================
+few_shot_examples = [
+    {
+        "prompt": "Vehicle ID: V1\nRisk Score: 0.61\nWeather: Overcast\nRoad Type: highway\nTraffic Density: high\nGenerate a short, friendly, motivational driving nudge:",
+        "completion": "Vehicle V1: 🚗 Moderate risk. Keep an eye on traffic and adjust speed for safer driving."
+    },
+    {
+        "prompt": "Vehicle ID: V2\nRisk Score: 0.85\nWeather: Rain\nRoad Type: city\nTraffic Density: medium\nGenerate a short, friendly, motivational driving nudge:",
+        "completion": "Vehicle V2: ⚠️ High risk detected! Drive very carefully in rainy city conditions."
+    },
+    {
+        "prompt": "Vehicle ID: V3\nRisk Score: 0.35\nWeather: Clear\nRoad Type: highway\nTraffic Density: low\nGenerate a short, friendly, motivational driving nudge:",
+        "completion": "Vehicle V3: ✅ Low risk. Great driving! Keep up the safe habits."
+    }
+]
+
+def build_few_shot_text(examples):
+    return "\n\n".join(
+        f"Example:\n{e['prompt']}\nResponse: {e['completion']}"
+        for e in examples
+    )
+
+FEW_SHOT_TEXT = build_few_shot_text(few_shot_examples)
+
+# Persona and few-shot examples are the same for every nudge: one constant
+# system message, so each request only adds the reading (and providers that
+# cache prompt prefixes can reuse it)
+NUDGE_SYSTEM_PROMPT = f"""You are a friendly AI driving assistant that provides motivational driving nudges. Use these examples for style and tone:
+
+{FEW_SHOT_TEXT}"""
+
+NUDGE_FIELDS = [
+    'timestamp', 'driver_name', 'vehicle_id', 'gps_lat', 'gps_lon', 'weather', 'road_type',
+    'risk_score', 'traffic_density', 'stress_level', 'heart_rate', 'gsr', 'fatigue', 'event'
+]
+
+
+def build_nudge_messages(
+    timestamp, driver_name, vehicle_id, gps_lat, gps_lon,
+    weather, road_type, risk_score, traffic_density,
+    stress_level, heart_rate, gsr, fatigue, event, rest_area=None
+):
+    rest_text = ""
+    if rest_area is not None:
+        rest_text = (
+            f"Suggested Rest Area: {rest_area['name']} ({rest_area['description']}) "
+            f"at lat {rest_area['latitude']}, lon {rest_area['longitude']}\n"
+        )
+
+    prompt = f"""Now generate a new driving alert:
+
+timestamp: {timestamp}
+Driver Name: {driver_name}
+Vehicle ID: {vehicle_id}
+gps_lat: {gps_lat}
+gps_lon: {gps_lon}
+Weather: {weather}
+Road Type: {road_type}
+Risk Score: {risk_score:.2f}
+Traffic Density: {traffic_density}
+Stress Level: {stress_level}
+Heart Rate: {heart_rate}
+GSR: {gsr}
+Fatigue: {fatigue}
+Event: {event}
+{rest_text}
+Generate a short, friendly, alert driving nudge based on the actual stress level ({stress_level})
+and actual risk score ({risk_score:.2f}). If the stress level is above 70 and risk_score > 0.8, clearly suggest the nearest rest area.
+Driving Alert:
+"""
+
+    return [
+        {"role": "system", "content": NUDGE_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def nudge_cache_key(row, rest_area=None):
+    return context_signature(
+        row['risk_score'], row['stress_level'], row['weather'], row['road_type'],
+        row['traffic_density'], row['event'],
+        rest_area['name'] if rest_area is not None else None
+    )
+
+
+def generate_nudge_via_groq(
+    llm,
+    timestamp, driver_name, vehicle_id, gps_lat, gps_lon,
+    weather, road_type, risk_score, traffic_density,
+    stress_level, heart_rate, gsr, fatigue, event,
+    cache=None, rest_index=None
+):
+    """Nudge for one row (blocking); `llm` is an LLMGateway."""
+    row = dict(zip(NUDGE_FIELDS, (timestamp, driver_name, vehicle_id, gps_lat, gps_lon, weather, road_type,
+                                  risk_score, traffic_density, stress_level, heart_rate, gsr, fatigue, event)))
+    rest_area = None
+    if rest_index is not None and stress_level > REST_AREA_STRESS_THRESHOLD:
+        rest_area = rest_index.nearest(gps_lat, gps_lon)
+
+    # Same binned context → reuse the nudge instead of another LLM call
+    cache_key = nudge_cache_key(row, rest_area)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return personalize(cached, vehicle_id, driver_name)
+
+    nudge = llm.complete_sync(build_nudge_messages(**row, rest_area=rest_area), temperature=NUDGE_TEMPERATURE)
+    if cache is not None:
+        cache.put(cache_key, templatize(nudge, vehicle_id, driver_name))
+    return nudge
+
+
+def rest_areas_for(df, rest_index):
+    """Nearest rest area (or None) per row, one batch query for the stressed rows."""
+    rest_areas = [None] * len(df)
+    if rest_index is None or len(rest_index) == 0:
+        return rest_areas
+    stressed = np.flatnonzero(df['stress_level'].to_numpy(dtype=np.float64) > REST_AREA_STRESS_THRESHOLD)
+    if len(stressed):
+        nearest = rest_index.nearest_batch(df['gps_lat'].to_numpy()[stressed], df['gps_lon'].to_numpy()[stressed])
+        for position, (_, rest_area) in zip(stressed, nearest.iterrows()):
+            rest_areas[position] = rest_area
+    return rest_areas
+
+
+async def precompute_nudges(llm, df, rest_index=None, cache=None, rest_areas=None):
+    """
+    Nudges for every row of `df` (columns as NUDGE_FIELDS), generated in
+    parallel through the gateway. Rows sharing a cache signature share one
+    completion. Returns a list aligned with df; failures are LLMError objects.
+    `rest_areas` (from rest_areas_for) skips the lookup when already done.
+    """
+    rows = df[NUDGE_FIELDS].to_dict("records")
+    if rest_areas is None:
+        rest_areas = rest_areas_for(df, rest_index)
+    keys = [nudge_cache_key(row, rest_area) for row, rest_area in zip(rows, rest_areas)]
+
+    templates = {}
+    pending = {}
+    for i, key in enumerate(keys):
+        if key in templates or key in pending:
+            continue
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            templates[key] = cached
+        else:
+            pending[key] = i
+
+    batch = [build_nudge_messages(**rows[i], rest_area=rest_areas[i]) for i in pending.values()]
+    results = await llm.complete_many(batch, temperature=NUDGE_TEMPERATURE)
+    for (key, i), result in zip(pending.items(), results):
+        if isinstance(result, Exception):
+            templates[key] = result
+            continue
+        templates[key] = templatize(result, rows[i]['vehicle_id'], rows[i]['driver_name'])
+        if cache is not None:
+            cache.put(key, templates[key])
+
+    return [
+        templates[key] if isinstance(templates[key], Exception)
+        else personalize(templates[key], row['vehicle_id'], row['driver_name'])
+        for row, key in zip(rows, keys)
+    ]
+
+
+def precompute_nudges_sync(llm, df, rest_index=None, cache=None, rest_areas=None):
+    return llm.submit(precompute_nudges(llm, df, rest_index, cache, rest_areas)).result()
+
@@ -0,0 +1,242 @@
+"""
+Pre-aggregated per-policy KPIs and risk rollups for the dashboard.
+
+The dashboard used to compute its KPI cards (average risk, top speed,
+average stress) and the risk trend from every fused reading of a policy on
+each click, after parsing the timestamps three times and re-sorting them.
+For a policy with millions of readings that is seconds per click. The
+scoring pipeline now maintains a small aggregate store instead, one row per
+(policy_number, driver_name) at three grains:
+
+* "policy"  totals over all readings (the KPI cards)
+* "daily"   one row per calendar day
+* "hourly"  one row per hour (the trend chart)
+
+Every row holds additive statistics only (counts, sums, maxima, first and
+last timestamp), so aggregates of separate chunks, files or appended rows
+combine exactly: streaming, batch and incremental scoring aggregate what
+they score and combine() the pieces, with no second pass over the output.
+Averages are derived at lookup time (sum / count).
+
+The store is pickled next to the fused CSV (`<output>.aggregates.pkl`),
+written atomically after the output, and sorted by policy number so a
+lookup is a binary search plus a slice:
+
+    aggregates = PolicyAggregates.load(aggregates_path_for(FUSION_CSV))
+    aggregates.kpis(3996585786)          # {"avg_risk": ..., "max_speed": ..., ...}
+    aggregates.trend(3996585786)         # hourly rows with an avg_risk column
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from event_rules import LABEL_SEPARATOR, NORMAL_LABEL
+from fusion_store import FUSION_CSV, META_FILE
+from policy_index import normalize_policy_number
+from telemetry_schema import TIMESTAMP_FORMAT, parse_dates, read_fusion_csv
+
+AGGREGATES_SUFFIX = ".aggregates.pkl"
+HIGH_RISK_THRESHOLD = 0.85      # same cut-off as the nudge filter
+KEYS = ["policy_number", "driver_name"]
+GRAINS = {"daily": "D", "hourly": "h"}
+EVENT_PREFIX = "event_"
+
+# Fused columns the aggregates are computed from
+INPUT_COLUMNS = ["timestamp", "policy_number", "driver_name", "speed", "stress_level", "fatigue", "event",
+                 "risk_score"]
+
+# How each statistic combines across rows and pieces; columns named
+# EVENT_PREFIX + <label> (one per event label seen) are counts too
+_COUNTS = {"readings", "high_risk", "stress_readings", "fatigue_readings", "events"}
+_STATS = {
+    "readings": "sum",
+    "risk_sum": "sum",
+    "risk_max": "max",
+    "high_risk": "sum",
+    "speed_sum": "sum",
+    "speed_max": "max",
+    "stress_sum": "sum",
+    "stress_readings": "sum",
+    "fatigue_sum": "sum",
+    "fatigue_readings": "sum",
+    "events": "sum",
+    "first_seen": "min",
+    "last_seen": "max",
+}
+
+
+def aggregates_path_for(output_path):
+    return f"{output_path}{AGGREGATES_SUFFIX}"
+
+
+def _is_count(column):
+    return column in _COUNTS or column.startswith(EVENT_PREFIX)
+
+
+def _group(frame, by):
+    # Empty categories and NaN keys are dropped; sorted by policy number first
+    events = sorted(c for c in frame.columns if c.startswith(EVENT_PREFIX))
+    order = list(_STATS)
+    order[order.index("events") + 1:order.index("events") + 1] = events
+    spec = {c: "sum" if _is_count(c) else _STATS[c] for c in order}
+    grouped = frame.groupby(by, observed=True, sort=True).agg(spec).reset_index()
+    counts = [c for c in grouped.columns if _is_count(c)]
+    # Event columns missing from some pieces come back as NaN
+    grouped[counts] = grouped[counts].fillna(0).astype(np.int64)
+    return grouped
+
+
+def _float(df, column):
+    return df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _readings(df):
+    """One row of additive statistics per fused reading."""
+    timestamps = df["timestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = parse_dates(pd.DataFrame({"t": timestamps}), {"t": TIMESTAMP_FORMAT})["t"]
+    risk, speed = _float(df, "risk_score"), _float(df, "speed")
+    stress, fatigue = _float(df, "stress_level"), _float(df, "fatigue")
+    stats = pd.DataFrame({
+        "policy_number": pd.to_numeric(df["policy_number"], errors="coerce").to_numpy(),
+        "driver_name": df["driver_name"].astype("category").array,
+        "time": timestamps.to_numpy(),
+        "readings": np.ones(len(df), dtype=np.int64),
+        "risk_sum": risk,
+        "risk_max": risk,
+        "high_risk": risk >= HIGH_RISK_THRESHOLD,
+        "speed_sum": speed,
+        "speed_max": speed,
+        "stress_sum": stress,
+        "stress_readings": ~np.isnan(stress),
+        "fatigue_sum": fatigue,
+        "fatigue_readings": ~np.isnan(fatigue),
+    })
+    # Labels like "harsh_brake, overspeed" repeat; count each name through the few distinct labels
+    codes, uniques = pd.factorize(df["event"])
+    labels = [str(label).split(LABEL_SEPARATOR) for label in uniques]
+    stats["events"] = np.isin(codes, [i for i, names in enumerate(labels) if names != [NORMAL_LABEL]])
+    for name in sorted({n for names in labels for n in names} - {NORMAL_LABEL}):
+        stats[EVENT_PREFIX + name] = np.isin(codes, [i for i, names in enumerate(labels) if name in names])
+    stats["first_seen"] = stats["last_seen"] = stats["time"]
+    return stats
+
+
+class PolicyAggregates:
+    """Per-grain aggregate tables sorted by policy number; see the module docstring."""
+
+    GRAIN_NAMES = ("policy",) + tuple(GRAINS)
+
+    def __init__(self, tables, meta=None):
+        self.tables = tables
+        self.meta = meta or {}
+        self._keys = {grain: table["policy_number"].to_numpy() for grain, table in tables.items()}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Aggregate a fused frame (scored output rows, timestamps text or parsed)."""
+        stats = _readings(df)
+        tables = {"policy": _group(stats.drop(columns="time"), KEYS)}
+        for grain, freq in GRAINS.items():
+            stats["period"] = stats["time"].dt.floor(freq)
+            tables[grain] = _group(stats.drop(columns="time"), KEYS + ["period"])
+        return cls(tables, {"rows": len(df)})
+
+    @classmethod
+    def combine(cls, parts):
+        """Aggregates of the union of the parts' rows (chunks, files or appended batches)."""
+        parts = [part for part in parts if part is not None]
+        if not parts:
+            return cls.from_frame(pd.DataFrame(columns=INPUT_COLUMNS))
+        if len(parts) == 1:
+            return cls(parts[0].tables, dict(parts[0].meta))
+        tables = {}
+        for grain in cls.GRAIN_NAMES:
+            by = KEYS if grain == "policy" else KEYS + ["period"]
+            frames = [part.tables[grain] for part in parts]
+            names = pd.api.types.union_categoricals([f["driver_name"] for f in frames]).categories
+            frames = [f.assign(driver_name=pd.Categorical(f["driver_name"], categories=names)) for f in frames]
+            tables[grain] = _group(pd.concat(frames, ignore_index=True), by)
+        return cls(tables, {"rows": sum(part.meta.get("rows", 0) for part in parts)})
+
+    @classmethod
+    def from_csv(cls, path, chunksize=1_000_000):
+        """Rebuild from a fused CSV in bounded-memory chunks."""
+        return cls.combine([cls.from_frame(chunk) for chunk in read_fusion_csv(path, chunksize=chunksize)])
+
+    def _slice(self, grain, policy_number):
+        policy_number = normalize_policy_number(policy_number)
+        if policy_number is None:
+            return self.tables[grain].iloc[0:0]
+        keys = self._keys[grain]
+        start = np.searchsorted(keys, policy_number, side="left")
+        stop = np.searchsorted(keys, policy_number, side="right")
+        return self.tables[grain].iloc[start:stop]
+
+    def __contains__(self, policy_number):
+        return not self._slice("policy", policy_number).empty
+
+    def kpis(self, policy_number):
+        """KPI values of one policy over all its drivers, or None if it has no readings."""
+        rows = self._slice("policy", policy_number)
+        readings = int(rows["readings"].sum())
+        if not readings:
+            return None
+        stress_readings = int(rows["stress_readings"].sum())
+        fatigue_readings = int(rows["fatigue_readings"].sum())
+        return {
+            "readings": readings,
+            "avg_risk": rows["risk_sum"].sum() / readings,
+            "max_risk": rows["risk_max"].max(),
+            "high_risk": int(rows["high_risk"].sum()),
+            "max_speed": rows["speed_max"].max(),
+            "avg_speed": rows["speed_sum"].sum() / readings,
+            "avg_stress": rows["stress_sum"].sum() / stress_readings if stress_readings else None,
+            "avg_fatigue": rows["fatigue_sum"].sum() / fatigue_readings if fatigue_readings else None,
+            "events": int(rows["events"].sum()),
+            "event_counts": {c[len(EVENT_PREFIX):]: int(rows[c].sum())
+                             for c in rows.columns if c.startswith(EVENT_PREFIX)},
+            "first_seen": rows["first_seen"].min(),
+            "last_seen": rows["last_seen"].max(),
+        }
+
+    def trend(self, policy_number, grain="hourly"):
+        """Rollup rows of one policy per driver and period (in time order), with avg_risk/avg_speed."""
+        if grain not in GRAINS:
+            raise ValueError(f"grain must be one of {sorted(GRAINS)}")
+        rows = self._slice(grain, policy_number)
+        return rows.assign(avg_risk=rows["risk_sum"] / rows["readings"],
+                           avg_speed=rows["speed_sum"] / rows["readings"])
+
+    def save(self, path):
+        """Pickle the store to `path` atomically."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        pd.to_pickle({"tables": self.tables, "meta": self.meta}, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        data = pd.read_pickle(path)
+        return cls(data["tables"], data["meta"])
+
+
+def is_current(path, source_path):
+    """True when the store at `path` was written after `source_path` (a CSV or Parquet dataset) changed."""
+    if not os.path.exists(path) or not os.path.exists(source_path):
+        return False
+    if os.path.isdir(source_path):
+        source_path = os.path.join(source_path, META_FILE)
+    return os.path.getmtime(path) >= os.path.getmtime(source_path)
+
+
+def load_current(source_path, path=None):
+    """The store for the fused output at `source_path`, or None if missing or older than the output."""
+    path = path or aggregates_path_for(FUSION_CSV if os.path.isdir(source_path) else source_path)
+    if not is_current(path, source_path):
+        return None
+    try:
+        return PolicyAggregates.load(path)
+    except (OSError, KeyError, ValueError, EOFError):
+        return None
@@ -0,0 +1,108 @@
+"""
+Policy-number index for per-policy lookups.
+
+The dashboard used to find a policy with `df["POL_NO"].astype(str) == value`,
+a full scan that also allocates a string column on every click. A
+PolicyIndex sorts the frame once by policy number and keeps an offset table
+{policy_number: (start, stop)}, so a lookup is a dict hit plus a contiguous
+slice, independent of fleet size.
+
+Indexes are persisted under `.index_cache/` (`<name>.idx.npz` for the offsets,
+`<name>.idx.pkl` for the sorted rows) and rebuilt only when the source's size
+or mtime changes, so restarts and other workers reuse them.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+INDEX_DIR = ".index_cache"
+
+
+def normalize_policy_number(value):
+    """Policy numbers arrive as ints, floats or user-typed strings; return an int or None."""
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        try:
+            as_float = float(value)
+        except (TypeError, ValueError):
+            return None
+        return int(as_float) if as_float.is_integer() else None
+
+
+class PolicyIndex:
+    """Frame sorted by `key_column` plus an offset table for O(1) policy lookups."""
+
+    def __init__(self, frame, key_column, keys, starts, stops, source_stamp=""):
+        self.frame = frame
+        self.key_column = key_column
+        self.source_stamp = source_stamp
+        self._offsets = dict(zip(keys.tolist(), zip(starts.tolist(), stops.tolist())))
+        self._arrays = (keys, starts, stops)
+
+    @classmethod
+    def build(cls, df, key_column, source_stamp=""):
+        keys = pd.to_numeric(df[key_column], errors="coerce")
+        valid = keys.notna().to_numpy()
+        key_values = keys.to_numpy()[valid].astype(np.int64)
+        order = np.argsort(key_values, kind="stable")
+        frame = df[valid].iloc[order].reset_index(drop=True)
+        sorted_keys = key_values[order]
+        uniq, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        return cls(frame, key_column, uniq, starts, starts + counts, source_stamp)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, policy_number):
+        return normalize_policy_number(policy_number) in self._offsets
+
+    def lookup(self, policy_number):
+        """Rows for one policy (in their original relative order); empty frame if unknown."""
+        span = self._offsets.get(normalize_policy_number(policy_number))
+        if span is None:
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[span[0]:span[1]]
+
+    def save(self, path_prefix):
+        directory = os.path.dirname(path_prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        keys, starts, stops = self._arrays
+        tmp = f".tmp-{os.getpid()}"
+        self.frame.to_pickle(f"{path_prefix}.idx.pkl{tmp}")
+        with open(f"{path_prefix}.idx.npz{tmp}", "wb") as f:
+            np.savez(f, keys=keys, starts=starts, stops=stops, key_column=np.array(self.key_column),
+                     source_stamp=np.array(self.source_stamp))
+        os.replace(f"{path_prefix}.idx.pkl{tmp}", f"{path_prefix}.idx.pkl")
+        os.replace(f"{path_prefix}.idx.npz{tmp}", f"{path_prefix}.idx.npz")
+
+    @classmethod
+    def load(cls, path_prefix):
+        with np.load(f"{path_prefix}.idx.npz") as arrays:
+            return cls(pd.read_pickle(f"{path_prefix}.idx.pkl"), str(arrays["key_column"]),
+                       arrays["keys"], arrays["starts"], arrays["stops"], str(arrays["source_stamp"]))
+
+
+def _source_stamp(source_path):
+    stat = os.stat(source_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_or_build(source_path, key_column, reader=pd.read_csv, name=None, cache_dir=INDEX_DIR):
+    """
+    Load the persisted index for `source_path`, rebuilding it (with
+    `reader(source_path)`) when the source changed since it was saved.
+    """
+    name = name or os.path.basename(source_path)
+    path_prefix = os.path.join(cache_dir, name)
+    stamp = _source_stamp(source_path)
+    if os.path.exists(f"{path_prefix}.idx.npz") and os.path.exists(f"{path_prefix}.idx.pkl"):
+        with np.load(f"{path_prefix}.idx.npz") as arrays:
+            fresh = str(arrays["source_stamp"]) == stamp and str(arrays["key_column"]) == key_column
+        if fresh:
+            return PolicyIndex.load(path_prefix)
+    index = PolicyIndex.build(reader(source_path), key_column, stamp)
+    index.save(path_prefix)
+    return index
@@ -0,0 +1,208 @@
+"""
+Premium adjustments from telematics, computed locally.
+
+The policy dashboard used to hand the premium rules to the LLM along with
+raw readings and ask it to do the arithmetic: a slow remote call per policy,
+and numbers that were not reliably right. The rules are simple enough to
+apply directly, to the whole book at once:
+
+* risk adjustment: +10% if the policy's average risk_score > 0.5, -5% if
+  it is < 0.3, otherwise 0;
+* stress/fatigue adjustment: +15% if average stress > 40 or average fatigue
+  > 30, -5% if both are < 20, otherwise 0;
+* only Personal Automobile Liability Coverage is repriced; its base rate is
+  the written premium of the policy's latest transaction for that coverage;
+* final premium = base rate * (1 + (risk + stress/fatigue adjustment) / 100),
+  rounded to cents. Policies without telemetry keep their base rate.
+
+Averages are over all of a policy's readings (all drivers), taken from the
+per-policy aggregate store (policy_aggregates.py), so repricing never reads
+the fused readings themselves. Transactions are read in chunks and every step
+is a vectorized filter, sort, merge or np.select, so the nightly job is one
+pass over PolicyTransactions.csv:
+
+    python premium_engine.py                             # -> PolicyPremiums.csv
+    python premium_engine.py --transactions data/synthetic/PolicyTransactions.csv --output premiums.csv
+
+The dashboard reprices the policy being viewed the same way and gives the
+resulting table to the LLM, which only writes the narrative around it.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from fusion_store import FUSION_CSV
+from policy_aggregates import PolicyAggregates, aggregates_path_for, load_current
+from policy_index import normalize_policy_number
+from telemetry_schema import DATE_FORMAT, read_policy_transactions
+import profiling
+
+TRANSACTIONS_FILE = "PolicyTransactions.csv"
+PREMIUMS_FILE = "PolicyPremiums.csv"
+DEFAULT_CHUNKSIZE = 1_000_000
+
+LIABILITY_COVERAGE = "Personal Automobile Liability Coverage"
+
+# (average above/below which the adjustment applies, adjustment in %)
+HIGH_RISK = (0.5, 10.0)
+LOW_RISK = (0.3, -5.0)
+HIGH_STRESS, HIGH_FATIGUE, HIGH_STRESS_FATIGUE_ADJUSTMENT = 40.0, 30.0, 15.0
+LOW_STRESS_FATIGUE, LOW_STRESS_FATIGUE_ADJUSTMENT = 20.0, -5.0
+
+RULES_TEXT = (
+    f"   * Risk Adjustment → {HIGH_RISK[1]:+g}% if avg risk_score > {HIGH_RISK[0]:g}, "
+    f"{LOW_RISK[1]:+g}% if < {LOW_RISK[0]:g}.\n"
+    f"   * Stress/Fatigue Adjustment → {HIGH_STRESS_FATIGUE_ADJUSTMENT:+g}% if avg stress > {HIGH_STRESS:g} "
+    f"or fatigue > {HIGH_FATIGUE:g}, {LOW_STRESS_FATIGUE_ADJUSTMENT:+g}% if both < {LOW_STRESS_FATIGUE:g}.\n"
+)
+
+METRIC_COLUMNS = ["readings", "avg_risk", "avg_stress", "avg_fatigue"]
+OUTPUT_COLUMNS = ["policy_number", "coverage", "effective_date", "base_rate", *METRIC_COLUMNS,
+                  "risk_adjustment_pct", "stress_fatigue_adjustment_pct", "final_premium"]
+
+
+def policy_metrics(aggregates):
+    """Readings and average risk/stress/fatigue per policy over all its drivers, indexed by policy number."""
+    table = aggregates.tables["policy"]
+    sums = table.groupby("policy_number", sort=True)[
+        ["readings", "risk_sum", "stress_sum", "stress_readings", "fatigue_sum", "fatigue_readings"]].sum()
+    return pd.DataFrame({
+        "readings": sums["readings"],
+        "avg_risk": sums["risk_sum"] / sums["readings"].where(sums["readings"] > 0),
+        "avg_stress": sums["stress_sum"] / sums["stress_readings"].where(sums["stress_readings"] > 0),
+        "avg_fatigue": sums["fatigue_sum"] / sums["fatigue_readings"].where(sums["fatigue_readings"] > 0),
+    })
+
+
+def metrics_from_kpis(policy_number, kpis):
+    """policy_metrics() for one policy, from PolicyAggregates.kpis() (None: no readings)."""
+    kpis = kpis or {}
+    row = {column: kpis.get(column) for column in METRIC_COLUMNS}
+    row["readings"] = row["readings"] or 0
+    return pd.DataFrame([row], index=pd.Index([normalize_policy_number(policy_number)], name="policy_number"),
+                        columns=METRIC_COLUMNS).astype({c: "float64" for c in METRIC_COLUMNS[1:]})
+
+
+def base_rates(transactions, coverage=LIABILITY_COVERAGE):
+    """The latest `coverage` transaction per policy (POL_NO, POL_EFF_DT, COVG_CD, WRITTEN_PREM_AMT)."""
+    rows = transactions.loc[transactions["COVG_CD"] == coverage, ["POL_NO", "POL_EFF_DT", "COVG_CD",
+                                                                  "WRITTEN_PREM_AMT"]]
+    rows = rows.sort_values(["POL_NO", "POL_EFF_DT"], kind="stable")
+    return rows.drop_duplicates("POL_NO", keep="last").reset_index(drop=True)
+
+
+def read_base_rates(path=TRANSACTIONS_FILE, chunksize=DEFAULT_CHUNKSIZE, coverage=LIABILITY_COVERAGE):
+    """base_rates() of a transactions CSV, read in bounded-memory chunks."""
+    columns = ["POL_NO", "POL_EFF_DT", "COVG_CD", "WRITTEN_PREM_AMT"]
+    parts = [base_rates(chunk, coverage)
+             for chunk in read_policy_transactions(path, usecols=columns, chunksize=chunksize)]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    # A policy's transactions can span chunks: keep the latest of the per-chunk latest rows
+    return base_rates(pd.concat(parts, ignore_index=True), coverage)
+
+
+def adjustments(metrics):
+    """(risk, stress/fatigue) adjustment in % per row of a frame with avg_risk/avg_stress/avg_fatigue."""
+    risk = metrics["avg_risk"].to_numpy(dtype=np.float64, na_value=np.nan)
+    stress = metrics["avg_stress"].to_numpy(dtype=np.float64, na_value=np.nan)
+    fatigue = metrics["avg_fatigue"].to_numpy(dtype=np.float64, na_value=np.nan)
+    # Comparisons with NaN (no readings) are False: no adjustment
+    risk_pct = np.select([risk > HIGH_RISK[0], risk < LOW_RISK[0]], [HIGH_RISK[1], LOW_RISK[1]], 0.0)
+    stress_fatigue_pct = np.select(
+        [(stress > HIGH_STRESS) | (fatigue > HIGH_FATIGUE),
+         (stress < LOW_STRESS_FATIGUE) & (fatigue < LOW_STRESS_FATIGUE)],
+        [HIGH_STRESS_FATIGUE_ADJUSTMENT, LOW_STRESS_FATIGUE_ADJUSTMENT], 0.0)
+    return risk_pct, stress_fatigue_pct
+
+
+def reprice(rates, metrics):
+    """
+    One row per policy in `rates` (from base_rates) with its telemetry
+    `metrics` (from policy_metrics), adjustments and final premium, in
+    OUTPUT_COLUMNS.
+    """
+    out = rates.merge(metrics, how="left", left_on="POL_NO", right_index=True, sort=False)
+    risk_pct, stress_fatigue_pct = adjustments(out)
+    base = out["WRITTEN_PREM_AMT"].to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.DataFrame({
+        "policy_number": out["POL_NO"].to_numpy(),
+        "coverage": out["COVG_CD"].astype(str).to_numpy(),
+        "effective_date": out["POL_EFF_DT"].to_numpy(),
+        "base_rate": base,
+        "readings": out["readings"].fillna(0).astype(np.int64).to_numpy(),
+        "avg_risk": out["avg_risk"].to_numpy(),
+        "avg_stress": out["avg_stress"].to_numpy(),
+        "avg_fatigue": out["avg_fatigue"].to_numpy(),
+        "risk_adjustment_pct": risk_pct,
+        "stress_fatigue_adjustment_pct": stress_fatigue_pct,
+        "final_premium": np.round(base * (1 + (risk_pct + stress_fatigue_pct) / 100), 2),
+    }, columns=OUTPUT_COLUMNS)
+
+
+def premium_table(repriced):
+    """The premium summary table as the dashboard shows it (and the LLM quotes it)."""
+    return pd.DataFrame({
+        "Coverage": repriced["coverage"],
+        "Base Rate ($)": repriced["base_rate"],
+        "Risk Adjustment (%)": repriced["risk_adjustment_pct"],
+        "Stress/Fatigue Adjustment (%)": repriced["stress_fatigue_adjustment_pct"],
+        "Final Premium ($)": repriced["final_premium"],
+    }).reset_index(drop=True)
+
+
+def load_aggregates(fusion_path=FUSION_CSV):
+    """The aggregate store for the fused output, rebuilt from the CSV when missing or stale."""
+    aggregates = load_current(fusion_path)
+    if aggregates is None:
+        print(f"Aggregates for '{fusion_path}' missing or stale; rebuilding from the CSV")
+        aggregates = PolicyAggregates.from_csv(fusion_path)
+        aggregates.save(aggregates_path_for(fusion_path))
+    return aggregates
+
+
+def reprice_book(transactions_path=TRANSACTIONS_FILE, aggregates=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Reprice every policy in `transactions_path` against `aggregates` (default: load_aggregates())."""
+    aggregates = aggregates if aggregates is not None else load_aggregates()
+    with profiling.stage("read_policies") as s:
+        rates = read_base_rates(transactions_path, chunksize)
+        s.rows = len(rates)
+    with profiling.stage("premium_reprice", rows=len(rates)):
+        return reprice(rates, policy_metrics(aggregates))
+
+
+def write_premiums(repriced, path=PREMIUMS_FILE):
+    """Write the repriced book to `path` as CSV, atomically."""
+    # Few distinct effective dates: format each once (as parse_dates parses them), not per row
+    codes, uniques = pd.factorize(repriced["effective_date"])
+    dates = pd.DatetimeIndex(uniques).strftime(DATE_FORMAT).to_numpy(dtype=object).take(codes, mode="clip")
+    dates[codes < 0] = ""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    repriced.assign(effective_date=dates).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprice Personal Automobile Liability Coverage from telematics.")
+    parser.add_argument("--transactions", default=TRANSACTIONS_FILE)
+    parser.add_argument("--fusion", default=FUSION_CSV, help="fused output whose aggregates to use")
+    parser.add_argument("--output", default=PREMIUMS_FILE)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    repriced = reprice_book(args.transactions, load_aggregates(args.fusion), args.chunksize)
+    write_premiums(repriced, args.output)
+    with_telemetry = int((repriced["readings"] > 0).sum())
+    changed = int((repriced["final_premium"] != repriced["base_rate"]).sum())
+    print(f"Repriced {len(repriced)} policies ({with_telemetry} with telemetry, {changed} changed) "
+          f"in {time.perf_counter() - t0:.2f}s -> '{args.output}'")
+    return repriced
+
+
+if __name__ == "__main__":
+    main()
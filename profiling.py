@@ -0,0 +1,228 @@
+"""
+Per-stage timing for the scoring pipeline and the Streamlit apps.
+
+Wrap a unit of work in a stage to record its wall time, rows processed
+(rows/s) and the process's peak RSS afterwards:
+
+    with profiling.stage("detect_events", rows=len(df)):
+        df["event"] = detect_events(df)
+
+    with profiling.stage("load_csv") as s:
+        df = read_telemetry(path)
+        s.rows = len(df)
+
+Recording a stage costs a few microseconds, so it is always on. Records are
+kept in a bounded in-memory history and aggregated per stage; export them as
+
+* JSON lines: set PIPELINE_PROFILE_LOG (or configure(log_path=...)) and
+  every finished stage is appended to that file as one JSON object;
+* Prometheus text: write_prometheus() writes counters/gauges per stage to
+  .metrics/<component>.prom (atomically), for node_exporter's textfile
+  collector or any scraper that reads the exposition format;
+* a table: summary(), e.g. `python scoring_worker.py --once --profile`.
+
+Peak RSS is the process high-water mark (getrusage); `rss_growth_bytes` is
+how much a stage raised it, which points at the stage that sets the memory
+footprint. On platforms without the resource module both are omitted.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DIR = ".metrics"
+METRIC_PREFIX = "pipeline_stage"
+HISTORY = 10_000
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Stage:
+    """One timed run of a stage; set `rows` inside the block if not known up front."""
+
+    __slots__ = ("name", "rows", "started_at", "seconds", "peak_rss_bytes", "rss_growth_bytes", "error")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.started_at = None
+        self.seconds = None
+        self.peak_rss_bytes = None
+        self.rss_growth_bytes = None
+        self.error = None
+
+    @property
+    def rows_per_s(self):
+        if self.rows is None or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+    def as_dict(self):
+        record = {name: getattr(self, name) for name in self.__slots__}
+        record["stage"] = record.pop("name")
+        record["rows_per_s"] = None if self.rows_per_s is None else round(self.rows_per_s, 1)
+        return record
+
+
+class Profiler:
+    def __init__(self, component="pipeline", log_path=None, history=HISTORY):
+        self.component = component
+        self.log_path = log_path
+        self._history = deque(maxlen=history)
+        self._totals = {}
+        self._captures = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        record = Stage(name, rows)
+        record.started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        peak_before = peak_rss_bytes()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            record.seconds = time.perf_counter() - t0
+            record.peak_rss_bytes = peak_rss_bytes()
+            if peak_before is not None:
+                record.rss_growth_bytes = record.peak_rss_bytes - peak_before
+            self._record(record)
+
+    def _record(self, record):
+        with self._lock:
+            self._history.append(record)
+            totals = self._totals.setdefault(record.name, {
+                "calls": 0, "errors": 0, "seconds": 0.0, "rows": 0, "max_seconds": 0.0, "last": None})
+            totals["calls"] += 1
+            totals["errors"] += record.error is not None
+            totals["seconds"] += record.seconds
+            totals["rows"] += record.rows or 0
+            totals["max_seconds"] = max(totals["max_seconds"], record.seconds)
+            totals["last"] = record
+            for captured in self._captures.values():
+                captured.append(record)
+            if self.log_path:
+                line = json.dumps({"component": self.component, **record.as_dict()})
+                with open(self.log_path, "a") as f:
+                    f.write(line + "\n")
+
+    @contextmanager
+    def capture(self):
+        """Collect the stages that finish inside the block (in any thread) into the yielded list."""
+        captured = []
+        with self._lock:
+            self._captures[id(captured)] = captured
+        try:
+            yield captured
+        finally:
+            with self._lock:
+                del self._captures[id(captured)]
+
+    def records(self):
+        """Finished stages, oldest first (up to the history limit)."""
+        with self._lock:
+            return list(self._history)
+
+    def totals(self):
+        """{stage: {calls, errors, seconds, rows, max_seconds, last}} since start or reset()."""
+        with self._lock:
+            return {name: dict(totals) for name, totals in self._totals.items()}
+
+    def reset(self):
+        with self._lock:
+            self._history.clear()
+            self._totals.clear()
+
+    def summary(self, records=None):
+        """Text table of `records` (default: every recorded stage, in order)."""
+        records = self.records() if records is None else records
+        lines = [f"{'stage':<20}{'seconds':>10}{'rows':>12}{'rows/s':>14}{'peak RSS':>12}"]
+        for r in records:
+            rows = "" if r.rows is None else f"{r.rows:,}"
+            rate = "" if r.rows_per_s is None else f"{r.rows_per_s:,.0f}"
+            rss = "" if r.peak_rss_bytes is None else f"{r.peak_rss_bytes / 2**20:,.0f} MB"
+            lines.append(f"{r.name:<20}{r.seconds:>10.4f}{rows:>12}{rate:>14}{rss:>12}"
+                         + (f"  ({r.error})" if r.error else ""))
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        """Aggregates in the Prometheus text exposition format."""
+        totals = self.totals()
+        metrics = [
+            ("seconds_total", "counter", "Wall time spent in the stage.", lambda t: t["seconds"]),
+            ("calls_total", "counter", "Times the stage ran.", lambda t: t["calls"]),
+            ("errors_total", "counter", "Times the stage raised.", lambda t: t["errors"]),
+            ("rows_total", "counter", "Rows processed by the stage.", lambda t: t["rows"]),
+            ("max_seconds", "gauge", "Slowest run of the stage.", lambda t: t["max_seconds"]),
+            ("last_seconds", "gauge", "Wall time of the last run.", lambda t: t["last"].seconds),
+            ("last_rows_per_second", "gauge", "Throughput of the last run.", lambda t: t["last"].rows_per_s),
+            ("last_peak_rss_bytes", "gauge", "Process peak RSS after the last run.",
+             lambda t: t["last"].peak_rss_bytes),
+        ]
+        lines = []
+        for suffix, kind, help_text, value in metrics:
+            name = f"{METRIC_PREFIX}_{suffix}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for stage_name, stage_totals in sorted(totals.items()):
+                v = value(stage_totals)
+                if v is not None:
+                    labels = f'component="{_escape(self.component)}",stage="{_escape(stage_name)}"'
+                    lines.append(f"{name}{{{labels}}} {v}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Write to_prometheus() to `path` (default .metrics/<component>.prom) atomically."""
+        path = path or os.path.join(METRICS_DIR, f"{self.component}.prom")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide profiler used by the pipeline and the apps
+PROFILER = Profiler(log_path=os.environ.get("PIPELINE_PROFILE_LOG") or None)
+
+
+def configure(component=None, log_path=None):
+    """Set the component label (e.g. "dashboard") and/or JSON log file of the default profiler."""
+    if component is not None:
+        PROFILER.component = component
+    if log_path is not None:
+        PROFILER.log_path = log_path
+    return PROFILER
+
+
+def stage(name, rows=None):
+    """PROFILER.stage(): time a block of work, see the module docstring."""
+    return PROFILER.stage(name, rows)
+
+
+def write_prometheus(path=None):
+    return PROFILER.write_prometheus(path)
@@ -0,0 +1,291 @@
+"""
+Compact, token-budgeted prompts for the policy dashboard's AI Insight.
+
+The dashboard used to paste the last 100 fused readings and 30 policy
+transactions into the prompt as to_string() tables: thousands of input
+tokens that cover only the latest slice of a policy's history, and grow with
+column widths rather than with anything the model needs. The prompt now
+carries statistics over all of the policy's readings instead, computed with
+vectorized pandas:
+
+* per metric (risk score, speed, stress, fatigue): mean, median, 90th
+  percentile, max and the trend slope per hour (least squares over time);
+* per driver: readings, mean risk/stress/fatigue and high-risk share;
+* event counts by label;
+* one row per coverage: transactions, latest effective date and written
+  premium (the base rate the premium rules start from);
+* the most extreme readings (largest robust z-score over the metrics) as a
+  small outlier table, as many as fit in the token budget.
+
+Tokens are estimated at CHARS_PER_TOKEN characters each, the usual ratio
+for English and numbers with Llama/GPT tokenizers. To fit `token_budget`,
+the outlier table is trimmed first, then the per-driver table, the event
+counts and (when the premiums are given) the coverage summary are left out;
+the summary line, the metric statistics, the premium inputs and the
+instructions always stay, and a budget below them raises ValueError:
+
+    messages = build_policy_insight_messages(policy, driver_df, policy_df, token_budget=800)
+    llm.complete_sync(messages)
+
+Given `premiums` (premium_engine.premium_table()), the prompt carries the
+computed premium table and asks only for the narrative around it; without
+it, the model is asked to apply the premium rules itself, as before.
+
+benchmarks/bench_prompt_builder.py compares prompt size and latency with the
+old prompt against the local LLM stub.
+"""
+import numpy as np
+import pandas as pd
+
+from event_rules import LABEL_SEPARATOR, NORMAL_LABEL
+from policy_aggregates import HIGH_RISK_THRESHOLD
+from premium_engine import RULES_TEXT
+from telemetry_schema import FUSION_DATES, parse_dates
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 900          # user message, outlier table included
+MAX_OUTLIERS = 20
+OUTLIER_Z = 3.0                     # robust z-score (median / MAD) above which a reading is an outlier
+_MAD_SCALE = 1.4826                 # MAD -> standard deviation for normal data
+
+METRICS = {"risk_score": "risk_score", "speed": "speed", "stress_level": "stress", "fatigue": "fatigue"}
+OUTLIER_COLUMNS = ["timestamp", "driver_name", "risk_score", "speed", "stress_level", "fatigue", "event"]
+
+POLICY_INSIGHT_SYSTEM = (
+    "You are a risk analytics assistant for vehicle insurance. "
+    "You analyze driver telematics data and policy transactions to produce clear, accurate risk insights. "
+    "You must summarize driver risk trends, anomalies, and possible causes concisely. "
+    "Then, calculate updated insurance premiums only for applicable coverages like Personal Automobile Liability Coverage (exclude other coverages). "
+    "Use consistent percentage adjustments across text and tables. "
+    "If the driver's risk is low, apply discounts (negative adjustments); if high, apply penalties (positive adjustments). "
+    "Ensure that the final premium summary table exactly matches the calculations described in the text. "
+    "The table must include: Coverage, Base Rate, Risk Adjustment (%), Stress/Fatigue Adjustment (%), and Final Premium ($). "
+    "Finally, provide a short human-readable explanation of the overall driver risk profile and premium justification. Please don't show any python script to calculate premiums"
+    "Present all calculations step-by-step in a clear, structured, human-readable format. "
+    "Use consistent numeric formatting and avoid mixing up numbers with calculations. "
+)
+
+POLICY_INSIGHT_INSTRUCTIONS = (
+    "Instructions:\n"
+    "- Summarize driver risk trends and anomalies clearly.\n"
+    "- Identify possible causes for risky behavior.\n"
+    "- Apply risk-based premium adjustments as follows:\n"
+    + RULES_TEXT +
+    "- Only include Personal Automobile Liability Coverage in the premium table.\n"
+    "- Display the final results in a professional, structured report with:\n"
+    "   • Risk Trends Summary\n"
+    "   • Anomalies and Possible Causes\n"
+    "   • Premium Calculation Steps\n"
+    "   • Premium Summary Table\n"
+    "   • Final Remarks or Recommendations"
+)
+
+# With the premium table computed by premium_engine.py: explain it, no arithmetic
+POLICY_NARRATIVE_SYSTEM = (
+    "You are a risk analytics assistant for vehicle insurance. "
+    "You analyze driver telematics data and policy transactions to produce clear, accurate risk insights. "
+    "You must summarize driver risk trends, anomalies, and possible causes concisely. "
+    "Premium adjustments are calculated by the insurer's rating engine and given to you: quote their numbers exactly, "
+    "never recalculate or change them. "
+    "Finally, provide a short human-readable explanation of the overall driver risk profile and premium justification. "
+)
+
+POLICY_NARRATIVE_INSTRUCTIONS = (
+    "Instructions:\n"
+    "- Summarize driver risk trends and anomalies clearly.\n"
+    "- Identify possible causes for risky behavior.\n"
+    "- Explain which of these rules produced the premium adjustments above, using the averages given:\n"
+    + RULES_TEXT +
+    "- Display the final results in a professional, structured report with:\n"
+    "   • Risk Trends Summary\n"
+    "   • Anomalies and Possible Causes\n"
+    "   • Premium Adjustment Explanation\n"
+    "   • Final Remarks or Recommendations"
+)
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class MetricArrays:
+    """The metric columns of a frame as one float64 array, plus what several summaries share."""
+
+    __slots__ = ("names", "values", "hours", "start", "end", "_percentiles")
+
+    def __init__(self, df):
+        columns = [c for c in METRICS if c in df.columns]
+        self.names = [METRICS[c] for c in columns]
+        # Column-major, so per-metric reductions and partitions read contiguous memory
+        self.values = np.empty((len(df), len(columns)), order="F")
+        for j, column in enumerate(columns):
+            self.values[:, j] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        ts = timestamps(df)
+        self.start, self.end = ts.min(), ts.max()
+        self.hours = ((ts - self.start) / pd.Timedelta(hours=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+        self._percentiles = None
+
+    def percentiles(self):
+        """(p50, p90) per metric."""
+        if self._percentiles is None:
+            self._percentiles = _percentiles(self.values, [50, 90])
+        return self._percentiles
+
+
+def timestamps(df):
+    """The readings' timestamps, parsed with the fused output's format when they are still strings."""
+    return parse_dates(df[["timestamp"]].copy(), FUSION_DATES)["timestamp"]
+
+
+def _percentiles(y, q):
+    # np.percentile partitions each column; the NaN-aware variant is much slower, so only when needed
+    return np.nanpercentile(y, q, axis=0) if np.isnan(y).any() else np.percentile(y, q, axis=0)
+
+
+def trend_slopes(df, metrics=None):
+    """Least-squares slope per hour of each metric over the readings' timestamps (NaN-aware)."""
+    metrics = metrics or MetricArrays(df)
+    x, y = metrics.hours, metrics.values
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if not (np.isnan(x).any() or np.isnan(y).any()):
+            dx = x - x.mean()
+            slope = (dx @ y) / (dx @ dx)     # sum(dx) == 0, so no need to center y
+        else:
+            slope = np.full(len(metrics.names), np.nan)
+            for j in range(len(metrics.names)):
+                valid = ~(np.isnan(x) | np.isnan(y[:, j]))
+                if valid.sum() >= 2:
+                    dx = x[valid] - x[valid].mean()
+                    slope[j] = (dx @ y[valid, j]) / (dx @ dx)
+    return pd.Series(slope, index=metrics.names)
+
+
+def metric_stats(df, metrics=None):
+    """One row per metric: mean, p50, p90, max and slope per hour."""
+    metrics = metrics or MetricArrays(df)
+    p50, p90 = metrics.percentiles()
+    return pd.DataFrame({
+        "mean": np.nanmean(metrics.values, axis=0),
+        "p50": p50,
+        "p90": p90,
+        "max": np.nanmax(metrics.values, axis=0),
+        "slope_per_h": trend_slopes(df, metrics).to_numpy(),
+    }, index=pd.Index(metrics.names, name="metric"))
+
+
+def driver_stats(df, metrics=None):
+    """One row per driver: readings, mean risk/stress/fatigue and high-risk share."""
+    metrics = metrics or MetricArrays(df)
+    values = pd.DataFrame(metrics.values, columns=metrics.names)
+    values["high_risk_share"] = values["risk_score"] >= HIGH_RISK_THRESHOLD
+    # Group on the categorical codes, not strings
+    grouped = values.groupby(df["driver_name"].astype("category").array, observed=True, sort=True)
+    stats = grouped[[c for c in ("risk_score", "stress", "fatigue") if c in metrics.names]
+                    + ["high_risk_share"]].mean()
+    stats.insert(0, "readings", grouped.size())
+    stats.index = stats.index.astype(str).rename("driver")
+    return stats
+
+
+def event_counts(df):
+    """Readings per event label (a reading can carry several), normal readings excluded."""
+    counts = df["event"].astype("category").value_counts()
+    counts = counts[counts > 0]
+    labels = counts.index.astype(str).str.split(LABEL_SEPARATOR)
+    per_label = pd.Series(counts.to_numpy().repeat(labels.str.len()), index=np.concatenate(labels.to_numpy()))
+    per_label = per_label.groupby(level=0).sum().drop(NORMAL_LABEL, errors="ignore")
+    return per_label.sort_values(ascending=False, kind="stable")
+
+
+def outlier_rows(df, limit=MAX_OUTLIERS, threshold=OUTLIER_Z, metrics=None):
+    """Up to `limit` readings whose largest robust z-score is >= `threshold`, most extreme first."""
+    metrics = metrics or MetricArrays(df)
+    deviation = np.abs(metrics.values - metrics.percentiles()[0])
+    mad = _percentiles(deviation, 50) * _MAD_SCALE
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = deviation / np.where(mad > 0, mad, np.nan)
+    score = np.where(np.isnan(z), -np.inf, z).max(axis=1, initial=-np.inf)
+    picked = np.flatnonzero(score >= threshold)
+    picked = picked[np.argsort(-score[picked], kind="stable")][:limit]
+    rows = df.iloc[picked][[c for c in OUTLIER_COLUMNS if c in df.columns]].copy()
+    rows.insert(len(rows.columns), "max_z", score[picked])
+    return rows
+
+
+def coverage_summary(policy_df):
+    """One row per coverage: transactions, latest effective date and its written premium."""
+    latest = policy_df.sort_values("POL_EFF_DT", kind="stable").groupby("COVG_CD", observed=True).tail(1)
+    summary = latest.set_index("COVG_CD")[["POL_EFF_DT", "TRANS_CD", "WRITTEN_PREM_AMT"]]
+    summary.insert(0, "transactions", policy_df.groupby("COVG_CD", observed=True).size())
+    summary.index.name = "coverage"
+    return summary
+
+
+def _cents(values):
+    return values.map("{:.2f}".format, na_action="ignore")
+
+
+def _table(df, index=True, money=()):
+    # CSV rather than to_string(): no column padding, which is most of a padded table's tokens.
+    # Statistics go to 3 significant digits; `money` columns exactly, to the cent.
+    if money:
+        df = df.assign(**{column: _cents(df[column]) for column in money})
+    return df.to_csv(index=index, float_format="%.3g", lineterminator="\n").rstrip("\n")
+
+
+def _user_content(sections, outliers, rows, tail):
+    parts = list(sections.values())
+    if rows:
+        parts.append(f"Most extreme readings (robust z-score >= {OUTLIER_Z:g}, {rows} of {len(outliers)}):\n"
+                     + _table(outliers.head(rows), index=False))
+    return "\n\n".join(parts + [tail])
+
+
+def build_policy_insight_messages(policy_number, driver_df, policy_df, token_budget=DEFAULT_TOKEN_BUDGET,
+                                  premiums=None):
+    """
+    System and user messages for the AI Insight of one policy, the user message within `token_budget`.
+    Raises ValueError if the sections that always stay do not fit.
+    """
+    metrics = MetricArrays(driver_df)
+    events = event_counts(driver_df)
+    high_risk = int((driver_df["risk_score"] >= HIGH_RISK_THRESHOLD).sum())
+    sections = {
+        "summary": f"Driver telematics for policy {policy_number}: {len(driver_df)} readings from "
+                   f"{metrics.start} to {metrics.end}, {high_risk} with risk_score >= {HIGH_RISK_THRESHOLD}.",
+        "metrics": "Metric statistics over all readings (slope_per_h: least-squares change per hour):\n"
+                   + _table(metric_stats(driver_df, metrics)),
+        "drivers": "Per driver:\n" + _table(driver_stats(driver_df, metrics)),
+        "events": "Event counts: " + (", ".join(f"{label} {count}" for label, count in events.items()) or "none"),
+        "coverage": f"Policy transactions ({len(policy_df)} rows), latest per coverage:\n"
+                    + _table(coverage_summary(policy_df), money=["WRITTEN_PREM_AMT"]),
+    }
+    # Left out in this order when even the prompt without outliers is over budget
+    optional = ["drivers", "events"]
+    system, tail = POLICY_INSIGHT_SYSTEM, POLICY_INSIGHT_INSTRUCTIONS
+    if premiums is not None:
+        # The model only explains the computed table, so the base rates are not needed on their own
+        sections["premiums"] = ("Premium adjustments computed by the rating engine (final, do not recalculate):\n"
+                                + _table(premiums, index=False, money=["Base Rate ($)", "Final Premium ($)"]))
+        optional.append("coverage")
+        system, tail = POLICY_NARRATIVE_SYSTEM, POLICY_NARRATIVE_INSTRUCTIONS
+
+    # Largest outlier table that still fits the budget
+    outliers = outlier_rows(driver_df, metrics=metrics)
+    for rows in range(len(outliers), -1, -1):
+        content = _user_content(sections, outliers, rows, tail)
+        if estimate_tokens(content) <= token_budget:
+            break
+    else:
+        for name in optional:
+            del sections[name]
+            content = _user_content(sections, outliers, 0, tail)
+            if estimate_tokens(content) <= token_budget:
+                break
+        else:
+            raise ValueError(f"token_budget {token_budget} is below the ~{estimate_tokens(content)} tokens "
+                             f"the summary, metric statistics, premium inputs and instructions need")
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": content},
+    ]
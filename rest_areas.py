@@ -0,0 +1,232 @@
+"""
+Rest-area data and nearest-rest-area lookups.
+
+Rest areas come from a pluggable source (the NY open-data endpoint by
+default, or a local JSON/CSV file for tests and air-gapped nodes) and are
+kept in a local on-disk snapshot (`.cache/rest_areas.npz`, plain NumPy
+arrays, no pickle). load_rest_areas() serves the snapshot while it is younger
+than the TTL; after that it revalidates with the source using the saved
+ETag / Last-Modified, and keeps serving the old snapshot if the source is
+unreachable. A snapshot taken from another source (e.g. after changing
+DRIVEBUDDY_REST_AREAS) is refetched right away, without a validator.
+
+nearest_rest_area() used to compute a geodesic distance to every rest area
+for every lookup. RestAreaIndex keeps a BallTree (haversine metric) over the
+rest-area coordinates: the tree picks the k closest candidates on the sphere,
+and only those are refined with the exact (ellipsoidal) geodesic distance.
+Batch queries take whole arrays of GPS points, so nearest rest areas can be
+computed for a full fleet at once.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+import warnings
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+from sklearn.neighbors import BallTree
+
+REST_AREA_URL = "https://data.ny.gov/resource/qebf-4fd8.json"
+REST_AREA_COLUMNS = ['name', 'description', 'travel_direction', 'latitude', 'longitude']
+TEXT_COLUMNS = ['name', 'description', 'travel_direction']
+COORD_COLUMNS = ['latitude', 'longitude']
+
+SNAPSHOT_PATH = os.path.join(".cache", "rest_areas.npz")
+SNAPSHOT_TTL_SECONDS = 7 * 24 * 3600     # rest areas change rarely
+FETCH_TIMEOUT_SECONDS = 10
+# Point this at a local .json/.csv file (or another URL) to override the source
+SOURCE_ENV_VAR = "DRIVEBUDDY_REST_AREAS"
+
+EARTH_RADIUS_KM = 6371.0088
+# Spherical and ellipsoidal distances differ by <0.5%, so the true nearest
+# rest area is always among a handful of haversine candidates, and only
+# candidates within that margin of the best one need the exact distance.
+DEFAULT_CANDIDATES = 5
+HAVERSINE_TOLERANCE = 0.01
+
+
+def _normalize(rest_df):
+    rest_df = rest_df.reindex(columns=REST_AREA_COLUMNS)
+    for column in TEXT_COLUMNS:
+        rest_df[column] = rest_df[column].fillna("").astype(str)
+    for column in COORD_COLUMNS:
+        rest_df[column] = pd.to_numeric(rest_df[column], errors="coerce")
+    return rest_df.reset_index(drop=True)
+
+
+# -----------------------------
+# Sources
+# -----------------------------
+class HttpRestAreaSource:
+    """Rest areas from a JSON endpoint, revalidated with ETag / Last-Modified."""
+
+    def __init__(self, url=REST_AREA_URL, timeout=FETCH_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, validator=None):
+        """Return (rest_df, validator); rest_df is None when the source reports no change."""
+        request = urllib.request.Request(self.url)
+        validator = validator or {}
+        if validator.get("etag"):
+            request.add_header("If-None-Match", validator["etag"])
+        if validator.get("last_modified"):
+            request.add_header("If-Modified-Since", validator["last_modified"])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                body = resp.read()
+                new_validator = {"etag": resp.headers.get("ETag"),
+                                 "last_modified": resp.headers.get("Last-Modified")}
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, validator
+            raise
+        return _normalize(pd.read_json(io.BytesIO(body))), new_validator
+
+    def __repr__(self):
+        return f"HttpRestAreaSource({self.url!r})"
+
+
+class LocalFileRestAreaSource:
+    """Rest areas from a local .json or .csv file; the validator is a content hash."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, validator=None):
+        with open(self.path, "rb") as f:
+            body = f.read()
+        etag = hashlib.sha256(body).hexdigest()
+        if validator and validator.get("etag") == etag:
+            return None, validator
+        reader = pd.read_csv if self.path.endswith(".csv") else pd.read_json
+        return _normalize(reader(io.BytesIO(body))), {"etag": etag, "last_modified": None}
+
+    def __repr__(self):
+        return f"LocalFileRestAreaSource({self.path!r})"
+
+
+def default_source():
+    location = os.environ.get(SOURCE_ENV_VAR, REST_AREA_URL)
+    if location.startswith(("http://", "https://")):
+        return HttpRestAreaSource(location)
+    return LocalFileRestAreaSource(location)
+
+
+def fetch_rest_areas(url=REST_AREA_URL):
+    rest_df, _ = HttpRestAreaSource(url).fetch()
+    return rest_df
+
+
+# -----------------------------
+# Snapshot
+# -----------------------------
+def save_snapshot(rest_df, meta, path=SNAPSHOT_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    arrays = {column: rest_df[column].to_numpy(dtype=str) for column in TEXT_COLUMNS}
+    arrays.update({column: rest_df[column].to_numpy(dtype=np.float64) for column in COORD_COLUMNS})
+    arrays["meta"] = np.array(json.dumps(meta))
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Return (rest_df, meta), or (None, None) if there is no readable snapshot."""
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+            rest_df = pd.DataFrame({column: arrays[column] for column in REST_AREA_COLUMNS})
+    except (OSError, KeyError, ValueError):
+        return None, None
+    return rest_df, meta
+
+
+def load_rest_areas(source=None, snapshot_path=SNAPSHOT_PATH, ttl=SNAPSHOT_TTL_SECONDS):
+    """
+    Rest areas from the local snapshot, refreshed from `source` (default:
+    default_source()) once the snapshot is older than `ttl` seconds or was
+    taken from a different source.
+    """
+    source = source or default_source()
+    rest_df, meta = load_snapshot(snapshot_path)
+    same_source = rest_df is not None and meta.get("source") == repr(source)
+    if same_source and time.time() - meta["checked_at"] < ttl:
+        return rest_df
+
+    try:
+        # Another source's ETag / Last-Modified says nothing about this one
+        fresh_df, validator = source.fetch(meta.get("validator") if same_source else None)
+    except Exception as e:
+        if rest_df is None:
+            raise
+        warnings.warn(f"Could not refresh rest areas from {source!r} ({e}); using snapshot "
+                      f"from {time.ctime(meta['fetched_at'])}")
+        return rest_df
+
+    now = time.time()
+    if fresh_df is None:
+        # Not modified: keep the data, restart the TTL
+        meta.update(checked_at=now, validator=validator)
+        save_snapshot(rest_df, meta, snapshot_path)
+        return rest_df
+    save_snapshot(fresh_df, {"source": repr(source), "fetched_at": now, "checked_at": now,
+                             "validator": validator, "rows": len(fresh_df)}, snapshot_path)
+    return fresh_df
+
+
+class RestAreaIndex:
+    """Spatial index over rest areas (rows of a frame with latitude/longitude)."""
+
+    def __init__(self, rest_df):
+        rest_df = rest_df.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+        self.rest_df = rest_df
+        self._coords = rest_df[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+        self._tree = BallTree(np.radians(self._coords), metric="haversine") if len(rest_df) else None
+
+    def __len__(self):
+        return len(self.rest_df)
+
+    def _candidates(self, lats, lons, k):
+        points = np.radians(np.column_stack([lats, lons]).astype(np.float64))
+        k = min(k, len(self.rest_df))
+        dist, idx = self._tree.query(points, k=k)
+        return dist * EARTH_RADIUS_KM, idx
+
+    def nearest_batch(self, lats, lons, k=DEFAULT_CANDIDATES, exact=True):
+        """
+        Nearest rest area for every (lat, lon) pair. Returns the matching
+        rest-area rows (one per point, same order) with a `distance_km`
+        column. With exact=False the haversine distance is used as is.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        if self._tree is None or len(lats) == 0:
+            return self.rest_df.iloc[0:0].assign(distance_km=pd.Series(dtype=np.float64))
+
+        dist_km, idx = self._candidates(lats, lons, k)
+        if exact:
+            # Candidates clearly farther than the best can't win; skip geodesic for them
+            contenders = dist_km <= dist_km[:, :1] * (1 + HAVERSINE_TOLERANCE)
+            for i, j in zip(*np.nonzero(contenders)):
+                dist_km[i, j] = geodesic((lats[i], lons[i]), tuple(self._coords[idx[i, j]])).kilometers
+            dist_km[~contenders] = np.inf
+        best = np.argmin(dist_km, axis=1)
+        rows = np.arange(len(lats))
+        result = self.rest_df.iloc[idx[rows, best]].reset_index(drop=True)
+        result["distance_km"] = dist_km[rows, best]
+        return result
+
+    def nearest(self, lat, lon, k=DEFAULT_CANDIDATES):
+        """Nearest rest area row for one point (None if there are no rest areas)."""
+        if self._tree is None:
+            return None
+        return self.nearest_batch([lat], [lon], k=k).iloc[0]
@@ -0,0 +1,153 @@
+import os
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.ensemble import RandomForestRegressor
+
+import profiling
+from rolling_features import DEFAULT_WINDOW, ROLLING_FEATURES, add_rolling_features
+from scorers import DEFAULT_BACKEND, get_scorer
+
+# Bump when the artifact layout or feature set changes; old files are rejected.
+ARTIFACT_VERSION = 1
+MODEL_DIR = "models"
+DEFAULT_ARTIFACT_PATH = os.path.join(MODEL_DIR, f"risk_model_v{ARTIFACT_VERSION}.joblib")
+
+# -----------------------------
+# Encode categorical features
+# -----------------------------
+ENCODERS = {
+    "weather": ("weather_encoded", {'Clear': 0, 'Rain': 1, 'Fog': 2}),
+    "road_type": ("road_encoded", {'highway': 0, 'city': 1, 'rural': 2}),
+    "traffic_density": ("traffic_encoded", {'low': 0, 'medium': 1, 'high': 2}),
+}
+
+FEATURES = ['speed', 'braking', 'acceleration', 'weather_encoded', 'road_encoded', 'traffic_encoded']
+
+_model_cache = {}
+
+
+def encode_context(df, encoders=None):
+    """Add the *_encoded columns used as model features (in place) and return df."""
+    encoders = ENCODERS if encoders is None else encoders
+    for column, (encoded_column, mapping) in encoders.items():
+        # float64 whether the column is object or categorical (typed telemetry)
+        df[encoded_column] = df[column].map(mapping).astype("float64")
+    return df
+
+
+def _feature_matrix(df, artifact):
+    missing = [f for f in artifact["features"] if f not in df.columns]
+    if any(f in ROLLING_FEATURES for f in missing):
+        df = add_rolling_features(df, artifact.get("rolling_window", DEFAULT_WINDOW))
+    if missing:
+        encode_context(df, artifact["encoders"])
+    return df[artifact["features"]].to_numpy(dtype=np.float64)
+
+
+def fit(df, artifact_path=DEFAULT_ARTIFACT_PATH, n_estimators=50, random_state=42,
+        features=None, rolling_window=DEFAULT_WINDOW):
+    """
+    Fit the scaler and risk model on prepared telemetry (events + traffic
+    context) and save them as a versioned artifact. Returns the artifact dict.
+
+    `features` defaults to FEATURES; add rolling_features.ROLLING_FEATURES to
+    train on per-vehicle time-window features (computed over `rolling_window`).
+    Those need each vehicle's history, so score whole files with such an
+    artifact rather than the chunked/incremental paths.
+    """
+    features = list(FEATURES if features is None else features)
+    with profiling.stage("encode", rows=len(df)):
+        encode_context(df)
+        if any(f in ROLLING_FEATURES for f in features):
+            df = add_rolling_features(df, rolling_window)
+        X = df[features].to_numpy(dtype=np.float64)
+
+    # Normalize features
+    with profiling.stage("scale", rows=len(X)):
+        scaler = MinMaxScaler()
+        X_scaled = scaler.fit_transform(X)
+
+    # -----------------------------
+    # Train a simple model (RandomForest) to compute a risk score
+    # For demonstration, we generate a synthetic target
+    # -----------------------------
+    col = {name: i for i, name in enumerate(features)}
+    y = 0.5*X_scaled[:, col['speed']] + 0.3*X_scaled[:, col['braking']] + 0.2*X_scaled[:, col['traffic_encoded']]  # speed*0.5 + braking*0.3 + traffic*0.2
+    y = np.clip(y, 0, 1)  # risk score between 0 and 1
+
+    with profiling.stage("fit", rows=len(X_scaled)):
+        model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+        model.fit(X_scaled, y)
+
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "training_rows": len(df),
+        "features": features,
+        "rolling_window": rolling_window,
+        "encoders": ENCODERS,
+        "scaler": scaler,
+        "model": model,
+    }
+    save_model(artifact, artifact_path)
+    return artifact
+
+
+def save_model(artifact, artifact_path=DEFAULT_ARTIFACT_PATH):
+    directory = os.path.dirname(artifact_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write then rename so readers never load a half-written file
+    tmp_path = f"{artifact_path}.tmp-{os.getpid()}"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, artifact_path)
+    _model_cache.pop(os.path.abspath(artifact_path), None)
+
+
+def load_model(artifact_path=DEFAULT_ARTIFACT_PATH):
+    """
+    Load a fitted artifact, cached per process. The cache is keyed on the
+    file's mtime so a refit by another process is picked up on the next call.
+    """
+    key = os.path.abspath(artifact_path)
+    mtime = os.path.getmtime(artifact_path)
+    cached = _model_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    artifact = joblib.load(artifact_path)
+    if artifact.get("version") != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Model artifact {artifact_path} has version {artifact.get('version')}, "
+            f"expected {ARTIFACT_VERSION}; run fit() again"
+        )
+    _model_cache[key] = (mtime, artifact)
+    return artifact
+
+
+def model_exists(artifact_path=DEFAULT_ARTIFACT_PATH):
+    return os.path.exists(artifact_path)
+
+
+def score(df, artifact=None, artifact_path=DEFAULT_ARTIFACT_PATH, backend=DEFAULT_BACKEND):
+    """
+    Inference only: encode, scale and predict with a previously fitted
+    artifact. Returns risk scores rounded to 2 decimal places. `backend`
+    picks the inference implementation, see scorers.py.
+    """
+    if artifact is None:
+        artifact = load_model(artifact_path)
+    if len(df) == 0:
+        return np.empty(0, dtype=np.float64)
+    with profiling.stage("encode", rows=len(df)):
+        X = _feature_matrix(df, artifact)
+    with profiling.stage("scale", rows=len(X)):
+        X_scaled = artifact["scaler"].transform(X)
+    with profiling.stage("predict", rows=len(X_scaled)):
+        predicted_risk = get_scorer(artifact, backend).predict(X_scaled)
+    return np.round(predicted_risk, 2)
@@ -1,102 +1,126 @@
+import os
 
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.ensemble import RandomForestRegressor
+from context_enrichment import SimulatedTrafficProvider, enrich
+from event_rules import detect_events
+import fusion_store
+import policy_aggregates
+import profiling
+import risk_model
+import scorers
+from telemetry_schema import TIMESTAMP_FORMAT, read_telemetry, warn_unknown_categories
 
-def generate_csv():
+TELEMETRY_FILE = "telemetry_smart_gadget_alice.csv"
+OUTPUT_FILE = "fleet_context_fusion.csv"
+
+OUTPUT_COLS = [
+    'timestamp', 'driver_name','policy_number', 'vehicle_id', 'gps_lat', 'gps_lon',
+    'speed', 'braking', 'traffic_density','weather','road_type', 'stress_level','heart_rate','gsr','fatigue',"event", 'risk_score'
+]
+
+
+def prepare_telemetry(telemetry_df, rng=None, providers=None):
     """
-    
-    Processes telemetry data to detect driving events, simulate traffic conditions, 
-    encode contextual features, and train a Random Forest model to compute a composite 
-    driver risk score. The resulting context-fused dataset is saved as 
-    'fleet_context_fusion.csv' for downstream fleet analytics and risk assessment.
-    
+    Detect driving events and attach traffic context to raw telemetry (in
+    place). The result is what risk_model.fit / risk_model.score expect.
+
+    `providers` are the context providers (see context_enrichment.py); by
+    default traffic is simulated from `rng`, a RandomState. Passing the same
+    state across consecutive slices of a file gives the same labels as one
+    pass over the whole file (used by incremental scoring).
     """
-    telemetry_df = pd.read_csv("telemetry_smart_gadget_alice.csv")
-    
-    # -----------------------------
-    # Thresholds for event detection
-    # -----------------------------
-    HARSH_BRAKE_THRESHOLD = 0.7     # braking value >0.7 → harsh braking
-    OVERSPEED_THRESHOLD = 100       # km/h → overspeed
-    SHARP_TURN_THRESHOLD = 5.0      # placeholder for angular velocity if available
-    
-    telemetry_df["event"] = None
-    
-    # Iterate through rows to detect events
-    for idx, row in telemetry_df.iterrows():
-        events = []  # list to store multiple events if needed
-        
-        if row["braking"] > HARSH_BRAKE_THRESHOLD:
-            events.append("harsh_brake")
-    
-        if row["speed"] > OVERSPEED_THRESHOLD:
-            events.append("overspeed")
-    
-        # Example: if you have angular velocity data
-        if "angular_velocity" in telemetry_df.columns and row["angular_velocity"] > SHARP_TURN_THRESHOLD:
-            events.append("sharp_turn")
-    
-        # Join events (comma separated if multiple triggered)
-        telemetry_df.at[idx, "event"] = ", ".join(events) if events else "normal"
-    # -----------------------------
-    # Simulated traffic data (for demonstration)
     # -----------------------------
-    np.random.seed(42)
-    traffic_levels = ['low', 'medium', 'high']
-    traffic_df = telemetry_df[['timestamp','vehicle_id']].copy()
-    traffic_df['traffic_density'] = np.random.choice(traffic_levels, size=len(traffic_df))
-    
+    # Event detection (rule engine, see event_rules.py)
     # -----------------------------
-    # Merge telemetry + traffic
-    # -----------------------------
-    df = telemetry_df.merge(traffic_df, on=['timestamp','vehicle_id'])
-    
-    # -----------------------------
-    # Encode categorical features
-    # -----------------------------
-    weather_map = {'Clear':0, 'Rain':1, 'Fog':2}
-    road_map = {'highway':0, 'city':1, 'rural':2}
-    traffic_map = {'low':0, 'medium':1, 'high':2}
-    
-    df['weather_encoded'] = df['weather'].map(weather_map)
-    df['road_encoded'] = df['road_type'].map(road_map)
-    df['traffic_encoded'] = df['traffic_density'].map(traffic_map)
-    
-    # -----------------------------
-    # Select features for context fusion
-    # -----------------------------
-    features = ['speed','braking','acceleration','weather_encoded','road_encoded','traffic_encoded']
-    
-    X = df[features]
-    
-    # Normalize features
-    scaler = MinMaxScaler()
-    X_scaled = scaler.fit_transform(X)
-    
+    with profiling.stage("detect_events", rows=len(telemetry_df)):
+        telemetry_df["event"] = detect_events(telemetry_df)
+
     # -----------------------------
-    # Train a simple model (RandomForest) to compute a risk score
-    # For demonstration, we generate a synthetic target
+    # Traffic context (simulated unless providers are given)
     # -----------------------------
-    y = 0.5*X_scaled[:,0] + 0.3*X_scaled[:,1] + 0.2*X_scaled[:,5]  # speed*0.5 + braking*0.3 + traffic*0.2
-    y = np.clip(y, 0, 1)  # risk score between 0 and 1
-    
-    model = RandomForestRegressor(n_estimators=50, random_state=42)
-    model.fit(X_scaled, y)
-    
+    if providers is None:
+        providers = [SimulatedTrafficProvider(rng)]
+    with profiling.stage("enrich_context", rows=len(telemetry_df)):
+        return enrich(telemetry_df, providers)
+
+
+def fit(telemetry_path=TELEMETRY_FILE, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH, features=None,
+        providers=None):
+    """Train the risk model on a telemetry file and persist the artifact."""
+    df = prepare_telemetry(read_telemetry(telemetry_path), providers=providers)
+    return risk_model.fit(df, artifact_path, features=features)
+
+
+def score(df, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH, backend=scorers.DEFAULT_BACKEND):
+    """Score prepared telemetry with the persisted artifact (no retraining)."""
+    df = df.copy()
+    df['risk_score'] = risk_model.score(df, artifact_path=artifact_path, backend=backend)
+    return df
+
+
+def process_frame(telemetry_df, rng=None, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH,
+                  backend=scorers.DEFAULT_BACKEND):
+    """Prepare and score a slice of raw telemetry; returns the output columns only."""
+    df = score(prepare_telemetry(telemetry_df, rng), artifact_path, backend)
+    return df[OUTPUT_COLS]
+
+
+def generate_csv(refit=False, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH,
+                 telemetry_path=TELEMETRY_FILE, output_path=OUTPUT_FILE,
+                 output_format=None, parquet_path=None, partition_by="policy_number",
+                 features=None, backend=scorers.DEFAULT_BACKEND, providers=None):
+    """
+
+    Processes telemetry data to detect driving events, simulate traffic conditions,
+    encode contextual features, and score a composite driver risk with the
+    persisted Random Forest artifact (trained first if it does not exist yet or
+    `refit` is set). The resulting context-fused dataset is saved as
+    'fleet_context_fusion.csv' for downstream fleet analytics and risk assessment.
+
+    `output_format` is "csv", "parquet" or "both" (default: both when pyarrow
+    is installed); the Parquet dataset goes to `parquet_path` (default: next
+    to `output_path`, see fusion_store.dataset_path_for) and is partitioned
+    by `partition_by` ("policy_number" or "date"), see fusion_store.py. `features` is passed to
+    risk_model.fit when (re)training, e.g. to add rolling_features.ROLLING_FEATURES.
+    `backend` is the inference implementation ("forest", "flat_forest",
+    "linear"), see scorers.py. `providers` replace the simulated traffic
+    context, see context_enrichment.py. Each step is timed as a profiling
+    stage (load_csv, detect_events, enrich_context, encode, scale, fit,
+    predict, write_csv, write_parquet, aggregate), see profiling.py. The
+    per-policy KPI store the dashboard reads is rebuilt next to the output,
+    see policy_aggregates.py.
+
+    """
+    with profiling.stage("load_csv") as s:
+        telemetry_df = read_telemetry(telemetry_path)
+        s.rows = len(telemetry_df)
+    warn_unknown_categories(telemetry_df)
+    df = prepare_telemetry(telemetry_df, providers=providers)
+
+    if refit or not risk_model.model_exists(artifact_path):
+        risk_model.fit(df, artifact_path, features=features)
+
     # -----------------------------
     # Predict risk scores (context fusion)
     # -----------------------------
-    predicted_risk = model.predict(X_scaled)
-    # Round to 2 decimal places
-    df['risk_score'] = np.round(predicted_risk, 2)
-    output_cols = [
-        'timestamp', 'driver_name','policy_number', 'vehicle_id', 'gps_lat', 'gps_lon',
-        'speed', 'braking', 'traffic_density','weather','road_type', 'stress_level','heart_rate','gsr','fatigue',"event", 'risk_score'
-    ]
-    output_df = df[output_cols]
+    df = score(df, artifact_path, backend)
+    output_df = df[OUTPUT_COLS]
     # Save results
-    output_df.to_csv("fleet_context_fusion.csv", index=False)
-    print("Context-fused risk scores saved to 'fleet_context_fusion.csv'")
+    output_format = output_format or fusion_store.default_format()
+    if output_format in ("csv", "both"):
+        # Write next to the target and rename, so readers never see a half-written file
+        with profiling.stage("write_csv", rows=len(output_df)):
+            tmp_path = f"{output_path}.tmp-{os.getpid()}"
+            output_df.to_csv(tmp_path, index=False, date_format=TIMESTAMP_FORMAT)
+            os.replace(tmp_path, output_path)
+        print(f"Context-fused risk scores saved to '{output_path}'")
+    if output_format in ("parquet", "both"):
+        parquet_path = parquet_path or fusion_store.dataset_path_for(output_path)
+        with profiling.stage("write_parquet", rows=len(output_df)):
+            fusion_store.write_fusion(output_df, parquet_path, partition_by)
+        print(f"Context-fused risk scores saved to '{parquet_path}'")
+    # Written last: the store counts as current only if it is newer than the outputs
+    with profiling.stage("aggregate", rows=len(output_df)):
+        policy_aggregates.PolicyAggregates.from_frame(output_df).save(
+            policy_aggregates.aggregates_path_for(output_path))
     print(df[['timestamp','vehicle_id','speed','braking','traffic_density','risk_score']].head())
+    return output_path
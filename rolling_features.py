@@ -0,0 +1,156 @@
+"""
+Per-vehicle rolling-window features for time-aware risk scoring.
+
+Raw telemetry rows are scored one at a time and arrive unsorted, so the
+model cannot see that a driver braked hard three times in the last ten
+minutes or is getting steadily more tired. add_rolling_features() sorts by
+(vehicle_id, timestamp) once and computes, for every reading, over the
+trailing time window (t - window, t] of the same vehicle:
+
+* event_count_window        readings with any driving event
+* harsh_brake_count_window  harsh_brake readings
+* speed_std_window          sample standard deviation of speed
+* fatigue_trend_window      least-squares slope of fatigue, per minute
+* minutes_since_harsh_brake time since the vehicle's last harsh brake (NaN if none yet)
+
+Everything is computed with cumulative sums over the sorted frame and one
+np.searchsorted for the window starts: no per-vehicle Python loop, so cost
+is O(n log n) in rows and independent of the number of vehicles. The fatigue
+slope needs sums of x*x and x*y, which cancel catastrophically as
+differences of cumulative sums over months of readings; they are taken from
+cumulative sums restarted every `window` of time per vehicle instead, with
+x measured from the start of that time block, so their size does not grow
+with the history.
+"""
+import numpy as np
+import pandas as pd
+
+from event_rules import DEFAULT_RULES, HARSH_BRAKE_THRESHOLD, NORMAL_LABEL, event_bits
+
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+DEFAULT_WINDOW = "15min"
+
+ROLLING_FEATURES = [
+    "event_count_window",
+    "harsh_brake_count_window",
+    "speed_std_window",
+    "fatigue_trend_window",
+    "minutes_since_harsh_brake",
+]
+
+
+def _epoch_seconds(timestamps):
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        return timestamps.to_numpy(dtype="datetime64[s]").astype(np.int64)
+    # Minute-resolution readings repeat a lot: parse each distinct string once
+    codes, uniques = pd.factorize(timestamps)
+    parsed = pd.to_datetime(uniques, format=TIMESTAMP_FORMAT, errors="coerce")
+    seconds = np.append(parsed.to_numpy(dtype="datetime64[s]").astype(np.int64), np.iinfo(np.int64).min)
+    return seconds[codes]  # code -1 (missing) picks the trailing NaT
+
+
+def _window_sum(values, starts):
+    """sum(values[starts[i] : i + 1]) for every i, via one cumulative sum."""
+    cs = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return cs[1:] - cs[starts]
+
+
+def _blocked_window_sums(values, starts, blocks):
+    """
+    Column sums of `values` (rows x columns) over each row's window, split into
+    (rows in the row's own block, rows in the block before it), from cumulative
+    sums restarted at every block, and the number of rows in the block before.
+    `blocks` are consecutive ids, one per run of rows; a window may reach back
+    into the previous block but no further.
+    """
+    cs = pd.DataFrame(values).groupby(blocks, sort=False).cumsum().to_numpy()
+    ahead = cs - values  # sums of the rows before each row in its block
+    first = np.flatnonzero(np.diff(blocks, prepend=blocks[0] - 1))
+    first = np.repeat(first, np.diff(np.append(first, len(blocks))))
+
+    current = cs - ahead[np.maximum(starts, first)]
+    spill = (starts < first)[:, None]
+    previous = np.where(spill, cs[np.maximum(first - 1, 0)] - ahead[starts], 0.0)
+    return current.T, previous.T, np.clip(first - starts, 0, None)
+
+
+def add_rolling_features(df, window=DEFAULT_WINDOW, time_column="timestamp", group_column="vehicle_id"):
+    """
+    Return a copy of `df` (same row order and index) with ROLLING_FEATURES
+    added. `window` is anything pd.Timedelta accepts ("15min", "1h", ...).
+    Rows with an unparseable timestamp get NaN features.
+    """
+    window_s = int(pd.Timedelta(window).total_seconds())
+    if window_s <= 0:
+        raise ValueError("window must be positive")
+
+    out = df.copy()
+    result = np.full((len(out), len(ROLLING_FEATURES)), np.nan)
+    seconds = _epoch_seconds(out[time_column])
+    valid = seconds != np.iinfo(np.int64).min  # NaT
+    if valid.any():
+        groups = pd.factorize(out[group_column], sort=False)[0].astype(np.int64)
+
+        # One sort over (vehicle, time); rows without a timestamp are left out
+        order = np.lexsort((seconds, groups))
+        order = order[valid[order]]
+        needed = {"event", "braking", "speed", "fatigue"} | {rule.column for rule in DEFAULT_RULES}
+        columns = [c for c in out.columns if c in needed]
+        result[order] = _sorted_features(out[columns].iloc[order], seconds[order], groups[order], window_s)
+
+    for i, column in enumerate(ROLLING_FEATURES):
+        out[column] = result[:, i]
+    return out
+
+
+def _sorted_features(frame, t, g, window_s):
+    """Feature matrix for a frame already sorted by (group, time)."""
+    # Monotone key: vehicles laid out back to back on one time axis, separated by
+    # more than a window, so every window start is found by one searchsorted.
+    t0 = t.min()
+    span = int(t.max() - t0) + window_s + 1
+    key = g * span + (t - t0)
+    starts = np.searchsorted(key, key - window_s, side="right")
+
+    if "event" in frame.columns:
+        any_event = frame["event"].to_numpy() != NORMAL_LABEL
+    else:
+        any_event = event_bits(frame)[0] > 0
+    harsh = frame["braking"].to_numpy(dtype=np.float64, na_value=np.nan) > HARSH_BRAKE_THRESHOLD
+
+    count = _window_sum(np.ones(len(t)), starts)
+    event_count = _window_sum(any_event.astype(np.float64), starts)
+    harsh_count = _window_sum(harsh.astype(np.float64), starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Sample std of speed from windowed sums (centered for precision)
+        speed = frame["speed"].to_numpy(dtype=np.float64, na_value=np.nan)
+        speed = np.nan_to_num(speed - np.nanmean(speed))
+        s1 = _window_sum(speed, starts)
+        s2 = _window_sum(speed * speed, starts)
+        var = (s2 - s1 * s1 / count) / (count - 1)
+        speed_std = np.where(count > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+
+        # Least-squares slope of fatigue per minute. x is minutes into the row's block of
+        # `window_s` seconds; rows of the window in the block before are shifted back one block.
+        block = (t - t0) // window_s
+        x = (t - t0 - block * window_s) / 60.0
+        y = frame["fatigue"].to_numpy(dtype=np.float64, na_value=np.nan)
+        y = np.nan_to_num(y - np.nanmean(y))
+        blocks = np.cumsum(np.diff(g * (block.max() + 1) + block, prepend=-1) != 0)
+        (x1, xx1, y1, xy1), (x0, xx0, y0, xy0), n0 = _blocked_window_sums(
+            np.column_stack([x, x * x, y, x * y]), starts, blocks)
+        w = window_s / 60.0
+        sx = x1 + x0 - w * n0
+        sy = y1 + y0
+        sxx = xx1 + xx0 - 2 * w * x0 + w * w * n0
+        sxy = xy1 + xy0 - w * y0
+        denom = count * sxx - sx * sx
+        trend = np.where((count > 1) & (denom > 1e-9), (count * sxy - sx * sy) / denom, np.nan)
+
+    # Time since the last harsh brake: running max of the brake keys, kept only
+    # while it still belongs to the same vehicle
+    last_brake = np.maximum.accumulate(np.where(harsh, key, -1))
+    since = np.where((last_brake >= 0) & (last_brake // span == g), (key - last_brake) / 60.0, np.nan)
+
+    return np.column_stack([event_count, harsh_count, speed_std, trend, since])
@@ -0,0 +1,158 @@
+"""
+Pluggable inference backends for the risk model.
+
+All backends take the scaled feature matrix risk_model.score() builds and
+return raw (unrounded) risk scores:
+
+* "forest"      the fitted RandomForestRegressor, via sklearn (reference)
+* "flat_forest" the same trees compiled into flat NumPy arrays and walked
+                for a block of rows and all trees at once; identical output
+                to "forest" and ~15x faster per call on 1-100 rows (no
+                sklearn validation/joblib overhead), but slower than sklearn
+                on large batches; meant for live, small-batch scoring
+* "linear"      the closed-form target the forest is trained on
+                (0.5*speed + 0.3*braking + 0.2*traffic, clipped to 0..1);
+                no trees at all, orders of magnitude faster on bulk scoring,
+                approximates the forest
+
+Compiled backends are cached per fitted model, so scoring many small frames
+does not recompile. Register other backends with register_scorer().
+See benchmarks/bench_scorers.py for accuracy and throughput numbers.
+"""
+import weakref
+
+import numpy as np
+
+DEFAULT_BACKEND = "forest"
+BLOCK_ROWS = 65_536
+
+# Synthetic target used by risk_model.fit(), by feature name
+LINEAR_WEIGHTS = {"speed": 0.5, "braking": 0.3, "traffic_encoded": 0.2}
+
+
+class ForestScorer:
+    name = "forest"
+
+    def __init__(self, artifact):
+        self.model = artifact["model"]
+
+    def predict(self, X_scaled):
+        return self.model.predict(X_scaled)
+
+
+class FlatForestScorer:
+    """
+    Every tree's nodes concatenated into one set of arrays. Leaves point to
+    themselves (feature 0, threshold +inf), so a fixed number of steps equal
+    to the deepest tree walks every row to its leaf without branching.
+    """
+
+    name = "flat_forest"
+
+    def __init__(self, artifact):
+        trees = [estimator.tree_ for estimator in artifact["model"].estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        feature, threshold, left, right, value, missing_left = [], [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            leaf = tree.children_left == -1
+            nodes = np.arange(tree.node_count)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, np.inf, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            value.append(tree.value[:, 0, 0])
+            # sklearn >= 1.3 trees route NaN features per node; older ones never see NaN here
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(tree.node_count, bool) if missing is None else missing.astype(bool) & ~leaf)
+        self.roots = offsets.astype(np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.value = np.concatenate(value)
+        self.missing_left = np.concatenate(missing_left)
+        self.depth = max(tree.max_depth for tree in trees)
+        self._lists = None
+
+    def _predict_block(self, X):
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        has_nan = np.isnan(X).any()
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        leaf_values = self.value[node]
+        # Summed tree by tree like sklearn, so results match it bit for bit
+        total = np.zeros(len(X))
+        for t in range(leaf_values.shape[1]):
+            total += leaf_values[:, t]
+        return total / leaf_values.shape[1]
+
+    def predict(self, X_scaled):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X_scaled, dtype=np.float32).astype(np.float64)
+        out = np.empty(len(X))
+        for start in range(0, len(X), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self._predict_block(X[start:start + BLOCK_ROWS])
+        return out
+
+    def predict_one(self, x_scaled):
+        """
+        Single row in plain Python: for one event this beats any vectorized
+        call (no array setup per step). Same result as predict().
+        """
+        if self._lists is None:
+            self._lists = (self.feature.tolist(), self.threshold.tolist(), self.left.tolist(),
+                           self.right.tolist(), self.value.tolist(), self.missing_left.tolist())
+        feature, threshold, left, right, value, missing_left = self._lists
+        x = np.asarray(x_scaled, dtype=np.float32).astype(np.float64).tolist()
+        total = 0.0
+        for node in self.roots.tolist():
+            while left[node] != node:
+                v = x[feature[node]]
+                go_left = v <= threshold[node] or (v != v and missing_left[node])
+                node = left[node] if go_left else right[node]
+            total += value[node]
+        return total / len(self.roots)
+
+
+class LinearScorer:
+    name = "linear"
+
+    def __init__(self, artifact):
+        # Only the weighted columns, so NaN in unused ones (weather) cannot leak in
+        features = artifact["features"]
+        self.columns = [i for i, f in enumerate(features) if f in LINEAR_WEIGHTS]
+        self.weights = np.array([LINEAR_WEIGHTS[features[i]] for i in self.columns])
+
+    def predict(self, X_scaled):
+        X = np.asarray(X_scaled, dtype=np.float64)[:, self.columns]
+        return np.clip(X @ self.weights, 0, 1)
+
+
+SCORERS = {cls.name: cls for cls in (ForestScorer, FlatForestScorer, LinearScorer)}
+
+# backend name -> {fitted model: compiled scorer}
+_compiled = {}
+
+
+def register_scorer(cls):
+    """Add a backend class (with `name`, __init__(artifact) and predict(X_scaled))."""
+    if cls.name in SCORERS:
+        raise ValueError(f"Scorer {cls.name!r} is already registered")
+    SCORERS[cls.name] = cls
+    return cls
+
+
+def get_scorer(artifact, backend=DEFAULT_BACKEND):
+    """Scorer for a loaded artifact, compiled once per fitted model."""
+    if backend not in SCORERS:
+        raise ValueError(f"Unknown scoring backend {backend!r}, expected one of {sorted(SCORERS)}")
+    cache = _compiled.setdefault(backend, weakref.WeakKeyDictionary())
+    scorer = cache.get(artifact["model"])
+    if scorer is None:
+        scorer = cache[artifact["model"]] = SCORERS[backend](artifact)
+    return scorer
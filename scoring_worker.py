@@ -0,0 +1,181 @@
+"""
+Background scoring worker.
+
+The Streamlit apps used to call generate_csv() at import time, so every
+rerun (each widget click, each autorefresh tick, in every session) re-read,
+re-scored and rewrote fleet_context_fusion.csv while other sessions were
+reading it. Scoring now happens here, in its own process:
+
+    python scoring_worker.py                 # refresh every 5 minutes
+    python scoring_worker.py --interval 60   # every minute
+    python scoring_worker.py --once          # one refresh, e.g. from cron
+
+Each refresh is skipped when neither the telemetry file nor the model
+artifact changed since the last publish. Outputs are published atomically
+(the CSV by rename, the Parquet dataset by directory swap, then the per-policy
+aggregates the dashboard's KPI cards read) and the manifest
+fleet_context_fusion.published.json is written last; the apps only read
+whatever snapshot is currently published. A lock file keeps two workers
+from publishing at the same time.
+
+Per-stage timings of each run go into the manifest ("stages") and, as
+Prometheus text, into .metrics/pipeline.prom (see profiling.py); --profile
+also prints them as a table.
+"""
+import argparse
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import fusion_store
+from context_enrichment import SimulatedTrafficProvider, TrafficTableProvider
+from policy_aggregates import aggregates_path_for
+import profiling
+import risk_model
+import scorers
+from risk_score_calc import OUTPUT_FILE, TELEMETRY_FILE, generate_csv
+from rolling_features import ROLLING_FEATURES
+
+DEFAULT_INTERVAL_SECONDS = 300
+LOCK_FILE = ".scoring_worker.lock"
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+@contextmanager
+def _exclusive_lock(path):
+    """Non-blocking inter-process lock; raises BlockingIOError if already held."""
+    f = open(path, "a+")
+    try:
+        try:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:  # Windows
+            import msvcrt
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            except OSError as e:
+                raise BlockingIOError(str(e)) from e
+        yield
+    finally:
+        f.close()
+
+
+def needs_refresh(telemetry_path=TELEMETRY_FILE, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH,
+                  manifest_path=fusion_store.MANIFEST_FILE, traffic_table=None):
+    manifest = fusion_store.read_manifest(manifest_path)
+    if manifest is None:
+        return True
+    return (manifest.get("telemetry_stamp") != _stamp(telemetry_path)
+            or manifest.get("artifact_stamp") != _stamp(artifact_path)
+            or manifest.get("traffic_table_stamp") != (traffic_table and _stamp(traffic_table)))
+
+
+def refresh(force=False, refit=False, telemetry_path=TELEMETRY_FILE, output_path=OUTPUT_FILE,
+            artifact_path=risk_model.DEFAULT_ARTIFACT_PATH, output_format=None,
+            parquet_path=fusion_store.FUSION_DATASET, manifest_path=fusion_store.MANIFEST_FILE,
+            lock_path=LOCK_FILE, features=None, backend=scorers.DEFAULT_BACKEND, profile=False,
+            traffic_table=None):
+    """
+    Score the telemetry file and publish the fused snapshot if anything
+    changed (or `force`). Returns the new manifest, or None if skipped.
+    `profile` prints the run's stage timings. `traffic_table` is a CSV of
+    observed traffic used instead of simulated labels where it has data
+    (see context_enrichment.TrafficTableProvider).
+    """
+    try:
+        with _exclusive_lock(lock_path):
+            if not (force or refit or needs_refresh(telemetry_path, artifact_path, manifest_path, traffic_table)):
+                return None
+            telemetry_stamp = _stamp(telemetry_path)
+            traffic_table_stamp = traffic_table and _stamp(traffic_table)
+            providers = None
+            if traffic_table:
+                providers = [TrafficTableProvider.from_csv(traffic_table, fallback=SimulatedTrafficProvider())]
+            t0 = time.perf_counter()
+            output_format = output_format or fusion_store.default_format()
+            with profiling.PROFILER.capture() as stages:
+                generate_csv(refit=refit, artifact_path=artifact_path, telemetry_path=telemetry_path,
+                             output_path=output_path, output_format=output_format, parquet_path=parquet_path,
+                             features=features, backend=backend, providers=providers)
+            stage_seconds = {}
+            for s in stages:
+                stage_seconds[s.name] = round(stage_seconds.get(s.name, 0.0) + s.seconds, 4)
+            manifest = {
+                "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "telemetry_path": telemetry_path,
+                "telemetry_stamp": telemetry_stamp,
+                "artifact_stamp": _stamp(artifact_path),
+                "traffic_table_stamp": traffic_table_stamp,
+                "output_format": output_format,
+                "backend": backend,
+                "csv_path": output_path,
+                "parquet_path": parquet_path if output_format in ("parquet", "both") else None,
+                "aggregates_path": aggregates_path_for(output_path),
+                "duration_s": round(time.perf_counter() - t0, 3),
+                "stages": stage_seconds,
+            }
+            fusion_store.write_manifest(manifest, manifest_path)
+            profiling.write_prometheus()
+            if profile:
+                print(profiling.PROFILER.summary(stages))
+            return manifest
+    except BlockingIOError:
+        print(f"Another scoring worker holds '{lock_path}', skipping this run")
+        return None
+
+
+def run_forever(interval=DEFAULT_INTERVAL_SECONDS, **kwargs):
+    while True:
+        started = time.monotonic()
+        try:
+            manifest = refresh(**kwargs)
+            if manifest is None:
+                print("No telemetry or model changes, snapshot left as is")
+            else:
+                print(f"Published snapshot in {manifest['duration_s']}s")
+        except Exception as e:  # keep serving the last good snapshot
+            print(f"Scoring run failed, keeping the last published snapshot: {e}")
+        kwargs["refit"] = False
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score telemetry on a schedule and publish the fused snapshot.")
+    parser.add_argument("--telemetry", default=TELEMETRY_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--artifact", default=risk_model.DEFAULT_ARTIFACT_PATH)
+    parser.add_argument("--format", choices=["csv", "parquet", "both"], default=None)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SECONDS, help="seconds between refreshes")
+    parser.add_argument("--once", action="store_true", help="run one refresh and exit")
+    parser.add_argument("--force", action="store_true", help="publish even if nothing changed")
+    parser.add_argument("--refit", action="store_true", help="retrain the model artifact first")
+    parser.add_argument("--traffic-table", default=None,
+                        help="CSV of observed traffic (timestamp, gps_lat, gps_lon, traffic_density) "
+                             "to use instead of simulated labels")
+    parser.add_argument("--rolling-features", action="store_true",
+                        help="with --refit: also train on per-vehicle rolling-window features")
+    parser.add_argument("--backend", choices=sorted(scorers.SCORERS), default=scorers.DEFAULT_BACKEND,
+                        help="inference implementation, see scorers.py")
+    parser.add_argument("--profile", action="store_true", help="print per-stage timings of each run")
+    args = parser.parse_args()
+
+    options = dict(telemetry_path=args.telemetry, output_path=args.output, artifact_path=args.artifact,
+                   output_format=args.format, refit=args.refit, backend=args.backend, profile=args.profile,
+                   features=risk_model.FEATURES + ROLLING_FEATURES if args.rolling_features else None,
+                   traffic_table=args.traffic_table)
+    if args.once:
+        manifest = refresh(force=args.force, **options)
+        print("Nothing changed, snapshot left as is" if manifest is None else f"Published: {manifest}")
+    else:
+        if args.force:
+            refresh(force=True, **options)
+            options["refit"] = False
+        run_forever(args.interval, **options)
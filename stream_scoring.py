@@ -0,0 +1,91 @@
+"""
+Streaming scoring for telemetry files larger than RAM.
+
+The telemetry file is read in bounded chunks; each chunk goes through event
+detection, traffic context, encoding and scoring, and is appended to the
+output before the next one is read. Peak memory depends on `chunksize`, not
+on the file size. The output is written to a temporary file and renamed into
+place at the end, so readers never see a half-written fused dataset.
+
+The simulated traffic RNG is carried from chunk to chunk, so the result is
+identical to generate_csv() with the same model artifact. Each chunk is
+also aggregated per policy as it goes by, and the combined store is written
+next to the output (see policy_aggregates.py).
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import profiling
+import risk_model
+import scorers
+from policy_aggregates import PolicyAggregates, aggregates_path_for
+from risk_score_calc import OUTPUT_COLS, OUTPUT_FILE, TELEMETRY_FILE, prepare_telemetry, process_frame
+from telemetry_schema import TIMESTAMP_FORMAT, read_telemetry
+
+DEFAULT_CHUNKSIZE = 250_000
+DTYPE_SAMPLE_ROWS = 10_000
+
+
+def _float_dtypes(telemetry_path):
+    # Chunks are parsed independently; a chunk where a float column happens to
+    # hold only whole numbers would come back as int64 and be written as "5"
+    # instead of "5.0". The schema pins the known columns; pin any other float
+    # columns based on a sample of the file.
+    sample = pd.read_csv(telemetry_path, nrows=DTYPE_SAMPLE_ROWS)
+    return {column: "float64" for column in sample.select_dtypes("float").columns}
+
+
+def iter_scored_chunks(telemetry_path=TELEMETRY_FILE, artifact_path=risk_model.DEFAULT_ARTIFACT_PATH,
+                       chunksize=DEFAULT_CHUNKSIZE, backend=scorers.DEFAULT_BACKEND):
+    """Yield scored output frames, one per chunk of the telemetry file."""
+    rng = np.random.RandomState(42)
+    reader = read_telemetry(telemetry_path, chunksize=chunksize, dtype=_float_dtypes(telemetry_path))
+    while True:
+        with profiling.stage("load_csv") as s:
+            chunk = next(reader, None)
+            s.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        if not risk_model.model_exists(artifact_path):
+            # Nothing fitted yet: train on the first chunk rather than the whole file
+            risk_model.fit(prepare_telemetry(chunk.copy()), artifact_path)
+        yield process_frame(chunk, rng, artifact_path, backend)
+
+
+def generate_csv_streaming(telemetry_path=TELEMETRY_FILE, output_path=OUTPUT_FILE,
+                           artifact_path=risk_model.DEFAULT_ARTIFACT_PATH, chunksize=DEFAULT_CHUNKSIZE,
+                           backend=scorers.DEFAULT_BACKEND):
+    """Chunked equivalent of generate_csv(); returns the number of rows written."""
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    rows = 0
+    aggregates = None
+    try:
+        for i, output_df in enumerate(iter_scored_chunks(telemetry_path, artifact_path, chunksize, backend)):
+            with profiling.stage("write_csv", rows=len(output_df)):
+                output_df.to_csv(tmp_path, mode="w" if i == 0 else "a", header=i == 0, index=False,
+                                 date_format=TIMESTAMP_FORMAT)
+            # Folded in per chunk, so memory follows the store's size, not the chunk count
+            aggregates = PolicyAggregates.combine([aggregates, PolicyAggregates.from_frame(output_df)])
+            rows += len(output_df)
+        if not os.path.exists(tmp_path):
+            pd.DataFrame(columns=OUTPUT_COLS).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, output_path)
+        PolicyAggregates.combine([aggregates]).save(aggregates_path_for(output_path))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Context-fused risk scores for {rows:,} rows saved to '{output_path}'")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a telemetry file in bounded-memory chunks.")
+    parser.add_argument("--telemetry", default=TELEMETRY_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--artifact", default=risk_model.DEFAULT_ARTIFACT_PATH)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+    generate_csv_streaming(args.telemetry, args.output, args.artifact, args.chunksize)
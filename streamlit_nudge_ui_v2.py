@@ -1,125 +1,86 @@
 import streamlit as st
 import pandas as pd
-from geopy.distance import geodesic
-from groq import Groq
 from datetime import datetime
-from streamlit_autorefresh import st_autorefresh
-from gtts import gTTS
-import tempfile
 import os
+import time
 import subprocess
-from risk_score_calc import generate_csv
-
-try:
-    csv_file = generate_csv()  # runs inside the same Python environment
-    st.success(f"CSV generated successfully: {csv_file}")
-except Exception as e:
-    st.error(f"Failed to generate CSV: {e}")
+from alert_dispatcher import AlertDispatcher
+from drivebuddy_nudges import NudgeStore, row_key
+from fusion_store import FUSION_CSV, FUSION_DATASET, fusion_source_path, read_fusion, read_manifest
+from llm_gateway import LLMGateway, make_client
+import rest_areas
+from rest_areas import RestAreaIndex
+from nudge_cache import NudgeCache, SqliteNudgeBackend
+from nudges import NUDGE_FILTERS, generate_nudge_via_groq, precompute_nudges
+import profiling
+from tts_service import TTSService
+
+# Stage timings of this app go to .metrics/nudge_ui.prom (see profiling.py)
+profiling.configure(component="nudge_ui")
+
+# Scoring runs in scoring_worker.py; the app only reads the last published snapshot
+published = read_manifest()
+if published is not None:
+    st.caption(f"Risk scores published {published['published_at']}")
+elif not os.path.exists(fusion_source_path()):
+    st.error("No scored data yet. Start the worker: `python scoring_worker.py` (or `--once`).")
+    st.stop()
 # ==============================
 # --- Load Rest Area Data ---
 # ==============================
-@st.cache_data
+# Served from the local snapshot (see rest_areas.py); re-checked hourly per process
+@st.cache_data(ttl=3600)
 def load_rest_areas():
-    rest_area_json = "https://data.ny.gov/resource/qebf-4fd8.json"
-    rest_df = pd.read_json(rest_area_json)
-    rest_df = rest_df[['name', 'description', 'travel_direction', 'latitude', 'longitude']]
-    return rest_df
+    with profiling.stage("read_rest_areas") as s:
+        areas = rest_areas.load_rest_areas()
+        s.rows = len(areas)
+    return areas
+
+# BallTree over the rest areas, built once per process and shared by sessions
+@st.cache_resource(ttl=3600)
+def load_rest_area_index():
+    return RestAreaIndex(load_rest_areas())
 
-rest_df = load_rest_areas()
+rest_index = load_rest_area_index()
 
 def nearest_rest_area(lat, lon):
-    nearest = None
-    min_dist = float('inf')
-    for _, row in rest_df.iterrows():
-        dist = geodesic((lat, lon), (row['latitude'], row['longitude'])).kilometers
-        if dist < min_dist:
-            min_dist = dist
-            nearest = row
-    return nearest
+    with profiling.stage("rest_area_lookup", rows=1):
+        return rest_index.nearest(lat, lon)
 
-# ==============================
-# --- Few-shot Prompt Examples ---
-# ==============================
-few_shot_examples = [
-    {
-        "prompt": "Vehicle ID: V1\nRisk Score: 0.61\nWeather: Overcast\nRoad Type: highway\nTraffic Density: high\nGenerate a short, friendly, motivational driving nudge:",
-        "completion": "Vehicle V1: 🚗 Moderate risk. Keep an eye on traffic and adjust speed for safer driving."
-    },
-    {
-        "prompt": "Vehicle ID: V2\nRisk Score: 0.85\nWeather: Rain\nRoad Type: city\nTraffic Density: medium\nGenerate a short, friendly, motivational driving nudge:",
-        "completion": "Vehicle V2: ⚠️ High risk detected! Drive very carefully in rainy city conditions."
-    },
-    {
-        "prompt": "Vehicle ID: V3\nRisk Score: 0.35\nWeather: Clear\nRoad Type: highway\nTraffic Density: low\nGenerate a short, friendly, motivational driving nudge:",
-        "completion": "Vehicle V3: ✅ Low risk. Great driving! Keep up the safe habits."
-    }
-]
+# Nudge cache shared by all sessions, persisted across restarts
+@st.cache_resource
+def get_nudge_cache():
+    return NudgeCache(backend=SqliteNudgeBackend())
 
-def build_few_shot_text(examples):
-    return "\n\n".join(
-        f"Example:\n{e['prompt']}\nResponse: {e['completion']}"
-        for e in examples
-    )
+nudge_cache = get_nudge_cache()
+
+# Nudges generated ahead of time by drivebuddy_nudges.py, keyed per reading
+@st.cache_resource
+def get_nudge_store():
+    return NudgeStore()
+
+nudge_store = get_nudge_store()
+
+# Nudge audio is synthesized on a worker pool and cached by text hash under
+# .cache/tts/ (size-capped), shared by all sessions (see tts_service.py)
+TTS_WAIT_SECONDS = 15
+
+@st.cache_resource
+def get_tts_service():
+    return TTSService()
 
-FEW_SHOT_TEXT = build_few_shot_text(few_shot_examples)
+tts = get_tts_service()
 
 # ==============================
-# --- Groq AI Generation ---
+# --- LLM Gateway ---
 # ==============================
-def generate_nudge_via_groq(
-    groq_client: Groq,
-    timestamp, driver_name, vehicle_id, gps_lat, gps_lon,
-    weather, road_type, risk_score, traffic_density,
-    stress_level, heart_rate, gsr, fatigue,event
-):
-    rest_area = None
-    if stress_level > 70:
-        rest_area = nearest_rest_area(gps_lat, gps_lon)
-
-    rest_text = ""
-    if rest_area is not None:
-        rest_text = (
-            f"Suggested Rest Area: {rest_area['name']} ({rest_area['description']}) "
-            f"at lat {rest_area['latitude']}, lon {rest_area['longitude']}\n"
-        )
+# One async gateway per process: bounded concurrency, timeouts, retries and
+# request coalescing shared by every session (see llm_gateway.py)
+@st.cache_resource
+def get_llm_gateway(api_key):
+    return LLMGateway(make_client(api_key=api_key))
 
-    prompt = f"""
-You are a friendly AI driving assistant that provides motivational driving nudges. Use these examples for style and tone:
-
-{FEW_SHOT_TEXT}
-
-Now generate a new driving alert:
-
-timestamp: {timestamp}
-Driver Name: {driver_name}
-Vehicle ID: {vehicle_id}
-gps_lat: {gps_lat}
-gps_lon: {gps_lon}
-Weather: {weather}
-Road Type: {road_type}
-Risk Score: {risk_score:.2f}
-Traffic Density: {traffic_density}
-Stress Level: {stress_level}
-Heart Rate: {heart_rate}
-GSR: {gsr}
-Fatigue: {fatigue}
-Event: {event}
-{rest_text}
-Generate a short, friendly, alert driving nudge based on the actual stress level ({stress_level})
-and actual risk score ({risk_score:.2f}). If the stress level is above 70 and risk_score > 0.8, clearly suggest the nearest rest area.
-Driving Alert:
-"""
-
-    messages = [
-        {"role": "system", "content": "You are a motivational driving assistant."},
-        {"role": "user", "content": prompt}
-    ]
-    resp = groq_client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=messages,
-        temperature=0.2
-    )
-    return resp.choices[0].message.content.strip()
+# Nudge prompt building and generation live in nudges.py (shared with batch jobs)
 
 # ==============================
 # --- Streamlit App Setup ---
@@ -172,12 +133,18 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Groq API ---
-client = Groq(api_key="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")
+llm = get_llm_gateway("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")
 
 # --- Load CSV data ---
+NUDGE_COLUMNS = [
+    'timestamp', 'driver_name', 'vehicle_id', 'gps_lat', 'gps_lon', 'weather', 'road_type',
+    'risk_score', 'traffic_density', 'stress_level', 'heart_rate', 'gsr', 'fatigue', 'event'
+]
 try:
-    df = pd.read_csv('fleet_context_fusion.csv')
-    df = df[(df['risk_score'] >= 0.85) & (df['stress_level'] >= 65)]
+    # Only the columns shown below, and only high-risk/high-stress row groups
+    with profiling.stage("read_fusion") as s:
+        df = read_fusion(columns=NUDGE_COLUMNS, filters=NUDGE_FILTERS)
+        s.rows = len(df)
 except Exception as e:
     st.error(f"Could not load data file: {e}")
     st.stop()
@@ -188,33 +155,40 @@ if df.empty:
 
 st.write("🔍 Data loaded. Number of rows:", len(df))
 
+# Generate nudges for every flagged row in the background, in parallel, so
+# the per-alert lookup below is a cache hit instead of a blocking LLM call
+@st.cache_resource
+def start_nudge_precompute(data_version, n_rows):
+    return llm.submit(precompute_nudges(llm, df, rest_index, nudge_cache))
+
+start_nudge_precompute(os.path.getmtime(fusion_source_path()), len(df))
+
 # ==============================
-# --- Auto Refresh + State ---
+# --- Alert Queue ---
 # ==============================
-if "alert_idx" not in st.session_state:
-    st.session_state.alert_idx = 0
-if "finished" not in st.session_state:
-    st.session_state.finished = False
-
-# Only refresh if not finished
-if not st.session_state.finished:
-    refresh_count = st_autorefresh(interval=30000, key="auto_alert_refresh")
-else:
-    refresh_count = 0
-
-# Increment index on refresh
-if refresh_count > 0 and not st.session_state.finished:
-    if st.session_state.alert_idx < len(df) - 1:
-        st.session_state.alert_idx += 1
-    else:
-        st.session_state.finished = True
+# Scored rows become alerts as the worker writes them, to the CSV or the Parquet
+# dataset (the NUDGE_FILTERS rows, whose nudges are precomputed; critical/elevated/
+# stress rules, per-vehicle rate limit, dedupe; see alert_dispatcher.py). Each session
+# takes them from its own bounded priority queue and reruns when one arrives.
+ALERT_WAIT_SECONDS = 60      # long-poll: rerun after this long even without alerts
+MIN_DISPLAY_SECONDS = 5      # keep an alert on screen at least this long
+
+@st.cache_resource
+def get_alert_dispatcher():
+    dispatcher = AlertDispatcher(filters=NUDGE_FILTERS)
+    dispatcher.follow(FUSION_CSV, dataset_path=FUSION_DATASET)
+    return dispatcher
+
+alert_dispatcher = get_alert_dispatcher()
+if "alerts" not in st.session_state:
+    st.session_state.alerts = alert_dispatcher.subscribe()
+current_alert = st.session_state.alerts.get(timeout=0)
 
 # ==============================
 # --- Display Section ---
 # ==============================
-if not st.session_state.finished:
-    idx = st.session_state.alert_idx
-    row = df.iloc[idx]
+if current_alert is not None:
+    row = current_alert.row
 
     # --- Extract fields ---
     timestamp = row.get("timestamp", datetime.now().isoformat())
@@ -232,7 +206,7 @@ if not st.session_state.finished:
     fatigue = float(row.get("fatigue", 0.0))
     event = row.get("event", "Unknown")
     # --- Fancy Card ---
-    st.markdown(f"## 🕒 Data Snapshot — `{timestamp}` (Row {idx+1}/{len(df)})")
+    st.markdown(f"## 🕒 Data Snapshot — `{timestamp}` ({len(st.session_state.alerts)} more alerts queued)")
     st.markdown('<div class="dashboard-card">', unsafe_allow_html=True)
 
     col1, col2, col3 = st.columns(3)
@@ -315,44 +289,41 @@ if not st.session_state.finished:
     st.markdown('</div>', unsafe_allow_html=True)
 
     # --- Alert Status ---
-    if risk_score > 0.8 and stress_level > 70:
-        st.error("🚨 Critical Condition — High risk and high stress! Recommend immediate rest.")
-        st.audio("assets/critical.mp4",autoplay=True)  # Local file
-    elif risk_score > 0.6:
-        st.warning("⚠️ Elevated risk detected — stay cautious.")
-        st.audio("assets/warning.mp3",autoplay=True)
-    elif stress_level > 70:
-        st.warning("😟 High stress level — consider a short break.")
-        st.audio("assets/warning.mp3",autoplay=True)
+    # Level, message and sound were set by the dispatcher's rules
+    if current_alert.level == "critical":
+        st.error(current_alert.message)
     else:
-        st.success("✅ Safe driving conditions — keep it steady!")
+        st.warning(current_alert.message)
+    st.audio(current_alert.sound, autoplay=True)  # Local file
 
     # --- AI Nudge ---
-    alert = generate_nudge_via_groq(
-        client, timestamp, driver_name, vehicle_id,
-        gps_lat, gps_lon, weather, road_type,
-        risk_score, traffic_density, stress_level, heart_rate, gsr, fatigue,event
-    )
+    # Stored by the drivebuddy-nudges batch when it has run over this reading
+    alert = nudge_store.get(row_key(row))
+    if alert is None:
+        with profiling.stage("llm_call"):
+            alert = generate_nudge_via_groq(
+                llm, timestamp, driver_name, vehicle_id,
+                gps_lat, gps_lon, weather, road_type,
+                risk_score, traffic_density, stress_level, heart_rate, gsr, fatigue,event,
+                cache=nudge_cache, rest_index=rest_index
+            )
     st.markdown("### 💬 AI Driving Nudge")
     st.info(f"**{alert}**")
+    cache_stats = nudge_cache.stats()
+    st.sidebar.caption(
+        f"Nudge cache: {cache_stats['hits'] + cache_stats['backend_hits']} hits / "
+        f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries"
+    )
 
 # --- Text-to-Speech (TTS) ---
-    def speak_text(text):
-        """Generate and play AI nudge audio using Google TTS."""
-        if not text:
-            st.warning("No text to speak.")
-            return
-
-        # Generate audio using gTTS
-        tts = gTTS(text=text, lang='en', slow=False)
-
-        # Save to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_file:
-            tts.save(tmp_file.name)
-            st.audio(tmp_file.name, format="audio/mp3", start_time=0)
-
-    # Add a "🎙️ Speak Nudge" button
-    speak_text(alert)
+    # Synthesis runs on the TTS pool (or hits the audio cache) while the rest
+    # of the page renders; the player is filled in at the end of the card
+    audio_slot = st.empty()
+    if alert:
+        audio_future = tts.submit(alert)
+    else:
+        audio_future = None
+        st.warning("No text to speak.")
 
     # --- Rest Area Suggestion with Directions ---
     if stress_level > 70:
@@ -383,12 +354,28 @@ if not st.session_state.finished:
             )
             st.markdown(f"[🗺️ Open Directions in Google Maps]({maps_directions_url})", unsafe_allow_html=True)
 
+    if audio_future is not None:
+        # Only the wait left after rendering is timed; cache hits are already done
+        with profiling.stage("tts"):
+            try:
+                audio_slot.audio(audio_future.result(timeout=TTS_WAIT_SECONDS), format=tts.mime_type, start_time=0)
+            except TimeoutError:
+                # Keeps synthesizing into the cache; a later rerun of this nudge plays it
+                audio_slot.caption("Nudge audio is still being generated.")
+            except Exception as e:
+                audio_slot.caption(f"Nudge audio unavailable: {e}")
+        tts_stats = tts.stats()
+        st.sidebar.caption(
+            f"Audio cache: {tts_stats['hits']} hits / {tts_stats['syntheses']} syntheses, "
+            f"{tts_stats['cache_bytes'] / 2**20:.1f} MB"
+        )
+
 
             # Optionally, add a short delay between showing next alert
         # time.sleep(2)  # 2 seconds — you can adjust or remove this
 
 else:
-    st.success("✅ All alerts have been shown.")
+    st.success("✅ All alerts have been shown — new ones appear as soon as they are scored.")
     st.markdown("## 🧠 AI Driving Summary")
 
     # Build a text summary from the dataset
@@ -408,21 +395,32 @@ Use an uplifting tone and emojis where appropriate.
     """
 
     try:
-        summary_resp = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are a motivational driving coach."},
-                {"role": "user", "content": summary_prompt}
-            ],
-            temperature=0.4
-        )
-
-        summary_text = summary_resp.choices[0].message.content.strip()
+        # Idle reruns reuse this session's summary until the data changes
+        cached_summary = st.session_state.get("ai_summary")
+        if cached_summary is not None and cached_summary[0] == summary_prompt:
+            summary_text = cached_summary[1]
+        else:
+            with profiling.stage("llm_summary"):
+                summary_text = llm.complete_sync(
+                    [
+                        {"role": "system", "content": "You are a motivational driving coach."},
+                        {"role": "user", "content": summary_prompt}
+                    ],
+                    temperature=0.4
+                )
+            st.session_state.ai_summary = (summary_prompt, summary_text)
         st.info(summary_text)
 
     except Exception as e:
         st.warning(f"Could not generate AI summary: {e}")
         
 
+# Publish this process's stage timings (read_fusion, llm_call, tts, rest_area_lookup)
+profiling.write_prometheus()
 
-
+# Rerun as soon as the next alert is queued for this session (after showing the
+# current one for a moment); the bounded wait lets closed sessions end
+if current_alert is not None:
+    time.sleep(MIN_DISPLAY_SECONDS)
+st.session_state.alerts.wait(timeout=ALERT_WAIT_SECONDS)
+st.rerun()
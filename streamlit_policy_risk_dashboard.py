@@ -1,16 +1,27 @@
 import streamlit as st
 import pyodbc
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from groq import Groq  # import Groq client
-from risk_score_calc import generate_csv
-
-try:
-    csv_file = generate_csv()  # runs inside the same Python environment
-    st.success(f"CSV generated successfully: {csv_file}")
-except Exception as e:
-    st.error(f"Failed to generate CSV: {e}")
+from llm_gateway import LLMGateway, make_client
+from fusion_store import FUSION_CSV, fusion_source_path, read_fusion, read_manifest
+from policy_aggregates import PolicyAggregates, aggregates_path_for, load_current
+from policy_index import load_or_build, normalize_policy_number
+from premium_engine import base_rates, metrics_from_kpis, premium_table, reprice
+from prompt_builder import build_policy_insight_messages
+import telemetry_schema
+import profiling
+import os
+
+# Stage timings of this app go to .metrics/dashboard.prom (see profiling.py)
+profiling.configure(component="dashboard")
+
+# Scoring runs in scoring_worker.py; the app only reads the last published snapshot
+published = read_manifest()
+if published is not None:
+    st.caption(f"Risk scores published {published['published_at']}")
+elif not os.path.exists(fusion_source_path()):
+    st.error("No scored data yet. Start the worker: `python scoring_worker.py` (or `--once`).")
+    st.stop()
 
 # ---------------------------------------
 # 🌐 Page Config
@@ -40,7 +51,12 @@ st.markdown("""
 # ---------------------------------------
 # Initialize Groq client
 # ---------------------------------------
-client = Groq(api_key=st.secrets["GROQ_API_KEY"])
+# Shared async gateway (timeouts, retries, coalescing); see llm_gateway.py
+@st.cache_resource
+def get_llm_gateway(api_key):
+    return LLMGateway(make_client(api_key=api_key))
+
+llm = get_llm_gateway(st.secrets["GROQ_API_KEY"])
 
 # ---------------------------------------
 # 1️⃣ Database Connection
@@ -50,8 +66,41 @@ client = Groq(api_key=st.secrets["GROQ_API_KEY"])
 # 3️⃣ Load Policy Transactions
 # ---------------------------------------
 policy_file_path = "PolicyTransactions.csv"
-policy_df = pd.read_csv(policy_file_path)
-policy_df = policy_df[['POL_NO', 'POL_EFF_DT', 'TRANS_CD', 'WRITTEN_PREM_AMT', 'COVG_CD']]
+
+def read_policy_transactions(path):
+    # Typed read: POL_NO as int64, transaction/coverage codes as categoricals
+    with profiling.stage("read_policies") as s:
+        policy_df = telemetry_schema.read_policy_transactions(path)
+        s.rows = len(policy_df)
+    return policy_df[['POL_NO', 'POL_EFF_DT', 'TRANS_CD', 'WRITTEN_PREM_AMT', 'COVG_CD']]
+
+# Indexed by policy number once per source version and shared across sessions;
+# the mtime argument makes Streamlit rebuild when the file changes.
+# Bump when read_policy_transactions changes, so persisted indexes are rebuilt
+POLICY_INDEX_NAME = "PolicyTransactions.typed"
+
+@st.cache_resource(show_spinner=False)
+def get_policy_index(source_mtime):
+    return load_or_build(policy_file_path, "POL_NO", reader=read_policy_transactions, name=POLICY_INDEX_NAME)
+
+# Only the analysed policy's partition is read (the CSV fallback filters in
+# pandas); cached per policy and source version instead of indexing the fleet
+@st.cache_data(show_spinner=False, max_entries=256)
+def read_policy_telemetry(policy_number, source_path, source_mtime):
+    with profiling.stage("driver_filter") as s:
+        driver_df = read_fusion(filters=[("policy_number", "==", policy_number)])
+        s.rows = len(driver_df)
+    return driver_df
+
+# KPI cards and the trend chart read the per-policy store the scoring pipeline
+# maintains (policy_aggregates.py); None while it is older than the fused data
+AGGREGATES_PATH = aggregates_path_for(FUSION_CSV)
+
+@st.cache_resource(show_spinner=False)
+def get_policy_aggregates(source_path, source_mtime, aggregates_mtime):
+    return load_current(source_path, AGGREGATES_PATH)
+
+policy_index = get_policy_index(os.path.getmtime(policy_file_path))
 
 # ---------------------------------------
 # Sidebar
@@ -80,7 +129,9 @@ if st.button("Analyze Policy"):
     if not policy_input:
         st.warning("Please enter a valid policy number.")
     else:
-        filtered_df = policy_df[policy_df["POL_NO"].astype(str) == policy_input]
+        with profiling.stage("policy_filter") as s:
+            filtered_df = policy_index.lookup(policy_input)
+            s.rows = len(filtered_df)
 
         if filtered_df.empty:
             st.error(f"No records found for Policy Number: {policy_input}")
@@ -90,90 +141,56 @@ if st.button("Analyze Policy"):
             st.dataframe(filtered_df, use_container_width=True)
 
             # Fetch Driver Metrics
-            # Load the full context fusion CSV once at the start
-            context_df = pd.read_csv("fleet_context_fusion.csv")
-
-            # Filter for the selected policy number
-            driver_df = context_df[context_df["policy_number"].astype(str) == policy_input]
-
-            # Convert timestamp column to datetime if needed
-            driver_df["timestamp"] = pd.to_datetime(driver_df["timestamp"])
-
+            fusion_path = fusion_source_path()
+            driver_df = read_policy_telemetry(normalize_policy_number(policy_input), fusion_path,
+                                              os.path.getmtime(fusion_path))
 
+            # Timestamps come typed from read_fusion; rows are in scoring order
             if driver_df.empty:
                 st.warning("No Driver Metrics found for this policy.")
             else:
-                driver_df["timestamp"] = pd.to_datetime(driver_df["timestamp"])
+                # KPI Cards, Chart, etc. from the pre-aggregated store
+                with profiling.stage("policy_aggregates"):
+                    aggregates = get_policy_aggregates(
+                        fusion_path, os.path.getmtime(fusion_path),
+                        os.path.getmtime(AGGREGATES_PATH) if os.path.exists(AGGREGATES_PATH) else None)
+                    if aggregates is None or policy_input not in aggregates:
+                        # Store not rebuilt yet for this data: aggregate this policy's rows only
+                        aggregates = PolicyAggregates.from_frame(driver_df)
+                    kpis = aggregates.kpis(policy_input)
+                    trend_df = aggregates.trend(policy_input, grain="hourly")
+
+                # Premium adjustments by the same rules as the nightly repricing
+                # (premium_engine.py); the model only explains them
+                with profiling.stage("premium_reprice"):
+                    premiums = premium_table(reprice(base_rates(filtered_df),
+                                                     metrics_from_kpis(policy_input, kpis)))
 
                 # → **AI Summary Section**
-                # Build messages for the model
-                # include a system message instructing behavior
-                messages = [
-    {
-        "role": "system",
-        "content": (
-            "You are a risk analytics assistant for vehicle insurance. "
-            "You analyze driver telematics data and policy transactions to produce clear, accurate risk insights. "
-            "You must summarize driver risk trends, anomalies, and possible causes concisely. "
-            "Then, calculate updated insurance premiums only for applicable coverages like Personal Automobile Liability Coverage (exclude other coverages). "
-            "Use consistent percentage adjustments across text and tables. "
-            "If the driver's risk is low, apply discounts (negative adjustments); if high, apply penalties (positive adjustments). "
-            "Ensure that the final premium summary table exactly matches the calculations described in the text. "
-            "The table must include: Coverage, Base Rate, Risk Adjustment (%), Stress/Fatigue Adjustment (%), and Final Premium ($). "
-            "Finally, provide a short human-readable explanation of the overall driver risk profile and premium justification. Please don't show any python script to calculate premiums"
-            "Present all calculations step-by-step in a clear, structured, human-readable format. "
-            "Use consistent numeric formatting and avoid mixing up numbers with calculations. "
-        )
-    },
-    {
-        "role": "user",
-        "content": (
-            f"Here is the recent driver metrics data for policy {policy_input} (last 100 rows):\n"
-            + driver_df.tail(100)[['timestamp', 'risk_score', 'speed', 'stress_level', 'fatigue', 'event']].to_string(index=False)
-            + "\n\nPolicy Transactions (last 30 rows):\n"
-            + filtered_df.tail(30)[['POL_NO', 'POL_EFF_DT', 'TRANS_CD', 'WRITTEN_PREM_AMT', 'COVG_CD']].to_string(index=False)
-            + "\n\nInstructions:\n"
-            "- Summarize driver risk trends and anomalies clearly.\n"
-            "- Identify possible causes for risky behavior.\n"
-            "- Apply risk-based premium adjustments as follows:\n"
-            "   * Risk Adjustment → +10% if avg risk_score > 0.5, -5% if < 0.3.\n"
-            "   * Stress/Fatigue Adjustment → +15% if avg stress > 40 or fatigue > 30, -5% if both < 20.\n"
-            "- Only include Personal Automobile Liability Coverage in the premium table.\n"
-            "- Display the final results in a professional, structured report with:\n"
-            "   • Risk Trends Summary\n"
-            "   • Anomalies and Possible Causes\n"
-            "   • Premium Calculation Steps\n"
-            "   • Premium Summary Table\n"
-            "   • Final Remarks or Recommendations"
-        )
-    }
-]
-
-
-
+                # Statistics over all of the policy's readings plus the most extreme ones,
+                # within a token budget (prompt_builder.py)
+                with profiling.stage("prompt_build", rows=len(driver_df)):
+                    messages = build_policy_insight_messages(policy_input, driver_df, filtered_df,
+                                                             premiums=premiums)
 
                 # Call Groq model
                 try:
-                    chat_resp = client.chat.completions.create(
-                        model="llama-3.1-8b-instant",
-                        messages=messages,
-                        temperature=0.2
-                    )
-                    ai_summary = chat_resp.choices[0].message.content
+                    with profiling.stage("llm_call"):
+                        ai_summary = llm.complete_sync(messages, temperature=0.2)
                 except Exception as e:
                     ai_summary = "AI summary could not be generated: " + str(e)
                     
                 st.markdown("### AI Insight")
                 st.write(ai_summary)
                 print(ai_summary)
-                # KPI Cards, Chart, etc. (your existing code)
-                avg_risk = driver_df["risk_score"].mean()
-                max_speed = driver_df["speed"].max()
-                avg_stress = (
-                    driver_df["stress_level"].mean()
-                    if driver_df["stress_level"].dtype != "O"
-                    else None
-                )
+                st.markdown("### Premium Summary")
+                if premiums.empty:
+                    st.info("No Personal Automobile Liability Coverage on this policy to reprice.")
+                else:
+                    st.table(premiums)
+                avg_risk = kpis["avg_risk"]
+                max_speed = kpis["max_speed"]
+                avg_stress = kpis["avg_stress"]
 
                 col1, col2, col3 = st.columns(3)
                 col1.metric("Average Risk Score", f"{avg_risk:.2f}")
@@ -182,17 +199,16 @@ if st.button("Analyze Policy"):
                     col3.metric("Average Stress Level", f"{avg_stress:.2f}")
                 else:
                     col3.metric("Stress Level", "N/A")
-                driver_df["timestamp"] = pd.to_datetime(driver_df["timestamp"])
-                driver_df = driver_df.sort_values(by="timestamp")
                 st.markdown("### Risk Score Trend")
+                # Hourly rollup, already in time order per driver
                 fig = px.line(
-                    driver_df,
-                    x="timestamp",
-                    y="risk_score",
+                    trend_df,
+                    x="period",
+                    y="avg_risk",
                     color="driver_name",
                     markers=True,
-                    title=f"Risk Score Over Time for Policy {policy_input}",
-                    labels={"timestamp": "Timestamp", "risk_score": "Risk Score"},
+                    title=f"Hourly Average Risk Score for Policy {policy_input}",
+                    labels={"period": "Hour", "avg_risk": "Average Risk Score"},
                     template="plotly_dark",
                 )
                 fig.update_traces(line=dict(width=3))
@@ -210,4 +226,5 @@ if st.button("Analyze Policy"):
                 with st.expander("View Full Driver Metrics Data"):
                     st.dataframe(driver_df, use_container_width=True)
 
-
+# Publish this process's stage timings (read_policies, policy_filter, driver_filter, policy_aggregates, premium_reprice, prompt_build, llm_call)
+profiling.write_prometheus()
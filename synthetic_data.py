@@ -0,0 +1,272 @@
+"""
+Synthetic fleet telemetry and policy transactions for load tests.
+
+The repo ships a 900-row sample (telemetry_smart_gadget_alice.csv) and ten
+policy transactions, which is too small to see how scoring, the dashboard
+lookups or the rest-area search scale. This module generates data with the
+same columns, value formats and vocabularies at any size:
+
+    python synthetic_data.py --vehicles 500 --days 7 --rate 20 --out data/synthetic
+    python synthetic_data.py --rows 1000000 --out data/synthetic_1m
+
+Each vehicle belongs to one policy (whose driver drives it) and reports
+`rate` readings per driving hour, `hours` hours a day from 06:00, at
+minute resolution like the sample; readings of one vehicle never share a
+minute, so (timestamp, vehicle_id) stays unique. Speeds depend on the road
+type, event_flag marks overspeed/harsh braking like event_rules.py, stress
+rises with those events and the other biometrics follow stress. Rows are shuffled within each block
+of vehicles, as the sample is unordered.
+
+Output is deterministic for a given seed and shape. Telemetry is produced
+and written in blocks of VEHICLE_BLOCK vehicles (with pyarrow's CSV writer
+when installed), so 10M+ row files are written with bounded memory.
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from event_rules import HARSH_BRAKE_THRESHOLD, OVERSPEED_THRESHOLD
+from telemetry_schema import DATE_FORMAT, TIMESTAMP_FORMAT
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - depends on the deployment
+    pa = None
+
+TELEMETRY_COLUMNS = [
+    "timestamp", "vehicle_id", "driver_name", "speed", "acceleration", "braking", "gps_lat", "gps_lon",
+    "road_type", "weather", "event_flag", "policy_number", "premium", "policy_type", "policy_start",
+    "policy_end", "stress_level", "heart_rate", "gsr", "fatigue",
+]
+POLICY_COLUMNS = ["POL_NO", "POL_EFF_DT", "TRANS_CD", "WRITTEN_PREM_AMT", "COVG_CD"]
+
+# Vocabularies as they appear in the sample files
+ROAD_TYPES = ["city", "highway", "rural"]
+WEATHER = ["sunny", "rain", "fog"]
+POLICY_TYPES = ["Third Party", "Comprehensive"]
+COVERAGES = {  # coverage -> (min, max) written premium
+    "Personal Automobile Liability Coverage": (150, 900),
+    "Personal Automobile Uninsured Motorist Bodily Injury Coverage": (20, 60),
+    "Personal Automobile Rental Coverage": (10, 30),
+    "Personal Automobile Uninsured Motorist Property Damage Coverage": (8, 20),
+    "Personal Automobile Towing & Labor Coverage": (8, 20),
+}
+FIRST_NAMES = ["Alex", "Alice", "Sam", "Priya", "Jordan", "Maria", "Chen", "Omar", "Lena", "Tom",
+               "Aisha", "Diego", "Nina", "Ravi", "Kate", "Yusuf"]
+# mean, std of speed (km/h) per road type
+SPEED_BY_ROAD = {"city": (45, 12), "highway": (75, 15), "rural": (60, 15)}
+
+DEFAULT_START = "2025-10-12"
+DEFAULT_DAYS = 7
+DEFAULT_RATE = 20            # readings per vehicle per driving hour
+DEFAULT_HOURS = 16           # 06:00 - 22:00
+FIRST_HOUR = 6
+POLICIES_PER_VEHICLE = 0.7
+NYC_LAT = (40.70, 40.80)
+NYC_LON = (-74.02, -73.93)
+VEHICLE_BLOCK = 256
+
+
+def vehicles_for_rows(rows, days=DEFAULT_DAYS, rate_per_hour=DEFAULT_RATE, hours_per_day=DEFAULT_HOURS):
+    """Vehicles needed for at least `rows` readings with the given shape."""
+    return max(1, math.ceil(rows / (days * hours_per_day * rate_per_hour)))
+
+
+def generate_policies(policies, start=DEFAULT_START, seed=0):
+    """
+    One row per policy: policy_number, driver_name, premium, policy_type,
+    policy_start and policy_end (one-year terms that cover `start`).
+    """
+    rng = np.random.default_rng([seed, 0])
+    # Unique 10-digit numbers like the sample's (one per stride)
+    stride = 6_000_000_000 // policies
+    numbers = 3_000_000_000 + np.arange(policies, dtype=np.int64) * stride + rng.integers(0, stride, policies)
+    names = [FIRST_NAMES[i % len(FIRST_NAMES)] + ("" if i < len(FIRST_NAMES) else f" {i // len(FIRST_NAMES)}")
+             for i in range(policies)]
+    policy_start = pd.Timestamp(start) - pd.to_timedelta(rng.integers(1, 365, policies), unit="D")
+    return pd.DataFrame({
+        "policy_number": numbers,
+        "driver_name": names,
+        "premium": rng.uniform(3_000, 12_000, policies).round(2),
+        "policy_type": rng.choice(POLICY_TYPES, policies, p=[2 / 3, 1 / 3]),
+        "policy_start": policy_start,
+        "policy_end": policy_start + pd.DateOffset(years=1),
+    })
+
+
+def generate_policy_transactions(policy_table, seed=0):
+    """PolicyTransactions.csv rows: one Submission per coverage and policy, dated at policy start."""
+    rng = np.random.default_rng([seed, 1])
+    n, coverages = len(policy_table), list(COVERAGES)
+    low = np.tile([COVERAGES[c][0] for c in coverages], n)
+    high = np.tile([COVERAGES[c][1] for c in coverages], n)
+    return pd.DataFrame({
+        "POL_NO": np.repeat(policy_table["policy_number"].to_numpy(), len(coverages)),
+        "POL_EFF_DT": np.repeat(policy_table["policy_start"].dt.strftime(DATE_FORMAT).to_numpy(), len(coverages)),
+        "TRANS_CD": "Submission",
+        "WRITTEN_PREM_AMT": rng.integers(low, high + 1),
+        "COVG_CD": np.tile(coverages, n),
+    })
+
+
+def _minute_labels(start, days):
+    """Timestamp strings for every minute of the period, indexed by minute offset."""
+    minutes = pd.date_range(start, periods=days * 24 * 60, freq="min")
+    return minutes.strftime(TIMESTAMP_FORMAT).to_numpy()
+
+
+def _vehicle_block(first, count, policy_table, days, rate_per_hour, hours_per_day, labels, seed):
+    rng = np.random.default_rng([seed, 2, first])
+    per_day = int(hours_per_day * rate_per_hour)
+    n = count * days * per_day
+    vehicle = np.repeat(np.arange(first, first + count), days * per_day)
+    day = np.tile(np.repeat(np.arange(days), per_day), count)
+    slot = np.tile(np.arange(per_day), count * days)
+
+    # One reading per slot of 60/rate minutes, jittered within the slot
+    step = 60 / rate_per_hour
+    minute_of_drive = np.floor((slot + rng.random(n)) * step).astype(np.int64)
+    minute = day * 1440 + FIRST_HOUR * 60 + minute_of_drive
+    hours_driven = minute_of_drive / 60
+
+    # Per-vehicle values (and their CSV text) computed once, then repeated per reading
+    local = vehicle - first
+    vehicle_ids = np.array([f"V{v + 1}" for v in range(first, first + count)], dtype=object)
+    policy = policy_table.iloc[np.arange(first, first + count) % len(policy_table)]
+    policy_start = policy["policy_start"].dt.strftime(DATE_FORMAT).to_numpy(dtype=object)
+    policy_end = policy["policy_end"].dt.strftime(DATE_FORMAT).to_numpy(dtype=object)
+    road = rng.choice(len(ROAD_TYPES), n, p=[0.45, 0.35, 0.2])
+    speed_mean = np.array([SPEED_BY_ROAD[r][0] for r in ROAD_TYPES])[road]
+    speed_std = np.array([SPEED_BY_ROAD[r][1] for r in ROAD_TYPES])[road]
+    speed = np.clip(rng.normal(speed_mean, speed_std), 0, None).round(2)
+    braking = np.clip(rng.exponential(0.2, n), 0, 1.5).round(2)
+    # Stress rises with harsh braking and speeding, so risky readings are also stressed ones
+    stress = 20 + rng.exponential(11, n) + 25 * (braking > HARSH_BRAKE_THRESHOLD) + 0.5 * np.clip(speed - 90, 0, None)
+    stress = np.clip(stress, 0, 100)
+    base_lat = rng.uniform(*NYC_LAT, count)[local]
+    base_lon = rng.uniform(*NYC_LON, count)[local]
+
+    block = pd.DataFrame({
+        "timestamp": labels[minute],
+        "vehicle_id": vehicle_ids[local],
+        "driver_name": policy["driver_name"].to_numpy(dtype=object)[local],
+        "speed": speed,
+        "acceleration": rng.normal(0, 1.9, n).round(2),
+        "braking": braking,
+        "gps_lat": (base_lat + rng.normal(0, 0.01, n)).round(6),
+        "gps_lon": (base_lon + rng.normal(0, 0.01, n)).round(6),
+        "road_type": np.array(ROAD_TYPES, dtype=object)[road],
+        "weather": np.array(WEATHER, dtype=object)[rng.integers(0, len(WEATHER), n)],
+        "event_flag": ((speed > OVERSPEED_THRESHOLD) | (braking > HARSH_BRAKE_THRESHOLD)).astype(np.int8),
+        "policy_number": policy["policy_number"].to_numpy()[local],
+        "premium": policy["premium"].to_numpy()[local],
+        "policy_type": policy["policy_type"].to_numpy(dtype=object)[local],
+        "policy_start": policy_start[local],
+        "policy_end": policy_end[local],
+        "stress_level": stress.round(2),
+        "heart_rate": (55 + 0.5 * stress + rng.normal(0, 5, n)).round(2),
+        "gsr": np.clip(0.7 + 0.011 * stress + rng.normal(0, 0.1, n), 0.3, None).round(2),
+        "fatigue": np.clip(rng.normal(8, 6, n) + 1.2 * hours_driven, 0, 100).round(2),
+    })
+    return block.iloc[rng.permutation(n)].reset_index(drop=True)
+
+
+def iter_telemetry(vehicles, policy_table, days=DEFAULT_DAYS, rate_per_hour=DEFAULT_RATE,
+                   hours_per_day=DEFAULT_HOURS, start=DEFAULT_START, seed=0, rows=None):
+    """Telemetry frames, VEHICLE_BLOCK vehicles at a time; stops after `rows` rows if given."""
+    if not 0 < rate_per_hour <= 60:
+        raise ValueError(f"rate_per_hour must be in (0, 60] at minute resolution, got {rate_per_hour}")
+    if not 0 < hours_per_day <= 24 - FIRST_HOUR:
+        raise ValueError(f"hours_per_day must be in (0, {24 - FIRST_HOUR}], got {hours_per_day}")
+    labels = _minute_labels(start, days)
+    remaining = rows
+    for first in range(0, vehicles, VEHICLE_BLOCK):
+        block = _vehicle_block(first, min(VEHICLE_BLOCK, vehicles - first), policy_table, days, rate_per_hour,
+                               hours_per_day, labels, seed)
+        if remaining is not None:
+            block = block.iloc[:remaining]
+            remaining -= len(block)
+        yield block[TELEMETRY_COLUMNS]
+        if remaining == 0:
+            return
+
+
+def generate_fleet(vehicles=None, policies=None, days=DEFAULT_DAYS, rate_per_hour=DEFAULT_RATE,
+                   hours_per_day=DEFAULT_HOURS, start=DEFAULT_START, seed=0, rows=None):
+    """
+    In-memory (telemetry, policy transactions) frames. Give `vehicles`, or
+    `rows` to size the fleet for exactly that many readings; `policies`
+    defaults to POLICIES_PER_VEHICLE per vehicle.
+    """
+    vehicles, policy_table = _fleet(vehicles, policies, days, rate_per_hour, hours_per_day, start, seed, rows)
+    telemetry = pd.concat(list(iter_telemetry(vehicles, policy_table, days, rate_per_hour, hours_per_day,
+                                              start, seed, rows)), ignore_index=True)
+    return telemetry, generate_policy_transactions(policy_table, seed)
+
+
+def write_fleet(out_dir, vehicles=None, policies=None, days=DEFAULT_DAYS, rate_per_hour=DEFAULT_RATE,
+                hours_per_day=DEFAULT_HOURS, start=DEFAULT_START, seed=0, rows=None):
+    """
+    Write telemetry.csv and PolicyTransactions.csv under `out_dir`, block by
+    block. Returns {"telemetry": path, "policies": path, "rows": n, "vehicles": n, "policy_count": n}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    vehicles, policy_table = _fleet(vehicles, policies, days, rate_per_hour, hours_per_day, start, seed, rows)
+    telemetry_path = os.path.join(out_dir, "telemetry.csv")
+    policies_path = os.path.join(out_dir, "PolicyTransactions.csv")
+    written = 0
+    with open(telemetry_path, "wb") as f:
+        f.write((",".join(TELEMETRY_COLUMNS) + "\n").encode())
+        for block in iter_telemetry(vehicles, policy_table, days, rate_per_hour, hours_per_day, start, seed, rows):
+            _write_csv_rows(block, f)
+            written += len(block)
+    generate_policy_transactions(policy_table, seed).to_csv(policies_path, index=False)
+    return {"telemetry": telemetry_path, "policies": policies_path, "rows": written,
+            "vehicles": vehicles, "policy_count": len(policy_table)}
+
+
+def _write_csv_rows(df, f):
+    """
+    Append df's rows (no header) to binary file f. The pyarrow writer prints
+    integral floats as "73" rather than "73.0"; both read back the same.
+    """
+    if pa is None:
+        f.write(df.to_csv(index=False, header=False).encode())
+        return
+    # ~10x faster than DataFrame.to_csv; values contain no separators, so no quoting
+    options = pa_csv.WriteOptions(include_header=False, quoting_style="none")
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f, write_options=options)
+
+
+def _fleet(vehicles, policies, days, rate_per_hour, hours_per_day, start, seed, rows):
+    if vehicles is None:
+        if rows is None:
+            raise ValueError("Give vehicles or rows")
+        vehicles = vehicles_for_rows(rows, days, rate_per_hour, hours_per_day)
+    policies = policies or max(1, round(vehicles * POLICIES_PER_VEHICLE))
+    return vehicles, generate_policies(policies, start, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic fleet telemetry and policy transactions.")
+    parser.add_argument("--out", default=os.path.join("data", "synthetic"), help="output directory")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--vehicles", type=int)
+    size.add_argument("--rows", type=int, help="size the fleet for exactly this many readings")
+    parser.add_argument("--policies", type=int, default=None,
+                        help=f"default: {POLICIES_PER_VEHICLE} per vehicle")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="readings per vehicle per driving hour")
+    parser.add_argument("--hours", type=int, default=DEFAULT_HOURS, help="driving hours per day, from 06:00")
+    parser.add_argument("--start", default=DEFAULT_START, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    info = write_fleet(args.out, vehicles=args.vehicles, policies=args.policies, days=args.days,
+                       rate_per_hour=args.rate, hours_per_day=args.hours, start=args.start, seed=args.seed,
+                       rows=args.rows)
+    print(f"{info['rows']:,} readings from {info['vehicles']:,} vehicles / {info['policy_count']:,} policies "
+          f"-> {info['telemetry']}, {info['policies']}")
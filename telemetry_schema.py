@@ -0,0 +1,134 @@
+"""
+Explicit column types for telemetry, fused output and policy transactions.
+
+pd.read_csv on its own loads every number as float64 and every label
+(vehicle_id, driver_name, road_type, weather, policy_type, ...) as a Python
+string per row. The schemas here load biometric readings as float32, labels
+as categoricals and the dd-mm-yyyy timestamps as real datetimes, which roughly
+halves memory per row and makes filters and groupbys on the label columns
+integer operations (see benchmarks/bench_telemetry_schema.py).
+
+Some columns stay float64 on purpose: GPS coordinates and money, because
+float32 only keeps ~7 significant digits (metres of error at NY longitudes,
+cents on larger premiums), and the model inputs speed/braking/acceleration,
+because the fitted scaler and trees were built on float64 values and a few
+float32-rounded readings land on the other side of a split.
+
+unknown_categories() reports label values the model encoders do not know;
+those are encoded as NaN (e.g. the lowercase 'fog' / 'rain' in the sample
+telemetry vs. 'Fog' / 'Rain' in risk_model.ENCODERS).
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M"
+DATE_FORMAT = "%d-%m-%Y"
+
+TELEMETRY_SCHEMA = {
+    "vehicle_id": "category",
+    "driver_name": "category",
+    "speed": "float64",
+    "acceleration": "float64",
+    "braking": "float64",
+    "gps_lat": "float64",
+    "gps_lon": "float64",
+    "road_type": "category",
+    "weather": "category",
+    "event_flag": "int8",
+    "policy_number": "int64",
+    "premium": "float64",
+    "policy_type": "category",
+    "stress_level": "float32",
+    "heart_rate": "float32",
+    "gsr": "float32",
+    "fatigue": "float32",
+}
+TELEMETRY_DATES = {"timestamp": TIMESTAMP_FORMAT, "policy_start": DATE_FORMAT, "policy_end": DATE_FORMAT}
+
+# fleet_context_fusion.csv: telemetry columns plus the ones the scorer adds
+FUSION_SCHEMA = dict(TELEMETRY_SCHEMA, traffic_density="category", event="category", risk_score="float32")
+FUSION_DATES = {"timestamp": TIMESTAMP_FORMAT}
+
+POLICY_SCHEMA = {
+    "POL_NO": "int64",
+    "TRANS_CD": "category",
+    "WRITTEN_PREM_AMT": "float64",
+    "COVG_CD": "category",
+}
+POLICY_DATES = {"POL_EFF_DT": DATE_FORMAT}
+
+
+def parse_dates(df, dates):
+    """Parse the `dates` columns present in df (in place), unparseable values become NaT."""
+    for column, fmt in dates.items():
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            # Readings repeat timestamps (minute resolution, one policy date per
+            # vehicle), so parse each distinct value once
+            codes, uniques = pd.factorize(df[column])
+            parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=fmt, errors="coerce").to_numpy()
+            values = parsed.take(codes, mode="clip")
+            values[codes < 0] = np.datetime64("NaT")
+            df[column] = pd.Series(values, index=df.index, name=column)
+    return df
+
+
+def read_typed_csv(path_or_buffer, schema, dates, **kwargs):
+    """pd.read_csv with the schema's dtypes (for the columns present) and parsed dates."""
+    names = kwargs.get("names")
+    # read_csv ignores dtype entries for absent columns; with explicit names it does not
+    typed = schema if names is None else {c: t for c, t in schema.items() if c in names}
+    kwargs["dtype"] = {**(kwargs.get("dtype") or {}), **typed}
+    result = pd.read_csv(path_or_buffer, **kwargs)
+    if kwargs.get("chunksize") or kwargs.get("iterator"):
+        return (parse_dates(chunk, dates) for chunk in result)
+    return parse_dates(result, dates)
+
+
+def read_telemetry(path_or_buffer, **kwargs):
+    return read_typed_csv(path_or_buffer, TELEMETRY_SCHEMA, TELEMETRY_DATES, **kwargs)
+
+
+def read_fusion_csv(path_or_buffer, **kwargs):
+    return read_typed_csv(path_or_buffer, FUSION_SCHEMA, FUSION_DATES, **kwargs)
+
+
+def read_policy_transactions(path_or_buffer, **kwargs):
+    return read_typed_csv(path_or_buffer, POLICY_SCHEMA, POLICY_DATES, **kwargs)
+
+
+def apply_schema(df, schema=TELEMETRY_SCHEMA, dates=TELEMETRY_DATES):
+    """Typed copy of an already loaded frame."""
+    out = df.astype({c: t for c, t in schema.items() if c in df.columns})
+    return parse_dates(out, dates)
+
+
+def unknown_categories(df, encoders=None):
+    """
+    {column: {value: rows}} for label values the encoders have no code for
+    (missing values are not reported). Defaults to risk_model.ENCODERS.
+    """
+    if encoders is None:
+        from risk_model import ENCODERS as encoders
+    report = {}
+    for column, (_, mapping) in encoders.items():
+        if column not in df.columns:
+            continue
+        counts = df[column].value_counts(dropna=True)
+        unknown = {str(value): int(rows) for value, rows in counts.items() if value not in mapping and rows > 0}
+        if unknown:
+            report[column] = unknown
+    return report
+
+
+def warn_unknown_categories(df, encoders=None):
+    """Emit one warning listing unknown label values; returns the report."""
+    report = unknown_categories(df, encoders)
+    if report:
+        details = "; ".join(
+            f"{column}: " + ", ".join(f"{value!r} ({rows} rows)" for value, rows in values.items())
+            for column, values in report.items()
+        )
+        warnings.warn(f"Values not in the model encoders (encoded as NaN): {details}", stacklevel=2)
+    return report
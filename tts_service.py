@@ -0,0 +1,243 @@
+"""
+Text-to-speech for driving nudges, off the render path and cached on disk.
+
+speak_text() in the nudge UI used to call gTTS(...).save() synchronously on
+every alert, into a NamedTemporaryFile(delete=False) that was never removed,
+so each rerun waited on a network round trip and a long session slowly
+filled the disk. TTSService instead
+
+* synthesizes on a small thread pool: submit(text) returns a Future right
+  away, and the app renders the rest of the page before waiting on it;
+* stores the audio content-addressed (sha256 of the backend's voice and the
+  text) under .cache/tts/, so a repeated nudge is served from disk without a
+  synthesis call, also across sessions and restarts;
+* coalesces identical in-flight requests into one synthesis;
+* keeps the cache under `max_bytes`, evicting the least recently used files.
+
+Backends have a `voice` (part of the cache key), a `suffix`/`mime_type`, and
+synthesize(text) -> bytes:
+
+* GTTSBackend   Google TTS via gTTS (MP3, needs network)
+* StubTTSBackend  offline stand-in: a deterministic silent WAV whose length
+                  follows the text, with optional latency, for tests and
+                  benchmarks
+
+make_backend() picks one from DRIVEBUDDY_TTS_BACKEND ("gtts" or "stub"),
+defaulting to gTTS when it is installed.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+
+BACKEND_ENV_VAR = "DRIVEBUDDY_TTS_BACKEND"
+DEFAULT_CACHE_DIR = os.path.join(".cache", "tts")
+DEFAULT_MAX_BYTES = 64 * 2**20
+DEFAULT_WORKERS = 2
+
+
+class GTTSBackend:
+    """Google Translate TTS (gTTS); MP3 output."""
+
+    suffix = ".mp3"
+    mime_type = "audio/mp3"
+
+    def __init__(self, lang="en", slow=False):
+        from gtts import gTTS  # optional dependency, only needed for this backend
+
+        self._gtts = gTTS
+        self.lang = lang
+        self.slow = slow
+        self.voice = f"gtts:{lang}:{'slow' if slow else 'normal'}"
+
+    def synthesize(self, text):
+        buffer = io.BytesIO()
+        self._gtts(text=text, lang=self.lang, slow=self.slow).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class StubTTSBackend:
+    """Offline stand-in: silent 8 kHz WAV, ~60 ms per character, after `latency` seconds."""
+
+    suffix = ".wav"
+    mime_type = "audio/wav"
+    voice = "stub"
+    SAMPLE_RATE = 8000
+    SECONDS_PER_CHAR = 0.06
+    MAX_SECONDS = 30
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def synthesize(self, text):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        seconds = min(len(text) * self.SECONDS_PER_CHAR, self.MAX_SECONDS)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(1)
+            f.setframerate(self.SAMPLE_RATE)
+            f.writeframes(b"\x80" * int(seconds * self.SAMPLE_RATE))
+        return buffer.getvalue()
+
+
+BACKENDS = {"gtts": GTTSBackend, "stub": StubTTSBackend}
+
+
+def make_backend(name=None, **kwargs):
+    """Backend `name` (default: $DRIVEBUDDY_TTS_BACKEND, else gTTS when installed, else the stub)."""
+    name = name or os.environ.get(BACKEND_ENV_VAR)
+    if name is None:
+        try:
+            return GTTSBackend(**kwargs)
+        except ImportError:
+            return StubTTSBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+class AudioCache:
+    """Content-addressed audio files in `directory`, kept under `max_bytes` (LRU by mtime)."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, size, _ in self._files())
+        self.evictions = 0
+
+    @staticmethod
+    def key(voice, text):
+        return hashlib.sha256(f"{voice}\0{text}".encode()).hexdigest()
+
+    def path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key, suffix):
+        """Path of the cached audio, or None; a hit marks the file as recently used."""
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, suffix, data):
+        path = self.path(key, suffix)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _files(self):
+        # (path, size, mtime) of finished audio files; other processes may delete them meanwhile
+        for entry in os.scandir(self.directory):
+            if ".tmp-" in entry.name or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield entry.path, stat.st_size, stat.st_mtime
+
+    def _evict(self, keep):
+        # Rescan: other processes share the directory, so the running total is only a trigger
+        files = sorted(self._files(), key=lambda f: f[2])
+        self._bytes = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self._bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._bytes -= size
+            self.evictions += 1
+
+    def size(self):
+        with self._lock:
+            return self._bytes
+
+
+class TTSService:
+    """Thread-pool TTS with an AudioCache; see the module docstring."""
+
+    def __init__(self, backend=None, cache=None, max_workers=DEFAULT_WORKERS):
+        self.backend = backend if backend is not None else make_backend()
+        self.cache = cache if cache is not None else AudioCache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hits": 0, "syntheses": 0, "coalesced": 0, "failures": 0}
+
+    @property
+    def mime_type(self):
+        return self.backend.mime_type
+
+    def cached(self, text):
+        """Path of the audio for `text` if it is already cached, else None (never synthesizes)."""
+        return self.cache.get(self.cache.key(self.backend.voice, text), self.backend.suffix)
+
+    def submit(self, text):
+        """Future resolving to the path of the audio for `text`; already done on a cache hit."""
+        key = self.cache.key(self.backend.voice, text)
+        with self._lock:
+            self._stats["requests"] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future
+            path = self.cache.get(key, self.backend.suffix)
+            if path is not None:
+                self._stats["hits"] += 1
+                future = Future()
+                future.set_result(path)
+                return future
+            future = self._pool.submit(self._synthesize, key, text)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._done(key))
+        return future
+
+    def speak(self, text, timeout=None):
+        """Blocking submit(): the audio path for `text`."""
+        return self.submit(text).result(timeout)
+
+    def _synthesize(self, key, text):
+        try:
+            data = self.backend.synthesize(text)
+        except Exception:
+            with self._lock:
+                self._stats["failures"] += 1
+            raise
+        with self._lock:
+            self._stats["syntheses"] += 1
+        return self.cache.put(key, self.backend.suffix, data)
+
+    def _done(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, inflight=len(self._inflight))
+        stats.update(cache_bytes=self.cache.size(), evictions=self.cache.evictions)
+        stats["hit_rate"] = stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def close(self, wait=True):
+        self._pool.shutdown(wait=wait)